@@ -0,0 +1,43 @@
+import time
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aec.spatial import ElectorateIndex, check_against_postgis
+
+# Longitude / latitude bounds of mainland Australia and Tasmania
+AUSTRALIA = ((112.9, 153.7), (-43.7, -10.6))
+
+
+class Command(BaseCommand):
+    help = 'Times in-memory electorate lookups on random points and checks them against PostGIS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=500000, help='Number of random points to time')
+        parser.add_argument('--check', type=int, default=1000, help='Number of them to check against PostGIS')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        (lon_min, lon_max), (lat_min, lat_max) = AUSTRALIA
+        points = [(rng.uniform(lon_min, lon_max), rng.uniform(lat_min, lat_max)) for i in range(options['points'])]
+
+        try:
+            start = time.time()
+            index = ElectorateIndex.from_database()
+        except ImportError as e:
+            raise CommandError(str(e))
+        self.stdout.write("%s electorates indexed in %.2fs" % (len(index), time.time() - start))
+
+        start = time.time()
+        ids = index.lookup(points)
+        elapsed = time.time() - start
+        self.stdout.write("%s points looked up in %.2fs (%d points/s), %s inside an electorate" % (
+            len(points), elapsed, len(points) / max(elapsed, 1e-9), sum(id is not None for id in ids)))
+
+        mismatches = check_against_postgis(points[:options['check']], index)
+        for lon, lat, id, expected in mismatches:
+            self.stdout.write("(%s, %s): index %s, PostGIS %s" % (lon, lat, id, expected))
+        if mismatches:
+            raise CommandError("%s of %s points differ from PostGIS" % (len(mismatches), min(options['check'], len(points))))
+        self.stdout.write("Checked %s points against PostGIS" % (min(options['check'], len(points)),))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from aec.tiles import ZOOM_LEVELS, simplify_electorates
+
+
+class Command(BaseCommand):
+    help = 'Precomputes the simplified electorate geometries vector tiles are drawn from, and empties the tile cache'
+
+    def handle(self, *args, **options):
+        count = simplify_electorates()
+        self.stdout.write("%s simplified geometries for zoom levels %s" % (count, ', '.join(map(str, ZOOM_LEVELS))))
@@ -0,0 +1,28 @@
+# Generated by Django 2.0.5 on 2026-10-18 19:02
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aec', '0003_auto_20180612_1244'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimplifiedElectorate2016',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.IntegerField()),
+                ('the_geom', django.contrib.gis.db.models.fields.MultiPolygonField(srid=3857)),
+                ('electorate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simplified', to='aec.FederalElectorate2016')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='simplifiedelectorate2016',
+            unique_together={('zoom', 'electorate')},
+        ),
+    ]
@@ -27,3 +27,17 @@ federal_electorate_2016_mapping = {
     'sortname': 'Sortname',
     'the_geom': 'POLYGON',
 }
+
+
+# Simplified copies of the boundaries, in web mercator, for drawing electorates at a given zoom level
+# Precomputed by aec.tiles.simplify_electorates
+class SimplifiedElectorate2016(models.Model):
+    electorate = models.ForeignKey(FederalElectorate2016, on_delete=models.CASCADE, related_name='simplified')
+    # Lowest zoom level these geometries are drawn at, see aec.tiles.ZOOM_LEVELS
+    zoom = models.IntegerField()
+    the_geom = models.MultiPolygonField(srid=3857, spatial_index=True)
+
+    class Meta:
+        unique_together = (
+            ('zoom', 'electorate'),
+        )
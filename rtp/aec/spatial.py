@@ -0,0 +1,102 @@
+import logging
+import threading
+
+from django.contrib.gis.geos import Point
+
+from .models import *
+
+logger = logging.getLogger(__name__)
+
+
+# Optional dependency, only needed for in-memory lookups
+def import_shapely():
+    try:
+        import numpy
+        import shapely
+    except ImportError:
+        raise ImportError("Electorate lookups need shapely >= 2.0 (pip install shapely)")
+    if not hasattr(shapely, 'STRtree') or not hasattr(shapely, 'prepare'):
+        raise ImportError("Electorate lookups need shapely >= 2.0, found %s" % (shapely.__version__,))
+    return numpy, shapely
+
+
+# Point to electorate lookups against boundaries held in memory
+# Geometries are prepared once, points are then looked up in vectorised batches: each batch is packed into an STR-tree,
+# which the prepared geometries query for the points they contain
+# A point on a boundary between electorates belongs to neither, like with the_geom__contains
+class ElectorateIndex(object):
+
+    # electorates: iterable of (id, elect_div, WKB geometry)
+    def __init__(self, electorates):
+        np, shapely = import_shapely()
+        self.np, self.shapely = np, shapely
+
+        ids, names, geoms = [], [], []
+        for id, elect_div, wkb in electorates:
+            ids.append(id)
+            names.append(elect_div)
+            geoms.append(bytes(wkb))
+        self.ids = np.array(ids, dtype=np.int64)
+        self.names = dict(zip(ids, names))
+        self.geoms = shapely.from_wkb(np.array(geoms, dtype=object))
+        shapely.prepare(self.geoms)
+
+    @classmethod
+    def from_database(cls):
+        rows = FederalElectorate2016.objects.order_by('id').values_list('id', 'elect_div', 'the_geom')
+        return cls((id, elect_div, the_geom.wkb) for id, elect_div, the_geom in rows.iterator())
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Electorate ids of a sequence of (lon, lat) pairs, None for points outside any electorate
+    def lookup(self, points):
+        np, shapely = self.np, self.shapely
+        coords = np.asarray(points, dtype=float).reshape(-1, 2)
+        electorates, found = shapely.STRtree(shapely.points(coords)).query(self.geoms, predicate='contains')
+
+        result = np.full(len(coords), -1, dtype=np.int64)
+        result[found] = self.ids[electorates]
+        return [int(id) if id >= 0 else None for id in result]
+
+    def lookup_names(self, points):
+        return [self.names[id] if id is not None else None for id in self.lookup(points)]
+
+
+# Process-wide index, loaded on first use
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    index = _index
+    if index is None:
+        with _lock:
+            if _index is None:
+                logger.debug("Loading electorate boundaries ...")
+                _index = ElectorateIndex.from_database()
+            index = _index
+    return index
+
+
+# Drops the index so that the next lookup reloads the boundaries, e.g. after load_data_assets
+def reset_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+def lookup_electorates(points):
+    return get_index().lookup(points)
+
+
+# Points whose in-memory lookup differs from PostGIS, as [(lon, lat, index id, PostGIS id), ...]
+def check_against_postgis(points, index=None):
+    index = get_index() if index is None else index
+    mismatches = []
+    for (lon, lat), id in zip(points, index.lookup(points)):
+        expected = FederalElectorate2016.objects.filter(the_geom__contains=Point(lon, lat, srid=4326)).values_list('id', flat=True).first()
+        if id != expected:
+            mismatches.append((lon, lat, id, expected))
+    return mismatches
@@ -1,3 +1,122 @@
-from django.test import TestCase
+import os
+import json
+import shutil
+import tempfile
+import unittest
 
-# Create your tests here.
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hansard.models import Person
+
+from .models import *
+from . import spatial, tiles
+from .utils import upsert_electorates
+
+try:
+    spatial.import_shapely()
+    HAS_SHAPELY = True
+except ImportError:
+    HAS_SHAPELY = False
+
+
+def electorate(elect_div, x, y):
+    return FederalElectorate2016.objects.create(
+        elect_div=elect_div, state='VIC', numccds=0, actual=0, projected=0, total_population=0, australians_over_18=0, area_sqkm=0, sortname=elect_div,
+        the_geom=MultiPolygon(Polygon.from_bbox((x, y, x + 1, y + 1)), srid=4326),
+    )
+
+
+@unittest.skipUnless(HAS_SHAPELY, 'shapely is not installed')
+class ElectorateIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.melbourne = electorate('Melbourne', 144, -38)
+        cls.batman = electorate('Batman', 145, -38)
+
+    def setUp(self):
+        spatial.reset_index()
+
+    def test_lookup(self):
+        points = [(144.5, -37.5), (145.5, -37.5), (150, -30), (145, -37.5)]
+        index = spatial.ElectorateIndex.from_database()
+        self.assertEqual(index.lookup(points), [self.melbourne.id, self.batman.id, None, None])
+        self.assertEqual(spatial.check_against_postgis(points, index), [])
+
+    def test_lookup_view(self):
+        response = self.client.post('/aec/electorates/lookup/', json.dumps({'points': [[145.5, -37.5], [0, 0]]}), content_type='application/json')
+        self.assertEqual(response.json()['electorates'], [{'id': self.batman.id, 'elect_div': 'Batman'}, None])
+        response = self.client.get('/aec/electorates/lookup/', {'lon': 144.5, 'lat': -37.5})
+        self.assertEqual(response.json()['electorates'][0]['elect_div'], 'Melbourne')
+        self.assertEqual(self.client.get('/aec/electorates/lookup/', {'lon': 'x'}).status_code, 400)
+
+
+class TileBoundsTest(SimpleTestCase):
+
+    def test_tile_bounds(self):
+        self.assertEqual(tiles.tile_bounds(0, 0, 0), (-tiles.ORIGIN_SHIFT, -tiles.ORIGIN_SHIFT, tiles.ORIGIN_SHIFT, tiles.ORIGIN_SHIFT))
+        self.assertEqual(tiles.tile_bounds(1, 1, 0), (0, 0, tiles.ORIGIN_SHIFT, tiles.ORIGIN_SHIFT))
+        self.assertEqual(tiles.zoom_level(5), 4)
+        self.assertFalse(tiles.valid_tile(2, 4, 0))
+
+
+class TileTest(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        self.settings = override_settings(AEC_TILE_CACHE_DIR=self.cache_dir)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        electorate('Melbourne', 144, -38)
+        tiles.simplify_electorates()
+
+    def test_simplified(self):
+        self.assertEqual(SimplifiedElectorate2016.objects.count(), len(tiles.ZOOM_LEVELS))
+
+    def test_tile_cache(self):
+        response = self.client.get('/aec/electorates/tiles/0/0/0.mvt')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        self.assertTrue(os.path.exists(tiles.tile_path(0, 0, 0)))
+        # Deterministic
+        self.assertEqual(tiles.render_tile(0, 0, 0), response.content)
+        self.assertEqual(self.client.get('/aec/electorates/tiles/0/0/0.mvt', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # Reloading the boundaries drops cached tiles
+        tiles.simplify_electorates()
+        self.assertFalse(os.path.exists(tiles.tile_path(0, 0, 0)))
+        self.assertEqual(self.client.get('/aec/electorates/tiles/1/2/0.mvt').status_code, 404)
+
+
+class UpsertElectoratesTest(TestCase):
+
+    def features(self, **changes):
+        features = []
+        for elect_div, x in (('Mcmillan', 145), ('Melbourne', 144)):
+            features.append(dict(
+                elect_div=elect_div, state='VIC', numccds=0, actual=0, projected=0, total_population=0, australians_over_18=0, area_sqkm=0, sortname=elect_div,
+                the_geom=MultiPolygon(Polygon.from_bbox((x, -38, x + 1, -37)), srid=4326),
+            ))
+            features[-1].update(changes.get(elect_div, {}))
+        return features
+
+    def test_upsert(self):
+        stats = upsert_electorates(self.features())
+        self.assertEqual((stats['created'], stats['updated']), (2, 0))
+        # Spelling fixed before insert
+        melbourne = FederalElectorate2016.objects.get(elect_div='Melbourne')
+        mcmillan = FederalElectorate2016.objects.get(elect_div='McMillan')
+        person = Person.objects.create(name_id='R36', name='Bandt, Adam, MP', party='AG', electorate=melbourne)
+
+        stats = upsert_electorates(self.features(Melbourne={'actual': 100000}))
+        self.assertEqual((stats['created'], stats['updated'], stats['unchanged']), (0, 1, 1))
+        self.assertEqual(FederalElectorate2016.objects.get(id=melbourne.id).actual, 100000)
+        self.assertEqual(FederalElectorate2016.objects.get(elect_div='McMillan').id, mcmillan.id)
+        self.assertEqual(Person.objects.get(id=person.id).electorate_id, melbourne.id)
+
+        # Missing from the file: kept
+        stats = upsert_electorates(self.features()[1:])
+        self.assertEqual(stats['missing'], 1)
+        self.assertTrue(FederalElectorate2016.objects.filter(id=mcmillan.id).exists())
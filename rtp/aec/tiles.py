@@ -0,0 +1,124 @@
+import os
+import shutil
+import logging
+import tempfile
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon
+from django.db import connection, transaction
+
+from .models import *
+
+logger = logging.getLogger(__name__)
+
+
+# Electorate boundaries as Mapbox Vector Tiles
+# Tiles are drawn from geometries simplified once per zoom level (SimplifiedElectorate2016) rather than the full
+# resolution boundaries, and cached on disk until the boundaries are reloaded
+
+# Zoom levels simplified geometries are stored for, a tile uses the closest one at or below its own zoom
+ZOOM_LEVELS = (0, 4, 6, 8, 10, 12)
+MAX_ZOOM = 18
+TILE_EXTENT = 4096
+LAYER_NAME = 'electorates'
+
+# Half the circumference of the earth, in web mercator metres
+ORIGIN_SHIFT = 20037508.342789244
+
+
+# Size of a pixel of a 256px tile at `zoom`, in metres: finer details can't be seen anyway
+def tolerance(zoom):
+    return 2 * ORIGIN_SHIFT / (256 * 2 ** zoom)
+
+
+def zoom_level(zoom):
+    return max(level for level in ZOOM_LEVELS if level <= zoom)
+
+
+# (xmin, ymin, xmax, ymax) of tile z/x/y in web mercator
+def tile_bounds(z, x, y):
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    xmin = -ORIGIN_SHIFT + x * size
+    ymax = ORIGIN_SHIFT - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+# Recomputes the simplified geometries of all electorates, then drops the cached tiles
+# Simplification preserves the topology of each geometry (no self intersections, no collapsed rings)
+def simplify_electorates(levels=ZOOM_LEVELS):
+    rows = []
+    for electorate in FederalElectorate2016.objects.order_by('id').iterator():
+        geom = electorate.the_geom.transform(3857, clone=True)
+        for zoom in levels:
+            simplified = geom.simplify(tolerance(zoom), preserve_topology=True)
+            if simplified.geom_type == 'Polygon':
+                simplified = MultiPolygon(simplified, srid=3857)
+            rows.append(SimplifiedElectorate2016(electorate=electorate, zoom=zoom, the_geom=simplified))
+        logger.debug("%s simplified" % (electorate.elect_div,))
+
+    with transaction.atomic():
+        SimplifiedElectorate2016.objects.all().delete()
+        SimplifiedElectorate2016.objects.bulk_create(rows, batch_size=100)
+    clear_tile_cache()
+    return len(rows)
+
+
+# Features are ordered by electorate so that a tile is always encoded the same way
+TILE_SQL = """
+SELECT ST_AsMVT(tile, %%s, %%s, 'geom') FROM (
+    SELECT e.id, e.elect_div, e.state,
+           ST_AsMVTGeom(s.the_geom, ST_MakeEnvelope(%%s, %%s, %%s, %%s, 3857), %%s, 64, true) AS geom
+    FROM %(simplified)s s
+    JOIN %(electorates)s e ON e.id = s.electorate_id
+    WHERE s.zoom = %%s AND s.the_geom && ST_MakeEnvelope(%%s, %%s, %%s, %%s, 3857)
+    ORDER BY e.id
+) AS tile
+WHERE geom IS NOT NULL
+"""
+
+
+def render_tile(z, x, y):
+    bounds = tile_bounds(z, x, y)
+    sql = TILE_SQL % {
+        'simplified': SimplifiedElectorate2016._meta.db_table,
+        'electorates': FederalElectorate2016._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [LAYER_NAME, TILE_EXTENT] + list(bounds) + [TILE_EXTENT, zoom_level(z)] + list(bounds))
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile is not None else b''
+
+
+def tile_path(z, x, y):
+    return os.path.join(settings.AEC_TILE_CACHE_DIR, str(z), str(x), '%s.mvt' % (y,))
+
+
+# Tile z/x/y, rendered on the first request then served from the disk cache
+def get_tile(z, x, y):
+    path = tile_path(z, x, y)
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except IOError:
+        pass
+
+    tile = render_tile(z, x, y)
+    # Written to a temporary file then renamed, so concurrent requests never read a partial tile
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(tile)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tile
+
+
+def clear_tile_cache():
+    shutil.rmtree(settings.AEC_TILE_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'aec'
+
+urlpatterns = [
+    path('electorates/lookup/', views.lookup, name='lookup'),
+    path('electorates/tiles/<int:z>/<int:x>/<int:y>.mvt', views.tile, name='tile'),
+]
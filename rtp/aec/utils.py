@@ -1,8 +1,86 @@
 import os
+import logging
+import collections
 
+from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.gis.utils import LayerMapping
+from django.db import transaction
 
 from .models import *
+from .spatial import reset_index
+from .tiles import simplify_electorates
+
+logger = logging.getLogger(__name__)
+
+
+# Fixing 2 spelling mistakes in the GIS dataset
+# Detected by comapring with eletcorates in TheyVoteForYou
+ELECT_DIV_FIXES = {
+    'Mcmillan': 'McMillan',
+    'Mcpherson': 'McPherson',
+}
+
+
+# Model field values of each feature of the boundaries file
+def read_boundaries(boundaries_file):
+    # Layer mapping
+    lm = LayerMapping(
+        FederalElectorate2016,
+        boundaries_file,
+        federal_electorate_2016_mapping,
+        transform=False,
+        encoding='iso-8859-1',
+    )
+    for feature in lm.layer:
+        fields = lm.feature_kwargs(feature)
+        fields['the_geom'] = GEOSGeometry(fields['the_geom'], srid=4326)
+        yield fields
+
+
+def changed_fields(electorate, fields):
+    changed = []
+    for name, value in fields.items():
+        current = getattr(electorate, name)
+        if name == 'the_geom' and current is not None:
+            # Same parsed coordinates, same binary form
+            if current.wkb != value.wkb:
+                changed.append(name)
+        elif current != value:
+            changed.append(name)
+    return changed
+
+
+# Inserts new electorates and updates changed ones, keyed on elect_div (spelling fixed), in a single transaction
+# Electorates missing from `features` are left alone (people still point to them)
+# Returns a count of electorates per outcome
+def upsert_electorates(features, batch_size=50):
+    stats = collections.Counter()
+    with transaction.atomic():
+        existing = {e.elect_div: e for e in FederalElectorate2016.objects.select_for_update()}
+        new, seen = [], set()
+        for fields in features:
+            fields = dict(fields, elect_div=ELECT_DIV_FIXES.get(fields['elect_div'], fields['elect_div']))
+            seen.add(fields['elect_div'])
+            electorate = existing.get(fields['elect_div'])
+            if electorate is None:
+                new.append(FederalElectorate2016(**fields))
+                continue
+            changed = changed_fields(electorate, fields)
+            if changed:
+                for name in changed:
+                    setattr(electorate, name, fields[name])
+                electorate.save(update_fields=changed)
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+        FederalElectorate2016.objects.bulk_create(new, batch_size=batch_size)
+        stats['created'] = len(new)
+
+    missing = set(existing) - seen
+    if missing:
+        logger.warning("Electorates missing from the boundaries file, kept: %s" % (', '.join(sorted(missing)),))
+    stats['missing'] = len(missing)
+    return stats
 
 
 def load_data_assets(load_boundaries=True):
@@ -10,20 +88,11 @@ def load_data_assets(load_boundaries=True):
     boundaries_file = os.path.join(aec_folder, 'national2016.shp')
 
     if load_boundaries:
-        FederalElectorate2016.objects.all().delete()
-        # Layer mapping
-        lm = LayerMapping(
-            FederalElectorate2016,
-            boundaries_file,
-            federal_electorate_2016_mapping,
-            transform=False,
-            encoding='iso-8859-1',
-        )
-        # Load
-        # strict=False allows us to skip features that can't be loaded
-        lm.save(strict=True, verbose=True)
-
-        # Fixing 2 spelling mistakes in the GIS dataset
-        # Detected by comapring with eletcorates in TheyVoteForYou
-        FederalElectorate2016.objects.filter(elect_div='Mcmillan').update(elect_div='McMillan')
-        FederalElectorate2016.objects.filter(elect_div='Mcpherson').update(elect_div='McPherson')
+        stats = upsert_electorates(list(read_boundaries(boundaries_file)))
+        logger.debug("Electorates: %s" % (dict(stats),))
+
+        # Derived data
+        if stats['created'] or stats['updated']:
+            simplify_electorates()
+            reset_index()
+        return stats
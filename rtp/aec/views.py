@@ -1,3 +1,60 @@
-from django.shortcuts import render
+import json
+import hashlib
 
-# Create your views here.
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .spatial import get_index
+from . import tiles
+
+# Largest batch accepted by lookup
+MAX_POINTS = 100000
+
+
+# GET /aec/electorates/lookup/?lon=&lat=
+# POST /aec/electorates/lookup/ {"points": [[lon, lat], ...]}
+# -> {"electorates": [{"id": ..., "elect_div": ...} or null, ...]} in the order of the points
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def lookup(request):
+    try:
+        if request.method == 'POST':
+            points = json.loads(request.body.decode('utf-8'))['points']
+        else:
+            points = [(float(request.GET['lon']), float(request.GET['lat']))]
+        if not isinstance(points, list) or any(len(point) != 2 for point in points):
+            raise ValueError("Points must be [lon, lat] pairs")
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'error': 'Invalid points: %s' % (e,)}, status=400)
+    if len(points) > MAX_POINTS:
+        return JsonResponse({'error': 'At most %s points per request' % (MAX_POINTS,)}, status=400)
+
+    try:
+        index = get_index()
+        ids = index.lookup(points) if points else []
+    except ImportError as e:
+        return JsonResponse({'error': str(e)}, status=501)
+    except ValueError as e:
+        return JsonResponse({'error': 'Invalid points: %s' % (e,)}, status=400)
+    return JsonResponse({
+        'electorates': [{'id': id, 'elect_div': index.names[id]} if id is not None else None for id in ids],
+    })
+
+
+# GET /aec/electorates/tiles/<z>/<x>/<y>.mvt
+@require_http_methods(['GET'])
+def tile(request, z, x, y):
+    if not tiles.valid_tile(z, x, y):
+        raise Http404("No tile %s/%s/%s" % (z, x, y))
+    content = tiles.get_tile(z, x, y)
+
+    # Tiles only change when the boundaries are reloaded
+    etag = '"%s"' % (hashlib.md5(content).hexdigest(),)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/vnd.mapbox-vector-tile')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
@@ -0,0 +1,133 @@
+import logging
+import collections
+
+import nltk
+
+from django.conf import settings
+
+from .models import *
+from .instrument import instrumented, stage
+from . import annotate, nlp
+
+logger = logging.getLogger(__name__)
+
+
+# Read-only analysis of ingested sentences, for any selection of sittings, dates, chamber or speaker
+# Sentences and their stored annotations are streamed from a server-side cursor in a single pass, and only counts are kept,
+# so memory use grows with the vocabulary rather than with the number of sentences
+# Unlike utils.analyse_hansard_file, nothing is parsed nor written: run annotate_hansards first for POS reports
+
+# (field, lookup) of the rows streamed
+ROW_FIELDS = (
+    ('talk_type', 'talk_type'),
+    ('party', 'spoken_by__party'),
+    ('name', 'spoken_by__name'),
+    ('the_words', 'the_words'),
+    ('tokens', 'annotation__tokens'),
+    ('pos', 'annotation__pos'),
+    ('lemmas', 'annotation__lemmas'),
+)
+
+
+def select_sentences(session=None, date_from=None, date_to=None, chamber=None, speaker=None):
+    sentences = Sentence.objects.all()
+    if session is not None:
+        sentences = sentences.filter(debate_ref__session=session)
+    if date_from is not None:
+        sentences = sentences.filter(debate_ref__session__date__gte=date_from)
+    if date_to is not None:
+        sentences = sentences.filter(debate_ref__session__date__lte=date_to)
+    if chamber is not None:
+        sentences = sentences.filter(debate_ref__session__chamber=chamber)
+    # Speakers by name_id, e.g. R36
+    if speaker is not None:
+        sentences = sentences.filter(spoken_by__name_id=speaker)
+    return sentences
+
+
+# Counts accumulated over streamed sentences, see the reports of utils.analysis_reports and utils.interjection_report
+class SentenceCounts(object):
+
+    def __init__(self, stoplist):
+        self.stoplist = stoplist
+        self.sentences = 0
+        # Sentences with no stored annotation: their words are tokenised on the fly, and have no POS tags
+        self.unannotated = 0
+        self.words = collections.Counter()
+        self.nouns = collections.Counter()
+        self.adjectives = collections.Counter()
+        self.verbs = collections.Counter()
+        # Sentences spoken within <interjection> elements, by party, or role (Speaker, President, ...) for people with no party
+        # Not comparable with utils.interjection_report, which counts the elements themselves: interjections with no text
+        # and "... interjecting" paragraphs are never stored as sentences
+        self.interjecting_sentences = collections.Counter()
+
+    def add(self, talk_type, party, name, the_words, tokens, pos, lemmas):
+        self.sentences += 1
+        if talk_type == 'interjection':
+            self.interjecting_sentences[party or name] += 1
+
+        if tokens is None:
+            self.unannotated += 1
+            tokens, pos, lemmas = nltk.word_tokenize(the_words), (), ()
+        self.words.update(token for token in tokens if token.lower() not in self.stoplist)
+        for word, tag, lemma in zip(tokens, pos, lemmas):
+            if tag == 'NN':
+                self.nouns[lemma] += 1
+            elif tag == 'JJ':
+                self.adjectives[lemma] += 1
+            elif tag[:2] == 'VB' and word not in nlp.MY_ABBREV:
+                self.verbs[lemma] += 1
+
+    def report(self, top=50):
+        return {
+            'sentences': self.sentences,
+            'unannotated': self.unannotated,
+            'words': self.words.most_common(top),
+            'nouns': self.nouns.most_common(top),
+            'adjectives': self.adjectives.most_common(top),
+            'verbs': self.verbs.most_common(top),
+            'interjecting_sentences': dict(self.interjecting_sentences),
+        }
+
+
+# Report of the given sentences: counts, most common words, nouns, adjectives and verbs, interjecting sentences and named entities
+def analyse_sentences(sentences, top=50, chunk_size=None):
+    counts = SentenceCounts(nlp.get_stoplist())
+    rows = sentences.order_by().values_list(*[lookup for field, lookup in ROW_FIELDS])
+    with stage('stream'):
+        for row in rows.iterator(chunk_size=chunk_size or settings.HANSARD_ANALYSIS_CHUNK_SIZE):
+            counts.add(*row)
+    report = counts.report(top)
+    # Aggregated by the database
+    with stage('entities'):
+        report['entities'] = annotate.entity_counts(sentences, top=20)
+    return report
+
+
+def log_report(report, title):
+    logger.info("%s: %s sentences (%s unannotated)" % (title, report['sentences'], report['unannotated']), extra={'subject': title, 'report': report})
+    for key in ('words', 'nouns', 'adjectives', 'verbs'):
+        logger.debug("%s: %s" % (key.title(), ", ".join([word for word, count in report[key]])))
+    logger.debug("%s interjecting sentences: %s" % (sum(report['interjecting_sentences'].values()), report['interjecting_sentences']))
+    for label, counts in report['entities'].items():
+        logger.debug("Named entities (%s): %s" % (label, ", ".join([text for text, count in counts])))
+
+
+# Analyses the selected sentences as a whole, or sitting by sitting if `per_sitting` is set
+# Returns [(title, report), ...]
+def analyse_stored(session=None, date_from=None, date_to=None, chamber=None, speaker=None, per_sitting=False, top=50, chunk_size=None):
+    sentences = select_sentences(session, date_from, date_to, chamber, speaker)
+    if per_sitting:
+        sessions = SessionReference.objects.filter(id__in=sentences.values('debate_ref__session_id')).order_by('date', 'chamber')
+        selections = [('%s %s' % (s.date, s.chamber), sentences.filter(debate_ref__session=s)) for s in sessions.iterator()]
+    else:
+        selections = [(' '.join(str(v) for v in (session, date_from, date_to, chamber, speaker) if v is not None) or 'All sentences', sentences)]
+
+    reports = []
+    for title, selection in selections:
+        with instrumented(title, trace_memory=False, profiler=False):
+            report = analyse_sentences(selection, top, chunk_size)
+        log_report(report, title)
+        reports.append((title, report))
+    return reports
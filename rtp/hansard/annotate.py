@@ -0,0 +1,115 @@
+import hashlib
+import logging
+
+import nltk
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Count, F, Func, Q
+
+from .models import *
+from . import nlp
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the way annotations are computed changes
+ANNOTATION_SCHEME = 1
+
+
+class MD5(Func):
+    function = 'MD5'
+    output_field = CharField()
+
+
+def words_hash(the_words):
+    return hashlib.md5(the_words.encode('utf-8')).hexdigest()
+
+
+# Identifies the models annotations were computed with, e.g. "1/nltk-3.3/en_core_web_sm-2.0.0"
+def annotation_version():
+    meta = nlp.get_spacy(disable=nlp.NER_DISABLE).meta
+    return "%s/nltk-%s/%s_%s-%s" % (ANNOTATION_SCHEME, nltk.__version__, meta['lang'], meta['name'], meta['version'])
+
+
+# Sentences that have no annotation yet, or whose words or models changed since
+def stale_sentences(queryset=None, version=None):
+    queryset = Sentence.objects.all() if queryset is None else queryset
+    version = version or annotation_version()
+    return queryset.annotate(words_hash=MD5('the_words')).filter(
+        Q(annotation__isnull=True) |
+        ~Q(annotation__content_hash=F('words_hash')) |
+        ~Q(annotation__model_version=version)
+    )
+
+
+def wordnet_pos(tag):
+    return {'J': 'a', 'V': 'v', 'R': 'r'}.get(tag[:1], 'n')
+
+
+def annotate_batch(sentences, version):
+    sent_tokenizer = nlp.get_sent_tokenizer()
+    lemmatizer = nlp.get_lemmatizer()
+
+    annotations = []
+    for sentence in sentences:
+        # TODO: improve sentence tokenizer - still far from good
+        tokens = [token for s in sent_tokenizer.tokenize(sentence.the_words) for token in nltk.word_tokenize(s)]
+        pos = [tag for word, tag in nltk.pos_tag(tokens)]
+        annotations.append(SentenceAnnotation(
+            sentence=sentence,
+            content_hash=words_hash(sentence.the_words),
+            model_version=version,
+            tokens=tokens,
+            lemmas=[lemmatizer.lemmatize(token, wordnet_pos(tag)) for token, tag in zip(tokens, pos)],
+            pos=pos,
+        ))
+
+    entities = [
+        NamedEntity(sentence_id=sentence_id, label=label, text=text[:255])
+        for sentence_id, label, text in nlp.extract_entities((s.the_words, s.id) for s in sentences)
+    ]
+
+    ids = [s.id for s in sentences]
+    with transaction.atomic():
+        SentenceAnnotation.objects.filter(sentence_id__in=ids).delete()
+        NamedEntity.objects.filter(sentence_id__in=ids).delete()
+        SentenceAnnotation.objects.bulk_create(annotations)
+        NamedEntity.objects.bulk_create(entities)
+
+
+# Annotates the new or changed sentences of `queryset` (default: all sentences), by batches of `batch_size`
+# Returns the number of sentences annotated
+def annotate_sentences(queryset=None, batch_size=None):
+    batch_size = batch_size or settings.HANSARD_ANNOTATION_BATCH_SIZE
+    version = annotation_version()
+    stale = stale_sentences(queryset, version).only('id', 'the_words').order_by('id')
+
+    count, last_id = 0, 0
+    while 1:
+        batch = list(stale.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        annotate_batch(batch, version)
+        count += len(batch)
+        last_id = batch[-1].id
+        logger.debug("%s sentences annotated" % (count,))
+    return count
+
+
+# Reports straight from the stored annotations
+
+# (word, tag, lemma) triples of the given sentences
+def annotated_tokens(sentences):
+    for tokens, pos, lemmas in SentenceAnnotation.objects.filter(sentence__in=sentences).values_list('tokens', 'pos', 'lemmas').iterator():
+        yield from zip(tokens, pos, lemmas)
+
+
+# {label: [(text, count), ...]} of the given sentences, most frequent first
+def entity_counts(sentences, top=20):
+    counts = {}
+    rows = NamedEntity.objects.filter(sentence__in=sentences).values_list('label', 'text').annotate(count=Count('id')).order_by('label', '-count', 'text')
+    for label, text, count in rows:
+        if len(counts.setdefault(label, [])) < top:
+            counts[label].append((text, count))
+    return counts
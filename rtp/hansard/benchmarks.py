@@ -0,0 +1,251 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import datetime
+import platform
+import resource
+import tempfile
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from .models import *
+from .parsers import *
+from .synthetic import SIZES, generate_sitting_day
+from .analysis import analyse_sentences
+from . import annotate, nlp, utils
+
+logger = logging.getLogger(__name__)
+
+
+# Benchmarks of the hansard pipeline over synthetic sitting days (see hansard.synthetic)
+# Each benchmark is run `repeat` times and its fastest run kept; database writes are rolled back after each run
+# Results are plain dicts, saved as JSON so that runs can be compared with compare_results
+
+BENCHMARKS = ('parse', 'ingest', 'nlp', 'analyse', 'analyse_stored')
+# Synthetic sitting days are dated far in the future, so as not to collide with ingested ones
+SYNTHETIC_FROM = datetime.date(2100, 1, 1)
+
+
+# Peak resident set size of the process so far, in KiB (Linux) or bytes (macOS)
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Run(object):
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0
+
+    def __enter__(self):
+        self.capture = CaptureQueriesContext(connection)
+        self.capture.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.start
+        self.capture.__exit__(*exc_info)
+        self.queries = len(self.capture.captured_queries)
+
+
+def result(name, size, engine, runs, files, items, unit):
+    best = min(runs, key=lambda run: run.seconds)
+    return {
+        'benchmark': name,
+        'size': size,
+        'engine': engine,
+        'files': files,
+        unit: items,
+        'seconds': round(best.seconds, 4),
+        'files_per_s': round(files / best.seconds, 3) if files else None,
+        '%s_per_s' % (unit,): round(items / best.seconds, 1),
+        'queries_per_file': round(best.queries / files, 1) if files else None,
+        'peak_rss': peak_rss(),
+    }
+
+
+def rolled_back(function):
+    with transaction.atomic():
+        value = function()
+        transaction.set_rollback(True)
+    return value
+
+
+def count_paragraphs(records):
+    return sum(len(record[1]) for kind, record in records if kind == 'talk')
+
+
+# Parsing only: no database
+def bench_parse(files, size, engine, repeat):
+    def parse():
+        paragraphs = 0
+        for xml in files:
+            records = soup_records(load_soup(io.BytesIO(xml))) if engine == 'soup' else lxml_records(io.BytesIO(xml))
+            paragraphs += count_paragraphs(records)
+        return paragraphs
+
+    runs = []
+    for i in range(repeat):
+        with Run() as run:
+            paragraphs = parse()
+        runs.append(run)
+    stats = result('parse', size, engine, runs, len(files), paragraphs, 'paragraphs')
+
+    # Python allocations, in an extra run as tracing slows everything down
+    tracemalloc.start()
+    parse()
+    stats['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return stats
+
+
+# load_hansard: parsing, persistence and term frequencies
+def bench_ingest(paths, size, engine, repeat):
+    runs, paragraphs = [], 0
+    for i in range(repeat):
+        def ingest():
+            with Run() as run:
+                count = sum(len(utils.load_hansard(path, engine=engine)[1]) for path in paths)
+            return run, count
+        run, paragraphs = rolled_back(ingest)
+        runs.append(run)
+    return result('ingest', size, engine, runs, len(paths), paragraphs, 'paragraphs')
+
+
+# Annotation of freshly ingested sentences (tokens, POS, lemmas, named entities)
+def bench_nlp(paths, size, repeat):
+    nlp.warm(spacy_disable=nlp.NER_DISABLE)
+    runs, sentences = [], 0
+    for i in range(repeat):
+        def annotate_all():
+            for path in paths:
+                utils.load_hansard(path, engine='lxml')
+            sessions = SessionReference.objects.filter(date__gte=SYNTHETIC_FROM)
+            with Run() as run:
+                count = annotate.annotate_sentences(Sentence.objects.filter(debate_ref__session__in=sessions))
+            return run, count
+        run, sentences = rolled_back(annotate_all)
+        runs.append(run)
+    return result('nlp', size, None, runs, len(paths), sentences, 'sentences')
+
+
+# analyse_hansard_file, annotations included
+def bench_analyse(paths, size, repeat):
+    nlp.warm(spacy_disable=nlp.NER_DISABLE)
+    runs = []
+    for i in range(repeat):
+        def analyse():
+            with Run() as run:
+                for path in paths:
+                    utils.analyse_hansard_file(path)
+            return run
+        runs.append(rolled_back(analyse))
+    return result('analyse', size, 'soup', runs, len(paths), len(paths), 'files')
+
+
+# hansard.analysis over the stored, annotated sentences: read-only
+def bench_analyse_stored(paths, size, repeat):
+    nlp.warm(spacy_disable=nlp.NER_DISABLE)
+    def analyse_all():
+        for path in paths:
+            utils.load_hansard(path, engine='lxml')
+        sentences = Sentence.objects.filter(debate_ref__session__date__gte=SYNTHETIC_FROM)
+        annotate.annotate_sentences(sentences)
+        runs = []
+        for i in range(repeat):
+            with Run() as run:
+                report = analyse_sentences(sentences)
+            runs.append(run)
+        return runs, report['sentences']
+    runs, sentences = rolled_back(analyse_all)
+    return result('analyse_stored', size, None, runs, len(paths), sentences, 'sentences')
+
+
+# Writes `count` synthetic sitting days of a size to `folder`, named like the published files
+def write_sitting_days(folder, size, count, electorates):
+    paths = []
+    for i in range(count):
+        date = SYNTHETIC_FROM + datetime.timedelta(days=i)
+        path = os.path.join(folder, 'House_of_Representatives_%s_%s.xml' % (date.strftime('%Y_%m_%d'), 9000 + i))
+        with open(path, 'wb') as f:
+            f.write(generate_sitting_day(size, seed=i, date=date, electorates=electorates))
+        paths.append(path)
+    return paths
+
+
+def run_benchmarks(sizes=('small', 'medium'), files=3, repeat=3, engines=ENGINES, benchmarks=BENCHMARKS):
+    started_at = datetime.datetime.now()
+    electorates = list(FederalElectorate2016.objects.order_by('elect_div').values_list('elect_div', flat=True))
+    results = []
+    folder = tempfile.mkdtemp(prefix='hansard-bench-')
+    try:
+        for size in sizes:
+            paths = write_sitting_days(folder, size, files, electorates)
+            sources = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    sources.append(f.read())
+
+            for engine in engines:
+                if 'parse' in benchmarks:
+                    results.append(bench_parse(sources, size, engine, repeat))
+                if 'ingest' in benchmarks:
+                    results.append(bench_ingest(paths, size, engine, repeat))
+            if 'nlp' in benchmarks:
+                results.append(bench_nlp(paths, size, repeat))
+            if 'analyse' in benchmarks:
+                results.append(bench_analyse(paths, size, repeat))
+            if 'analyse_stored' in benchmarks:
+                results.append(bench_analyse_stored(paths, size, repeat))
+            for stats in results:
+                if stats['size'] == size:
+                    logger.debug("%s" % (stats,))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        'started_at': started_at.isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sizes': {size: SIZES[size] for size in sizes},
+        'files': files,
+        'repeat': repeat,
+        'batch_size': settings.HANSARD_SENTENCE_BATCH_SIZE,
+        'results': results,
+    }
+
+
+def save_results(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+def load_results(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+# Regressions of `current` over `baseline`, as [(benchmark, size, engine, metric, before, after), ...]
+# A throughput more than `tolerance` lower, or more queries per file, counts as a regression
+def compare_results(baseline, current, tolerance=0.1):
+    key = lambda stats: (stats['benchmark'], stats['size'], stats['engine'])
+    before = {key(stats): stats for stats in baseline['results']}
+    regressions = []
+    for stats in current['results']:
+        old = before.get(key(stats))
+        if old is None:
+            continue
+        for metric, value in stats.items():
+            if metric.endswith('_per_s') and value and old.get(metric) and value < old[metric] * (1 - tolerance):
+                regressions.append(key(stats) + (metric, old[metric], value))
+        if stats['queries_per_file'] is not None and old.get('queries_per_file') is not None and stats['queries_per_file'] > old['queries_per_file']:
+            regressions.append(key(stats) + ('queries_per_file', old['queries_per_file'], stats['queries_per_file']))
+    return regressions
@@ -0,0 +1,191 @@
+import os
+import json
+import logging
+import datetime
+import tempfile
+import threading
+import collections
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+from .instrument import instrumented, stage
+from .repair import CHUNK_SIZE, iter_repaired
+
+logger = logging.getLogger(__name__)
+
+
+# Target file name of a hansard XML link, e.g.
+# .../toc_unixml/House%20of%20Representatives_2018_05_10_6091_Official.xml;fileType=text%2Fxml
+# -> House_of_Representatives_2018_05_10_6091.xml
+def link_filename(url):
+    return url.split('/')[-1].split(';')[0].replace('%20', '_').replace('_Official','')
+
+
+# Downloads the hansard XML files of all sitting weeks in a date range
+# - a single pooled requests.Session with retries, shared by a bounded pool of threads
+# - at most `per_host` concurrent requests to any one host
+# - files already on disk are skipped, or revalidated with ETag / If-Modified-Since if `revalidate` is set
+# - files are written to a temporary file then renamed, so an interrupted run can simply be resumed
+# - encoding damage is repaired while streaming each file to disk, rewritten sequences being counted in `repairs`
+class HansardDownloader(object):
+    # ETag / Last-Modified of previously fetched URLs, kept next to the downloaded files
+    VALIDATORS_FILE = '.download_cache.json'
+
+    def __init__(self, base_url='https://www.aph.gov.au', folder='hansard/data/raw', workers=8, per_host=4, revalidate=False, timeout=60):
+        self.base_url = base_url
+        self.folder = folder
+        self.workers = workers
+        self.per_host = per_host
+        self.revalidate = revalidate
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.lock = threading.Lock()
+        self.host_limits = {}
+        self.validators = self.load_validators()
+        self.repairs = collections.Counter()
+
+    # Only those of downloaded files are kept
+    def load_validators(self):
+        try:
+            with open(os.path.join(self.folder, self.VALIDATORS_FILE)) as f:
+                return {url: v for url, v in json.load(f).items() if v.get('filename')}
+        except (IOError, ValueError):
+            return {}
+
+    def save_validators(self):
+        with self.lock:
+            self.write_atomic(self.VALIDATORS_FILE, [json.dumps(self.validators, indent=1, sort_keys=True)])
+
+    # Writes text chunks to a temporary file, then moves it in place
+    def write_atomic(self, filename, chunks):
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix='.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp, os.path.join(self.folder, filename))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    # Downloads run in threads: neither memory tracing nor profiling, which are process-wide
+    def instrumented(self, subject):
+        return instrumented(subject, trace_memory=False, profiler=False, database=False)
+
+    def host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    # Returns the response, or None if the server answered 304 Not Modified to a conditional request
+    # The validators of the response are recorded if `record` is set, i.e. for files that may be revalidated
+    # Callers hold the host_limit() of the url until they're done with the response
+    def get(self, url, conditional=False, stream=False, record=False):
+        headers = {}
+        validators = self.validators.get(url, {})
+        if conditional and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if conditional and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+        if response.status_code == 304:
+            response.close()
+            return None
+        response.raise_for_status()
+
+        if not record:
+            return response
+        with self.lock:
+            self.validators[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'filename': validators.get('filename'),
+            }
+        return response
+
+    # All links to XML documents of the sitting week starting on `day`
+    def sitting_week_links(self, day):
+        sitting_week = "%s/Parliamentary_Business/Hansard?wc=%s" % (self.base_url, day.strftime('%d/%m/%Y'))
+        logger.debug("Scraping %s" % (sitting_week,))
+        try:
+            with self.host_limit(sitting_week), self.instrumented(sitting_week), stage('scrape'):
+                page = self.get(sitting_week)
+        except requests.RequestException as e:
+            logger.error("Couldn't scrape %s: %s" % (sitting_week, e))
+            return []
+
+        soup = BeautifulSoup(page.text, 'html.parser')
+        heading = soup.find('h2')
+        if heading is None:
+            return []
+        return [urljoin(self.base_url, a['href']) for a in heading.parent.find_all('a', attrs={'title': 'XML format'})]
+
+    # Name of the file a url is (or would be) downloaded to, within `folder`
+    def local_filename(self, url):
+        return self.validators.get(url, {}).get('filename') or link_filename(url)
+
+    # Returns one of 'downloaded', 'not modified', 'skipped' or 'failed'
+    # Links may redirect to the file, which is named after the url it's served from: that name is recorded along with
+    # the validators before the file is written, so that the next run finds it even if this one is interrupted
+    def download(self, url):
+        filename = self.local_filename(url)
+        on_disk = filename.lower().endswith('.xml') and os.path.exists(os.path.join(self.folder, filename))
+        if on_disk and not self.revalidate:
+            return 'skipped'
+
+        report = collections.Counter()
+        try:
+            with self.host_limit(url), self.instrumented(filename), stage('download'):
+                hansard = self.get(url, conditional=on_disk, stream=True, record=True)
+                if hansard is None:
+                    return 'not modified'
+                with hansard:
+                    filename = link_filename(hansard.url)
+                    with self.lock:
+                        self.validators[url]['filename'] = filename
+                    self.save_validators()
+                    self.write_atomic(filename, iter_repaired(hansard.iter_content(CHUNK_SIZE), report=report))
+        except (requests.RequestException, IOError) as e:
+            logger.error("Couldn't download %s: %s" % (url, e))
+            return 'failed'
+
+        with self.lock:
+            self.repairs.update(report)
+        logger.debug("Downloaded %s" % (filename,))
+        return 'downloaded'
+
+    # Returns a count of downloads per outcome
+    def run(self, date_from=datetime.date(2016, 8, 30), date_to=None):
+        if date_to is None:
+            date_to = datetime.date.today()
+        os.makedirs(self.folder, exist_ok=True)
+
+        stats = collections.Counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            weeks = [pool.submit(self.sitting_week_links, date_from + datetime.timedelta(days=x * 7)) for x in range((date_to - date_from).days // 7 + 1)]
+            seen, downloads = set(), []
+            for week in as_completed(weeks):
+                for url in week.result():
+                    if url not in seen:
+                        seen.add(url)
+                        downloads.append(pool.submit(self.download, url))
+            for download in as_completed(downloads):
+                stats[download.result()] += 1
+
+        logger.debug("Hansard downloads: %s, repaired sequences: %s" % (dict(stats), dict(self.repairs)))
+        return stats
@@ -0,0 +1,154 @@
+import io
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import *
+
+
+# Bulk export of the sentence corpus, joined with sitting, debate and speaker
+# Rows are streamed from a server-side cursor and written out chunk by chunk, so memory use doesn't grow with the corpus
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# (column, lookup)
+COLUMNS = (
+    ('sentence_id', 'id'),
+    ('date', 'debate_ref__session__date'),
+    ('chamber', 'debate_ref__session__chamber'),
+    ('parliament_no', 'debate_ref__session__parliament_no'),
+    ('session_no', 'debate_ref__session__session_no'),
+    ('period_no', 'debate_ref__session__period_no'),
+    ('debate_id', 'debate_ref_id'),
+    ('debate_title', 'debate_ref__debate_title'),
+    ('subdebate1_title', 'debate_ref__subdebate1_title'),
+    ('subdebate2_title', 'debate_ref__subdebate2_title'),
+    ('speaker_id', 'spoken_by__name_id'),
+    ('speaker', 'spoken_by__name'),
+    ('party', 'spoken_by__party'),
+    ('electorate', 'spoken_by__electorate__elect_div'),
+    ('time_talk_started', 'time_talk_started'),
+    ('talk_type', 'talk_type'),
+    ('the_words', 'the_words'),
+)
+
+HEADER = [column for column, lookup in COLUMNS]
+
+
+# Tuples of COLUMNS values, in sentence order
+def export_rows(date_from=None, date_to=None, chamber=None, chunk_size=None):
+    sentences = Sentence.objects.all()
+    if date_from is not None:
+        sentences = sentences.filter(debate_ref__session__date__gte=date_from)
+    if date_to is not None:
+        sentences = sentences.filter(debate_ref__session__date__lte=date_to)
+    if chamber is not None:
+        sentences = sentences.filter(debate_ref__session__chamber=chamber)
+    rows = sentences.order_by('id').values_list(*[lookup for column, lookup in COLUMNS])
+    return rows.iterator(chunk_size=chunk_size or settings.HANSARD_EXPORT_CHUNK_SIZE)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for batch in batched(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def jsonl_chunks(rows, batch_size):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for batch in batched(rows, batch_size):
+        yield ''.join(encoder.encode(dict(zip(HEADER, row))) + '\n' for row in batch)
+
+
+# Write-only file handing over to the caller whatever was written since the last drain()
+# pyarrow needs tell() to keep counting from the start of the file to write the footer offsets
+class DrainingSink(object):
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+# Optional dependency, only needed for parquet exports
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet exports need pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+# One parquet row group per batch
+def parquet_chunks(rows, batch_size):
+    pa, pq = import_pyarrow()
+
+    types = {'sentence_id': pa.int64(), 'parliament_no': pa.int32(), 'session_no': pa.int32(), 'period_no': pa.int32(), 'debate_id': pa.int64(), 'date': pa.date32()}
+    schema = pa.schema([pa.field(column, types.get(column, pa.string())) for column in HEADER])
+
+    sink = DrainingSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in batched(rows, batch_size):
+        columns = list(zip(*batch))
+        # Times as HH:MM:SS text
+        times = HEADER.index('time_talk_started')
+        columns[times] = [t.isoformat() if t is not None else None for t in columns[times]]
+        writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# Chunks of the export (str for csv and jsonl, bytes for parquet)
+def export_chunks(format, rows, batch_size=None):
+    if format not in FORMATS:
+        raise ValueError("Unknown export format %s, expected one of %s" % (format, ', '.join(FORMATS)))
+    if format == 'parquet':
+        # Fail before anything is streamed
+        import_pyarrow()
+    batch_size = batch_size or settings.HANSARD_EXPORT_CHUNK_SIZE
+    return {'csv': csv_chunks, 'jsonl': jsonl_chunks, 'parquet': parquet_chunks}[format](rows, batch_size)
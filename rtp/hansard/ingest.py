@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import datetime
+import collections
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Value, When
+
+from .models import *
+
+logger = logging.getLogger(__name__)
+
+
+# Ingest-scoped helpers used by hansard.utils.parse_hansard
+# A new instance is created for every file being parsed
+
+
+SENTENCE_FIELDS = ('spoken_by', 'time_talk_started', 'talk_type', 'first_speech', 'the_words', 'content_hash')
+
+# Start time of a paragraph as cleaned by parsers.clean_time, None if it can't be made sense of
+# Besides "14:01", copes with a missing colon ("1401") or missing minutes ("14")
+def talk_time(value):
+    if value is None or isinstance(value, datetime.time):
+        return value
+    try:
+        return Sentence._meta.get_field('time_talk_started').to_python(value)
+    except ValidationError:
+        pass
+    digits = value.replace(':', '')
+    # No hour in e.g. ":01"
+    if digits.isdigit() and len(digits) <= 4 and not value.startswith(':'):
+        hour, minute = (int(digits[:-2]), int(digits[-2:])) if len(digits) > 2 else (int(digits), 0)
+        if hour < 24 and minute < 60:
+            return datetime.time(hour, minute)
+    logger.debug("Unreadable time: %r" % (value,))
+    return None
+
+
+# Content hash of a Sentence row: md5 of its speaker, talk type, start time, first speech flag and words
+# Computed the same way by PostgreSQL in migration 0014
+def sentence_hash(sentence):
+    started = talk_time(sentence.time_talk_started)
+    return hashlib.md5('|'.join((
+        str(sentence.spoken_by_id),
+        sentence.talk_type,
+        str(started) if started is not None else '',
+        'true' if sentence.first_speech else 'false',
+        sentence.the_words,
+    )).encode('utf-8')).hexdigest()
+
+
+# Writes the Sentence rows of a file, diffed against the rows of the previous ingest
+# A sentence is matched with a previous row of its debate reference on its content hash first, so that a paragraph
+# inserted or removed mid-debate only moves the rows after it (keeping their ids and annotations), and on its position
+# otherwise: once the whole file is read, the remaining sentences are updated in place at the positions still free,
+# or inserted with bulk_create, and the previous rows left over deleted, so an unchanged file writes no sentence
+class SentenceWriter(object):
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.HANSARD_SENTENCE_BATCH_SIZE
+        self.pending = []
+        # debate_ref_id -> {position: (id, content_hash)} of previous rows not matched yet
+        self.previous = {}
+        # debate_ref_id -> {content_hash: deque of positions} of the same rows, in file order
+        self.hashes = {}
+        # Sentences of debates with previous rows that no previous row has the content of, see finish
+        self.changed = []
+        # (id, position) of previous rows matched at another position
+        self.moved = []
+        self.positions = collections.Counter()
+        self.counts = collections.Counter()
+
+    # Loads the rows a debate reference holds from a previous ingest, see DebateCache.get
+    def load_debate(self, debate_id):
+        rows = Sentence.objects.filter(debate_ref_id=debate_id).order_by('position').values_list('id', 'position', 'content_hash')
+        self.previous[debate_id] = {}
+        self.hashes[debate_id] = collections.defaultdict(collections.deque)
+        for id, position, content_hash in rows:
+            self.previous[debate_id][position] = (id, content_hash)
+            self.hashes[debate_id][content_hash].append(position)
+
+    # Takes the first previous row of the debate with the given content that isn't matched yet
+    def match_hash(self, debate_id, content_hash):
+        previous, positions = self.previous[debate_id], self.hashes[debate_id].get(content_hash)
+        while positions:
+            position = positions.popleft()
+            if position in previous:
+                return position, previous.pop(position)[0]
+        return None
+
+    # Returns the Sentence, which gets its id once flushed if it's new or changed
+    def add(self, speech):
+        sentence = Sentence(**speech)
+        debate_id = sentence.debate_ref_id
+        sentence.position = self.positions[debate_id]
+        self.positions[debate_id] += 1
+        sentence.content_hash = sentence_hash(sentence)
+
+        if not self.previous.get(debate_id):
+            self.insert(sentence)
+            return sentence
+
+        match = self.match_hash(debate_id, sentence.content_hash)
+        if match is None:
+            self.changed.append(sentence)
+            return sentence
+
+        position, sentence.id = match
+        sentence._state.adding = False
+        if position != sentence.position:
+            self.moved.append((sentence.id, sentence.position))
+        self.counts['unchanged'] += 1
+        return sentence
+
+    def insert(self, sentence):
+        self.pending.append(sentence)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            Sentence.objects.bulk_create(self.pending, batch_size=self.batch_size)
+            self.counts['inserted'] += len(self.pending)
+            self.pending = []
+
+    # Falls back on positions for the changed sentences, inserts the ones left and deletes the previous rows that weren't met again,
+    # as well as the debate references of `removed` (see DebateCache.unseen) along with their sentences
+    def finish(self, removed=()):
+        for sentence in self.changed:
+            previous = self.previous[sentence.debate_ref_id].pop(sentence.position, None)
+            if previous is None:
+                self.insert(sentence)
+                continue
+            sentence.id = previous[0]
+            sentence._state.adding = False
+            sentence.save(update_fields=SENTENCE_FIELDS)
+            self.counts['updated'] += 1
+        self.changed = []
+        self.flush()
+
+        # Positions only: one query per batch
+        for i in range(0, len(self.moved), self.batch_size):
+            batch = self.moved[i:i + self.batch_size]
+            Sentence.objects.filter(id__in=[id for id, position in batch]).update(
+                position=Case(*[When(id=id, then=Value(position)) for id, position in batch], output_field=models.IntegerField()))
+        self.moved = []
+
+        stale = [id for rows in self.previous.values() for id, content_hash in rows.values()]
+        for i in range(0, len(stale), self.batch_size):
+            Sentence.objects.filter(id__in=stale[i:i + self.batch_size]).delete()
+        self.counts['deleted'] += len(stale)
+        self.previous = {}
+        self.hashes = {}
+
+        for i in range(0, len(removed), self.batch_size):
+            batch = removed[i:i + self.batch_size]
+            deleted, per_model = Sentence.objects.filter(debate_ref_id__in=batch).delete()
+            self.counts['deleted'] += per_model.get(Sentence._meta.label, 0)
+            DebateReference.objects.filter(id__in=batch).delete()
+
+    # Numbers of sentences inserted, updated, deleted and unchanged
+    def stats(self):
+        return {change: self.counts[change] for change in ('inserted', 'updated', 'deleted', 'unchanged')}
+
+
+# Person lookups keyed on name_id, with all electorates preloaded in a single query
+# A Person is only written when its name, party or electorate changed
+class PersonCache(object):
+
+    def __init__(self):
+        # No need for the boundaries here
+        self.electorates = {e.elect_div: e for e in FederalElectorate2016.objects.defer('the_geom')}
+        self.people = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, name_id, name, party, electorate):
+        person = {'name': name, 'party': party}
+        # Senate members don't have a federal electorate
+        if len(electorate) > 0:
+            # Compared on ids so that cached people never need to fetch their electorate
+            try:
+                person['electorate_id'] = self.electorates[electorate].id
+            except KeyError:
+                raise FederalElectorate2016.DoesNotExist("Unknown electorate: %s" % electorate)
+
+        pobj = self.people.get(name_id)
+        if pobj is None:
+            self.misses += 1
+            pobj = Person.objects.filter(name_id=name_id).first()
+            if pobj is None:
+                pobj, created = self.create(name_id, person)
+                self.people[name_id] = pobj
+                if created:
+                    self.writes += 1
+                    return pobj
+            self.people[name_id] = pobj
+        else:
+            self.hits += 1
+
+        changed = [field for field, value in person.items() if getattr(pobj, field) != value]
+        if changed:
+            for field in changed:
+                setattr(pobj, field, person[field])
+            pobj.save(update_fields=changed)
+            self.writes += 1
+        return pobj
+
+    # Files are ingested concurrently: another worker may create the same person between the lookup and the insert
+    # The insert runs in a savepoint so that losing the race doesn't roll back the whole file
+    def create(self, name_id, person):
+        try:
+            with transaction.atomic():
+                return Person.objects.create(name_id=name_id, **person), True
+        except IntegrityError:
+            return Person.objects.get(name_id=name_id), False
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+
+DEBATE_FIELDS = ('debate_title', 'debate_page_no', 'subdebate1_title', 'subdebate1_page_no', 'subdebate2_title', 'subdebate2_page_no')
+
+# DebateReference lookups within a session, existing references being loaded in a single query
+# Each distinct (sub)debate is resolved once, new ones are inserted the first time they're seen
+class DebateCache(object):
+
+    def __init__(self, session):
+        self.session = session
+        self.debates = {self.key(vars(d)): d for d in DebateReference.objects.filter(session=session)}
+        self.seen = set()
+        self.hits = 0
+        self.created = 0
+
+    @staticmethod
+    def key(params):
+        return tuple(params[field] for field in DEBATE_FIELDS)
+
+    # Returns the DebateReference and whether it may hold sentences from a previous ingest,
+    # i.e. it already existed and it's the first time it's seen in this file
+    def get(self, params):
+        key = self.key(params)
+        dobj = self.debates.get(key)
+        if dobj is None:
+            dobj = DebateReference.objects.create(session=self.session, **dict(zip(DEBATE_FIELDS, key)))
+            self.debates[key] = dobj
+            self.seen.add(key)
+            self.created += 1
+        else:
+            self.hits += 1
+
+        stale = key not in self.seen
+        self.seen.add(key)
+        return dobj, stale
+
+    # Ids of the session's debate references the file didn't have, once it's been read
+    def unseen(self):
+        return [dobj.id for key, dobj in self.debates.items() if key not in self.seen]
+
+    def stats(self):
+        return {'hits': self.hits, 'created': self.created}
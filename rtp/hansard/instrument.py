@@ -0,0 +1,193 @@
+import os
+import time
+import logging
+import threading
+import contextlib
+import collections
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+# Per-stage instrumentation of the hansard pipeline
+# Work on a unit (a file, a download) is wrapped in `instrumented(subject)`, its steps in `stage(name)`:
+# each stage records its wall time, database queries, rows written and, if memory is traced, tracemalloc peak
+# One structured log record per stage is emitted when the unit is done, e.g. for a JSON log formatter:
+#   extra={'subject': ..., 'stage': ..., 'calls': ..., 'seconds': ..., 'queries': ..., 'rows': ..., 'memory_peak': ...}
+# Stages run outside of `instrumented` cost next to nothing
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_local = threading.local()
+
+
+# Counts the queries run on a connection, and the rows they wrote (see Django's connection.execute_wrapper)
+class QueryCounter(object):
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.rows += max(0, context['cursor'].rowcount)
+        return result
+
+
+class StageStats(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.memory_peak = None
+
+
+# Stages of one subject, by name, in the order they were first entered
+class Instrument(object):
+
+    def __init__(self, subject, counter=None):
+        self.subject = subject
+        self.counter = counter
+        self.stages = collections.OrderedDict()
+
+    def counts(self):
+        return (self.counter.queries, self.counter.rows) if self.counter else (0, 0)
+
+    def record(self, name, seconds, queries=0, rows=0, memory_peak=None):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.queries += queries
+        stats.rows += rows
+        if memory_peak is not None:
+            stats.memory_peak = max(stats.memory_peak or 0, memory_peak)
+
+    def summary(self):
+        return [dict(vars(stats), stage=name) for name, stats in self.stages.items()]
+
+    def log(self):
+        for stats in self.summary():
+            logger.info("%s %s: %s calls, %.3fs, %s queries, %s rows, memory peak %s" % (
+                self.subject, stats['stage'], stats['calls'], stats['seconds'], stats['queries'], stats['rows'], stats['memory_peak']),
+                extra=dict(stats, subject=self.subject))
+
+
+def current():
+    return getattr(_local, 'instrument', None)
+
+
+def _profile_filename(subject, extension):
+    folder = settings.HANSARD_PROFILE_DIR
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, os.path.basename(subject) + extension)
+
+
+# Starts the given profiler, returning a function that stops it and saves its results
+def _start_profiler(profiler, subject):
+    if profiler == 'cprofile':
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+        def stop():
+            profile.disable()
+            profile.dump_stats(_profile_filename(subject, '.prof'))
+        return stop
+    elif profiler == 'pyinstrument':
+        # Optional dependency
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("The pyinstrument profiler isn't installed (pip install pyinstrument)")
+
+        profile = Profiler()
+        profile.start()
+        def stop():
+            profile.stop()
+            with open(_profile_filename(subject, '.html'), 'w') as f:
+                f.write(profile.output_html())
+        return stop
+    raise ValueError("Unknown profiler: %s (expected one of %s)" % (profiler, ', '.join(PROFILERS)))
+
+
+# Instruments the work done on `subject` within the block, logging its stages at the end
+# trace_memory and profiler default to the HANSARD_TRACE_MEMORY and HANSARD_PROFILER settings, False turning them off
+# Nested calls (e.g. analyse_hansard_file loading the file) add their stages to the enclosing subject
+@contextlib.contextmanager
+def instrumented(subject, trace_memory=None, profiler=None, database=True):
+    if current() is not None:
+        yield current()
+        return
+
+    trace_memory = settings.HANSARD_TRACE_MEMORY if trace_memory is None else trace_memory
+    profiler = settings.HANSARD_PROFILER if profiler is None else profiler
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    stop_profiler = _start_profiler(profiler, subject) if profiler else None
+
+    counter = QueryCounter() if database else None
+    instrument = _local.instrument = Instrument(subject, counter)
+    try:
+        with connection.execute_wrapper(counter) if counter else contextlib.ExitStack():
+            with stage('total'):
+                yield instrument
+    finally:
+        _local.instrument = None
+        if stop_profiler:
+            stop_profiler()
+        if started_tracing:
+            tracemalloc.stop()
+        instrument.log()
+
+
+# Records the block as a stage of the current subject, if any
+# Each stage resets the tracemalloc peak where possible (Python 3.9+), so an enclosing stage only reports the peak
+# since its last inner stage started; the peak since tracing started is reported otherwise
+@contextlib.contextmanager
+def stage(name):
+    instrument = current()
+    if instrument is None:
+        yield
+        return
+
+    queries, rows = instrument.counts()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        memory = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        end_queries, end_rows = instrument.counts()
+        instrument.record(name, seconds, end_queries - queries, end_rows - rows,
+                          tracemalloc.get_traced_memory()[1] - memory if tracing else None)
+
+
+# Items of `iterable`, the time spent producing them being recorded as stage `name`
+# e.g. the parsing done lazily by a parser engine between two persisted debates
+def timed(iterable, name):
+    if current() is None:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while 1:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
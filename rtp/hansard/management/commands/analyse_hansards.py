@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from hansard.analysis import analyse_stored
+from hansard.management.commands.ingest_hansards import date
+from hansard.models import SessionReference
+
+
+class Command(BaseCommand):
+    help = 'Reports on ingested sentences and their stored annotations, without re-parsing nor writing anything'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, help='Only this sitting (SessionReference id)')
+        parser.add_argument('--date-from', type=date, help='Only sitting days from this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date, help='Only sitting days up to this date (YYYY-MM-DD)')
+        parser.add_argument('--chamber', choices=[c for c, label in SessionReference.CHAMBERS], help='Only this chamber')
+        parser.add_argument('--speaker', help='Only this speaker (name id, e.g. R36)')
+        parser.add_argument('--per-sitting', action='store_true', help='One report per sitting rather than one for the whole selection')
+        parser.add_argument('--top', type=int, default=20, help='Most common words reported')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per database round trip (default: HANSARD_ANALYSIS_CHUNK_SIZE setting)')
+
+    def handle(self, *args, **options):
+        reports = analyse_stored(options['session'], options['date_from'], options['date_to'], options['chamber'], options['speaker'],
+                                 per_sitting=options['per_sitting'], top=options['top'], chunk_size=options['chunk_size'])
+        for title, report in reports:
+            self.stdout.write("%s: %s sentences (%s unannotated)" % (title, report['sentences'], report['unannotated']))
+            for key in ('words', 'nouns', 'adjectives', 'verbs'):
+                self.stdout.write("  %s: %s" % (key, ", ".join("%s (%s)" % (word, count) for word, count in report[key])))
+            self.stdout.write("  interjecting sentences: %s" % (", ".join("%s (%s)" % item for item in sorted(report['interjecting_sentences'].items())),))
+            for label, counts in report['entities'].items():
+                self.stdout.write("  %s: %s" % (label, ", ".join("%s (%s)" % (text, count) for text, count in counts)))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from hansard.annotate import annotate_sentences
+from hansard.models import Sentence
+from hansard.management.commands.ingest_hansards import date
+
+
+class Command(BaseCommand):
+    help = 'Computes and stores NLP annotations of new or changed sentences'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date, help='Only sitting days from this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date, help='Only sitting days up to this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Sentences per batch (default: HANSARD_ANNOTATION_BATCH_SIZE setting)')
+
+    def handle(self, *args, **options):
+        sentences = Sentence.objects.all()
+        if options['date_from']:
+            sentences = sentences.filter(debate_ref__session__date__gte=options['date_from'])
+        if options['date_to']:
+            sentences = sentences.filter(debate_ref__session__date__lte=options['date_to'])
+        count = annotate_sentences(sentences, options['batch_size'])
+        self.stdout.write("%s sentences annotated" % (count,))
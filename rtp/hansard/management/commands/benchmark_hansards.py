@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hansard.benchmarks import BENCHMARKS, compare_results, load_results, run_benchmarks, save_results
+from hansard.parsers import ENGINES
+from hansard.synthetic import SIZES
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks parsing, ingest and analysis over synthetic sitting days, optionally comparing with a previous run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=['small', 'medium'])
+        parser.add_argument('--files', type=int, default=3, help='Sitting days per size')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the fastest being kept')
+        parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+        parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+        parser.add_argument('--output', help='Save results to this JSON file')
+        parser.add_argument('--baseline', help='Results of a previous run to compare with')
+        parser.add_argument('--tolerance', type=float, default=0.1, help='Throughput loss reported as a regression (default: 10%%)')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(options['sizes'], options['files'], options['repeat'], options['engines'], options['benchmarks'])
+
+        for stats in results['results']:
+            rate = next(metric for metric in stats if metric.endswith('_per_s') and metric != 'files_per_s')
+            self.stdout.write("%-8s %-7s %-5s %8.2f files/s %10.1f %s %8s queries/file" % (
+                stats['benchmark'], stats['size'], stats['engine'] or '', stats['files_per_s'], stats[rate], rate, stats['queries_per_file']))
+        if options['output']:
+            save_results(results, options['output'])
+
+        if options['baseline']:
+            regressions = compare_results(load_results(options['baseline']), results, options['tolerance'])
+            for benchmark, size, engine, metric, before, after in regressions:
+                self.stdout.write("REGRESSION %s %s %s %s: %s -> %s" % (benchmark, size, engine or '', metric, before, after))
+            if regressions:
+                raise CommandError("%s regressions" % (len(regressions),))
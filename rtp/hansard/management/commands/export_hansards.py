@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hansard.export import FORMATS, export_rows, export_chunks
+from hansard.management.commands.ingest_hansards import date
+
+
+class Command(BaseCommand):
+    help = 'Exports the sentences joined with their sitting, debate and speaker as CSV, JSON Lines or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output file, - for stdout (csv and jsonl only)')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--chamber', help='Only this chamber (House of Reps or Senate)')
+        parser.add_argument('--date-from', type=date, help='Only sitting days from this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date, help='Only sitting days up to this date (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, help='Rows per database round trip and per write (default: HANSARD_EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        format = options['format']
+        if options['output'] == '-' and format == 'parquet':
+            raise CommandError("Parquet can't be written to stdout")
+
+        rows = export_rows(options['date_from'], options['date_to'], options['chamber'], options['chunk_size'])
+        try:
+            chunks = export_chunks(format, rows, options['chunk_size'])
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        if options['output'] == '-':
+            out = sys.stdout
+        elif format == 'parquet':
+            out = open(options['output'], 'wb')
+        else:
+            out = open(options['output'], 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,77 @@
+import datetime
+import functools
+import multiprocessing
+import os
+
+from tqdm import tqdm
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hansard.instrument import PROFILERS
+from hansard.parsers import ENGINES
+from hansard.utils import list_hansards, ingest_hansard_file, hansard_date
+
+
+def date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# Whether a sitting day falls within a (possibly open-ended) date range
+def in_range(day, date_from, date_to):
+    if day is None or (date_from is None and date_to is None):
+        return False
+    return (date_from is None or day >= date_from) and (date_to is None or day <= date_to)
+
+
+def ingest(filename, engine=None, force_all=False, force_from=None, force_to=None, trace_memory=None, profiler=None, folder='hansard/data/raw'):
+    force = force_all or in_range(hansard_date(filename), force_from, force_to)
+    return ingest_hansard_file(filename, engine=engine, force=force, trace_memory=trace_memory, profiler=profiler, folder=folder)
+
+
+def close_connections():
+    # Forked workers must not share the parent's DB connection: each opens its own on first query
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Parses all downloaded hansard XML files over a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes (default: number of CPUs)')
+        parser.add_argument('--engine', choices=ENGINES, default=None, help='Parser engine (default: HANSARD_PARSER_ENGINE setting)')
+        parser.add_argument('--folder', default='hansard/data/raw', help='Folder of hansard XML files')
+        parser.add_argument('--force', action='store_true', help='Re-ingest files even if they are unchanged')
+        parser.add_argument('--date-from', type=date, help='Re-ingest sitting days from this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date, help='Re-ingest sitting days up to this date (YYYY-MM-DD)')
+        parser.add_argument('--trace-memory', action='store_true', default=None, help='Record the tracemalloc peak of each stage (default: HANSARD_TRACE_MEMORY setting)')
+        parser.add_argument('--profile', choices=PROFILERS, default=None, help='Save a profile of each file to HANSARD_PROFILE_DIR (default: HANSARD_PROFILER setting)')
+
+    def handle(self, *args, **options):
+        filenames = list_hansards(options['folder'])
+        workers = max(1, min(options['workers'], len(filenames)))
+        ingest_file = functools.partial(ingest, engine=options['engine'], force_all=options['force'], force_from=options['date_from'], force_to=options['date_to'],
+                                        trace_memory=options['trace_memory'], profiler=options['profile'], folder=options['folder'])
+        self.stdout.write("Ingesting %s files with %s workers" % (len(filenames), workers))
+
+        results = []
+        if workers == 1:
+            for filename in tqdm(filenames, unit='file'):
+                results.append(ingest_file(filename))
+        else:
+            close_connections()
+            with multiprocessing.Pool(workers, initializer=close_connections) as pool:
+                for result in tqdm(pool.imap_unordered(ingest_file, filenames), total=len(filenames), unit='file'):
+                    results.append(result)
+
+        # Per-file timing summary, slowest first
+        for filename, elapsed, status, error in sorted(results, key=lambda r: r[1], reverse=True):
+            if status != 'skipped':
+                self.stdout.write("%8.2fs  %s%s" % (elapsed, filename, "  FAILED: %s" % error if error else ''))
+
+        counts = {s: len([r for r in results if r[2] == s]) for s in ('ingested', 'skipped', 'failed')}
+        failures = [filename for filename, elapsed, status, error in results if error]
+        total = sum(elapsed for filename, elapsed, status, error in results)
+        self.stdout.write("%s files in %.2fs of processing time: %s ingested, %s skipped (unchanged), %s failed" % (len(results), total, counts['ingested'], counts['skipped'], counts['failed']))
+        if failures:
+            raise CommandError("Failed to ingest: %s" % ', '.join(sorted(failures)))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from hansard.models import SessionReference
+from hansard.terms import rebuild_terms
+from hansard.management.commands.ingest_hansards import date
+
+
+class Command(BaseCommand):
+    help = 'Recomputes term frequency aggregates from the stored sentences, e.g. after a backfill'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date, help='Only sitting days from this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date, help='Only sitting days up to this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        sessions = SessionReference.objects.all()
+        if options['date_from']:
+            sessions = sessions.filter(date__gte=options['date_from'])
+        if options['date_to']:
+            sessions = sessions.filter(date__lte=options['date_to'])
+        rebuild_terms(sessions)
+        self.stdout.write("Term frequencies rebuilt for %s sittings" % (sessions.count(),))
@@ -0,0 +1,52 @@
+import os
+import collections
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from hansard.repair import TABLE, iter_repaired, file_chunks
+from hansard.utils import list_hansards
+
+
+class Command(BaseCommand):
+    help = 'Reports the encoding damage repaired in downloaded hansard XML files, optionally rewriting them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folder', default='hansard/data/raw', help='Folder of hansard XML files')
+        parser.add_argument('--write', action='store_true', help='Rewrite files that needed repairs')
+
+    def handle(self, *args, **options):
+        folder = options['folder']
+        corpus, damaged = collections.Counter(), 0
+
+        for filename in list_hansards(folder):
+            path = os.path.join(folder, filename)
+            report = collections.Counter()
+            if options['write']:
+                self.rewrite(path, report)
+            else:
+                with open(path, 'rb') as xml:
+                    for chunk in iter_repaired(file_chunks(xml), report=report):
+                        pass
+
+            if report:
+                damaged += 1
+                corpus.update(report)
+                self.stdout.write("%s: %s sequences" % (filename, sum(report.values())))
+
+        self.stdout.write("%s files needed repairs%s" % (damaged, " (rewritten)" if options['write'] else ''))
+        for sequence, count in corpus.most_common():
+            self.stdout.write("%10d  %r -> %r" % (count, sequence, TABLE[sequence]))
+
+    # Repairs a file through a temporary file, only replacing it if anything was rewritten
+    def rewrite(self, path, report):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.part')
+        try:
+            with open(path, 'rb') as xml, os.fdopen(fd, 'w', encoding='utf-8') as repaired:
+                for chunk in iter_repaired(file_chunks(xml), report=report):
+                    repaired.write(chunk)
+            if report:
+                os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,45 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hansard.management.commands.ingest_hansards import date
+from hansard.parsers import ENGINES
+from hansard.pipeline import HansardPipeline
+
+
+class Command(BaseCommand):
+    help = 'Downloads, parses, persists and annotates hansard files as a pipeline of concurrent stages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date, help='Download the sitting weeks from this date (YYYY-MM-DD); without it, the files already in --folder are ingested')
+        parser.add_argument('--date-to', type=date, help='Download the sitting weeks up to this date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--folder', default='hansard/data/raw', help='Folder of hansard XML files')
+        parser.add_argument('--engine', choices=ENGINES, default=None, help='Parser engine (default: HANSARD_PARSER_ENGINE setting)')
+        parser.add_argument('--force', action='store_true', help='Re-ingest files even if they are unchanged')
+        parser.add_argument('--download-workers', type=int, default=8, help='Number of scraping and downloading threads')
+        parser.add_argument('--parse-workers', type=int, default=os.cpu_count(), help='Number of parser processes (default: number of CPUs)')
+        parser.add_argument('--analyse-workers', type=int, default=1, help='Number of annotating threads')
+        parser.add_argument('--queue-size', type=int, default=4, help='Most items waiting between two stages')
+        parser.add_argument('--no-analyse', action='store_true', help="Don't annotate the sentences of ingested files")
+        parser.add_argument('--fail-fast', action='store_true', help='Stop at the first file failing')
+
+    def handle(self, *args, **options):
+        if options['date_to'] and not options['date_from']:
+            raise CommandError("--date-to needs --date-from")
+
+        pipeline = HansardPipeline(
+            folder=options['folder'], engine=options['engine'], force=options['force'], analyse=not options['no_analyse'],
+            download_workers=options['download_workers'], parse_workers=options['parse_workers'], analyse_workers=options['analyse_workers'],
+            queue_size=options['queue_size'], fail_fast=options['fail_fast'])
+        try:
+            result = pipeline.run(options['date_from'], options['date_to'])
+        except KeyboardInterrupt:
+            raise CommandError("Interrupted")
+
+        for stage, item, error in result.failures:
+            self.stdout.write("FAILED %s: %s  %s" % (stage, item, error))
+        self.stdout.write("Processed per stage: %s; %s files unchanged, %s failures" % (
+            ', '.join('%s %s' % (name, count) for name, count in result.processed.items()), pipeline.skipped, len(result.failures)))
+        self.stdout.write("Sentences: %s" % (', '.join('%s %s' % (change, pipeline.changes[change]) for change in ('inserted', 'updated', 'deleted', 'unchanged')),))
+        if result.failures:
+            raise CommandError("%s items failed" % (len(result.failures),))
@@ -0,0 +1,24 @@
+# Generated by Django 2.0.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0008_auto_20180822_1224'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255, unique=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('parser_version', models.IntegerField()),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
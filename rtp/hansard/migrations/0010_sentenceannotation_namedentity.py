@@ -0,0 +1,40 @@
+# Generated by Django 2.0.5 on 2026-10-18 10:05
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0009_ingestedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NamedEntity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=16)),
+                ('text', models.CharField(max_length=255)),
+                ('sentence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities', to='hansard.Sentence')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SentenceAnnotation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=32)),
+                ('model_version', models.CharField(max_length=128)),
+                ('tokens', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('lemmas', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('pos', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=8), size=None)),
+                ('sentence', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='annotation', to='hansard.Sentence')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='namedentity',
+            index_together={('label', 'text')},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.0.5 on 2026-10-18 10:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0010_sentenceannotation_namedentity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermFrequency',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('date', models.DateField()),
+                ('party', models.CharField(max_length=16)),
+                ('chamber', models.CharField(max_length=16)),
+                ('count', models.IntegerField()),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hansard.Person')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hansard.SessionReference')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='termfrequency',
+            unique_together={('session', 'person', 'term')},
+        ),
+        migrations.AlterIndexTogether(
+            name='termfrequency',
+            index_together={('person', 'date'), ('party', 'date'), ('chamber', 'date'), ('date', 'term')},
+        ),
+    ]
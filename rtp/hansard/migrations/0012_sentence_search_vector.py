@@ -0,0 +1,36 @@
+# Generated by Django 2.0.5 on 2026-10-18 11:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0011_termfrequency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentence',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='hansard_sentence_search_gin'),
+        ),
+        # Keep search_vector in sync with the_words, bulk_create included
+        migrations.RunSQL(
+            sql=[
+                """
+                CREATE TRIGGER hansard_sentence_search_update
+                BEFORE INSERT OR UPDATE OF the_words, search_vector ON hansard_sentence
+                FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.english', the_words);
+                """,
+                "UPDATE hansard_sentence SET search_vector = to_tsvector('pg_catalog.english', the_words);",
+            ],
+            reverse_sql="DROP TRIGGER IF EXISTS hansard_sentence_search_update ON hansard_sentence;",
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.5 on 2026-10-18 11:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0012_sentence_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='sessionreference',
+            index_together={('date', 'id'), ('chamber', 'date', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='debatereference',
+            index_together={('session', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='person',
+            index_together={('party', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='sentence',
+            index_together={('debate_ref', 'id'), ('spoken_by', 'id')},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.0.5 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hansard', '0013_api_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentence',
+            name='position',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='content_hash',
+            field=models.CharField(default='', max_length=32),
+        ),
+        # Sentences were inserted in file order, debate by debate: their ids give their positions
+        # The hash must match hansard.ingest.sentence_hash, so that re-ingesting an unchanged file writes nothing
+        migrations.RunSQL(
+            sql="""
+            UPDATE hansard_sentence s
+            SET position = p.position,
+                content_hash = md5(concat_ws('|', s.spoken_by_id, s.talk_type, coalesce(s.time_talk_started::text, ''), s.first_speech::text, s.the_words))
+            FROM (SELECT id, row_number() OVER (PARTITION BY debate_ref_id ORDER BY id) - 1 AS position FROM hansard_sentence) p
+            WHERE s.id = p.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from aec.models import *
 
@@ -18,6 +21,11 @@ class SessionReference(models.Model):
         unique_together = (
             ('parliament_no', 'date', 'session_no', 'period_no', 'chamber')
         )
+        # Keyset pagination of the API (see views)
+        index_together = (
+            ('date', 'id'),
+            ('chamber', 'date', 'id'),
+        )
 
 class DebateReference(models.Model):
     session = models.ForeignKey(SessionReference, on_delete=models.CASCADE)
@@ -32,6 +40,9 @@ class DebateReference(models.Model):
         unique_together = (
             ('session', 'debate_title', 'debate_page_no', 'subdebate1_title', 'subdebate1_page_no', 'subdebate2_title', 'subdebate2_page_no')
         )
+        index_together = (
+            ('session', 'id'),
+        )
 
 class Person(models.Model):
     name_id = models.CharField(max_length=16, unique=True)
@@ -40,6 +51,11 @@ class Person(models.Model):
     # Member of Parliament
     electorate = models.ForeignKey(FederalElectorate2016, on_delete=models.CASCADE, null=True)
 
+    class Meta:
+        index_together = (
+            ('party', 'id'),
+        )
+
 class Sentence(models.Model):
     debate_ref = models.ForeignKey(DebateReference, on_delete=models.CASCADE)
     spoken_by = models.ForeignKey(Person, on_delete=models.CASCADE)
@@ -47,4 +63,72 @@ class Sentence(models.Model):
     talk_type = models.CharField(max_length=32)
     first_speech = models.BooleanField(default=False)
     # The actual sentence
-    the_words = models.TextField()
\ No newline at end of file
+    the_words = models.TextField()
+    # Position within the debate reference, which along with it identifies the sentence across ingests
+    position = models.IntegerField(default=0)
+    # See hansard.ingest.sentence_hash
+    content_hash = models.CharField(max_length=32, default='')
+    # Full text search document, maintained by a database trigger (see migration 0012)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='hansard_sentence_search_gin'),
+        ]
+        index_together = (
+            ('debate_ref', 'id'),
+            ('spoken_by', 'id'),
+        )
+
+# One row per hansard XML file loaded by parse_hansard
+# Files whose content hash and parser version haven't changed since are skipped on re-runs
+class IngestedFile(models.Model):
+    filename = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    parser_version = models.IntegerField()
+    ingested_at = models.DateTimeField(auto_now=True)
+
+
+# NLP annotations of a Sentence, valid as long as the words (content_hash) and the models (model_version) don't change
+class SentenceAnnotation(models.Model):
+    sentence = models.OneToOneField(Sentence, on_delete=models.CASCADE, related_name='annotation')
+    # md5 of the_words, as computed by PostgreSQL's md5()
+    content_hash = models.CharField(max_length=32)
+    model_version = models.CharField(max_length=128)
+    tokens = ArrayField(models.TextField())
+    lemmas = ArrayField(models.TextField())
+    pos = ArrayField(models.CharField(max_length=8))
+
+class NamedEntity(models.Model):
+    sentence = models.ForeignKey(Sentence, on_delete=models.CASCADE, related_name='entities')
+    label = models.CharField(max_length=16)
+    text = models.CharField(max_length=255)
+
+    class Meta:
+        index_together = (
+            ('label', 'text')
+        )
+
+
+# Materialised word counts per speaker and sitting, maintained by hansard.terms
+# Party, chamber and date are copied from the speaker and the sitting so that top-k queries don't need joins
+class TermFrequency(models.Model):
+    term = models.CharField(max_length=64)
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    session = models.ForeignKey(SessionReference, on_delete=models.CASCADE)
+    date = models.DateField()
+    party = models.CharField(max_length=16)
+    chamber = models.CharField(max_length=16)
+    count = models.IntegerField()
+
+    class Meta:
+        unique_together = (
+            ('session', 'person', 'term')
+        )
+        index_together = (
+            ('person', 'date'),
+            ('party', 'date'),
+            ('chamber', 'date'),
+            ('date', 'term'),
+        )
@@ -0,0 +1,99 @@
+import logging
+import itertools
+import threading
+import multiprocessing
+
+import spacy
+
+from django.conf import settings
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+logger = logging.getLogger(__name__)
+
+
+# Components not needed when only named entities are wanted
+NER_DISABLE = ('parser', 'tagger')
+
+MY_ABBREV = ['\'m', '.', ',', '\'s', '(', ')', 'n\'t', '\'ve', ';', '$', ':', '\'', '?', '\'ll', '\'re']
+
+# Process-wide registry of NLP models, each loaded once on first use
+# Models loaded before forking (see warm) are shared by pool workers, others are loaded in each worker
+_models = {}
+_lock = threading.Lock()
+
+
+def _get(key, load):
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                logger.debug("Loading %s ..." % (key,))
+                model = _models[key] = load()
+    return model
+
+
+# spaCy pipeline, `disable` being the pipeline components not to load (default: HANSARD_SPACY_DISABLE setting)
+def get_spacy(name=None, disable=None):
+    name = name or settings.HANSARD_SPACY_MODEL
+    disable = tuple(sorted(settings.HANSARD_SPACY_DISABLE if disable is None else disable))
+    return _get(('spacy', name, disable), lambda: spacy.load(name, disable=list(disable)))
+
+
+def get_stoplist():
+    return _get(('stoplist',), lambda: frozenset(stopwords.words('english') + MY_ABBREV))
+
+
+def get_sent_tokenizer():
+    def load():
+        sent_tokenizer = PunktSentenceTokenizer()
+        # Stop breaking sentence at "No."
+        sent_tokenizer._params.abbrev_types.add('no')
+        return sent_tokenizer
+    return _get(('sent_tokenizer',), load)
+
+
+def get_lemmatizer():
+    return _get(('lemmatizer',), WordNetLemmatizer)
+
+
+# Loads the models upfront, e.g. as a multiprocessing.Pool initializer or before forking workers
+def warm(spacy_name=None, spacy_disable=None):
+    get_spacy(spacy_name, spacy_disable)
+    get_stoplist()
+    get_sent_tokenizer()
+    # WordNet is itself loaded lazily by nltk
+    get_lemmatizer().lemmatize('warming')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+
+def _pipe_entities(items, batch_size, disable):
+    for doc, sentence_id in get_spacy(disable=disable).pipe(items, as_tuples=True, batch_size=batch_size):
+        for entity in doc.ents:
+            yield sentence_id, entity.label_, entity.text
+
+
+def _entities_chunk(args):
+    return list(_pipe_entities(*args))
+
+
+# Named entities of a stream of (text, sentence id) pairs, as (sentence id, label, text) tuples
+# Texts are fed to spaCy by batches of `batch_size`, over `n_process` worker processes if more than one
+# (default: HANSARD_NER_BATCH_SIZE and HANSARD_NER_PROCESSES settings)
+def extract_entities(items, batch_size=None, n_process=None, disable=NER_DISABLE):
+    batch_size = batch_size or settings.HANSARD_NER_BATCH_SIZE
+    n_process = n_process or settings.HANSARD_NER_PROCESSES
+    if n_process == 1:
+        yield from _pipe_entities(items, batch_size, disable)
+        return
+
+    chunks = ((chunk, batch_size, disable) for chunk in chunked(items, batch_size))
+    with multiprocessing.Pool(n_process, initializer=get_spacy, initargs=(None, disable)) as pool:
+        for entities in pool.imap(_entities_chunk, chunks):
+            yield from entities
@@ -0,0 +1,362 @@
+import datetime
+import logging
+
+from lxml import etree
+from bs4 import BeautifulSoup, element
+
+from .repair import RepairingReader, iter_repaired, file_chunks
+
+logger = logging.getLogger(__name__)
+
+
+# Parser engines for a sitting-day hansard XML file
+# Both engines yield the same plain records, persistence is left to hansard.utils:
+#   ('session', {parliament_no, date, session_no, period_no, chamber})
+#   ('talk', (debate_params, [paragraph, ...]))
+# where a paragraph is a dict of time_talk_started (optional), talk_type, name_id, name, electorate, party and the_words
+ENGINES = ('soup', 'lxml')
+# Bump whenever the extracted records change, so that already ingested files get parsed again
+PARSER_VERSION = 3
+
+INTERJECTION_CLASSES = ['HPS-MemberInterjecting', 'HPS-MemberIInterjecting', 'HPS-OfficeInterjecting']
+SKIPPED_DEBATES = ('SHADOW MINISTERIAL ARRANGEMENTS', 'MINISTERIAL ARRANGEMENTS')
+
+
+def empty_debate_params():
+    return {
+        'debate_title': None,
+        'debate_page_no': None,
+        'subdebate1_title': None,
+        'subdebate1_page_no': None,
+        'subdebate2_title': None,
+        'subdebate2_page_no': None,
+    }
+
+
+def page_no(text):
+    return int(text) if len(text) else None
+
+
+def clean_time(time_talk_started):
+    # Time: mostly a single tag text value but sometimes spread across several tags
+    """
+              <span class="HPS-Time">15</span>
+              <span class="HPS-Time">:</span>
+              <span class="HPS-Time">26</span>
+    """
+    # Manually fixes:
+    # House_of_Representatives_2016_09_15_4439.xml: weirdo characters at line 1
+    # House_of_Representatives_2017_08_14_5360.xml: Shorten's intervention at 14:01
+    # House_of_Representatives_2016_08_31_4425.xml: 3 times starting with 13
+    # House_of_Representatives_2016_09_12_4432.xml: 1 time starting with 14
+    # House_of_Representatives_2016_10_10_4462.xml: 1 time starting with 10
+    # House_of_Representatives_2016_10_17_4486.xml: 2 times starting at 10:01
+    allowed_chars = "0123456789:"
+    time_talk_started = ''.join([c for c in time_talk_started if c in allowed_chars])
+    # TODO: if the time is icomplete with format ':XY', use the 2 chars before the time span tag
+    # Oddity
+    if time_talk_started == '24:00':
+        time_talk_started = '00:00'
+    return time_talk_started
+
+
+def clean_words(the_words):
+    # Sanitisation against line returns
+    # Encoding damage (e.g. "Western Australiaâ\x80\x94and") is repaired while reading the file, see hansard.repair
+    return the_words.strip('\n')
+
+
+def skip_debate(params):
+    # Stop processing the entire debate section!
+    if params['debate_title'] in SKIPPED_DEBATES:
+        logger.debug("Skipping %s talk.text ..." % (params['debate_title'],))
+        return True
+    return False
+
+
+# BeautifulSoup engine: the whole file is loaded as a single tree
+
+# `source` is a filename or a binary file object
+def load_soup(source):
+    # Supported parsers
+    # https://www.crummy.com/software/BeautifulSoup/bs4/doc/#installing-a-parser
+    if isinstance(source, str):
+        with open(source, 'rb') as xml:
+            return BeautifulSoup(''.join(iter_repaired(file_chunks(xml))), "xml")
+    return BeautifulSoup(''.join(iter_repaired(file_chunks(source))), "xml")
+
+
+def soup_session(soup):
+    session = soup.hansard.find('session.header')
+    return {
+        'parliament_no': int(session.find('parliament.no').get_text()),
+        'date': datetime.datetime.strptime(session.date.get_text(), '%Y-%m-%d'),
+        'session_no': int(session.find('session.no').get_text()),
+        'period_no': int(session.find('period.no').get_text()),
+        'chamber': session.chamber.get_text(),
+    }
+
+
+# Walks up from a talk.text tag to its closest debate, subdebate.1 or subdebate.2
+# Returns None if the enclosing debate is skipped
+def soup_debate(talk):
+    sd2 = talk.parent.parent
+    params = empty_debate_params()
+    try:
+        while 1:
+            if sd2.name=='debate':
+                params.update({
+                    'debate_title': sd2.debateinfo.title.get_text(),
+                    'debate_page_no': int(sd2.debateinfo.find('page.no').get_text()),
+                })
+                return None if skip_debate(params) else params
+            elif sd2.name=='subdebate.1' and sd2.parent.name=='debate':
+                params.update({
+                    'subdebate1_title': sd2.subdebateinfo.title.get_text(),
+                    'subdebate1_page_no': page_no(sd2.subdebateinfo.find('page.no').get_text()),
+                    'debate_title': sd2.parent.debateinfo.title.get_text(),
+                    'debate_page_no': int(sd2.parent.debateinfo.find('page.no').get_text()),
+                })
+                return params
+            elif sd2.name=='subdebate.2':
+                params.update({
+                    'subdebate2_title': sd2.subdebateinfo.title.get_text(),
+                    'subdebate2_page_no': page_no(sd2.subdebateinfo.find('page.no').get_text()),
+                })
+                if sd2.parent.name=='debate':
+                    params.update({
+                        'debate_title': sd2.parent.debateinfo.title.get_text(),
+                        'debate_page_no': page_no(sd2.parent.debateinfo.find('page.no').get_text()),
+                    })
+                elif sd2.parent.name=='subdebate.1' and sd2.parent.parent.name=='debate':
+                    params.update({
+                        'subdebate1_title': sd2.parent.subdebateinfo.title.get_text(),
+                        'subdebate1_page_no': page_no(sd2.parent.subdebateinfo.find('page.no').get_text()),
+                        'debate_title': sd2.parent.parent.debateinfo.title.get_text(),
+                        'debate_page_no': int(sd2.parent.parent.debateinfo.find('page.no').get_text()),
+                    })
+                return params
+            sd2 = sd2.parent
+    except AttributeError as e:
+        logger.debug("Couldn't extract debate reference: %s" % str(sd2)[:300])
+        raise
+
+
+# Contextualise a <p> tag by extracting speaker, type, time and cleaned text
+def soup_paragraph(tag):
+    try:
+        paragraph = {}
+
+        # Rare: missing time marker
+        speech_header = tag.parent.p.span
+        time_started_tags = speech_header.find_all(attrs={'class':'HPS-Time'})
+        if len(time_started_tags) > 0:
+            paragraph['time_talk_started'] = clean_time(''.join([tst.get_text() for tst in time_started_tags]))
+
+        speech_meta = tag.parent.parent.parent.find('talk.start')
+        if not speech_meta:
+            # No meta info -> can't contextualise the sentence
+            return None
+
+        paragraph['talk_type'] = speech_meta.parent.name
+
+        # TODO: add in_gov and first_speech if they have value / meaning
+        # speech['first_speech'] = speech_meta.talker.find('first.speech').get_text()
+        # person['in_gov'] = speech_meta.talker.find('in.gov').get_text()
+        paragraph['name_id'] = speech_meta.talker.find('name.id').get_text()
+        paragraph['name'] = speech_meta.talker.find('name').get_text()
+        # Senate members don't have a federal electorate
+        paragraph['electorate'] = speech_meta.talker.find('electorate').get_text()
+        paragraph['party'] = speech_meta.talker.find('party').get_text()
+
+        # First element: a bit of wrangling to get the useful text
+        if tag is tag.parent.p:
+            # Rare: missing time marker
+            siblings = [si if isinstance(si, element.NavigableString) else si.get_text() for si in (tag.find(attrs={'class':'HPS-Time'}) or tag.span).next_siblings]
+            the_words = "".join(siblings)[4:]
+        else:
+            # Other elements are more straight forward
+            the_words = tag.get_text()
+        paragraph['the_words'] = clean_words(the_words)
+
+        return paragraph
+
+    except Exception as e:
+        logger.debug("Error contextualising tag: %s" % (str(tag)[:300],))
+        raise
+
+
+def soup_talks(soup):
+    for talk in soup.find_all('talk.text'):
+        # skip <talk.text>\n</talk.text>
+        if len(talk.get_text()) > 1:
+            params = soup_debate(talk)
+            if params is None:
+                continue
+            paragraphs = []
+            for p in talk.find_all('p'):
+                if not p.find(attrs={'class': INTERJECTION_CLASSES}):
+                    paragraph = soup_paragraph(p)
+                    if paragraph:
+                        paragraphs.append(paragraph)
+            yield params, paragraphs
+
+
+def soup_records(soup):
+    yield 'session', soup_session(soup)
+    for talk in soup_talks(soup):
+        yield 'talk', talk
+
+
+# lxml engine: the file is streamed with iterparse and each <debate> is dropped once processed
+# Helpers below mimic the BeautifulSoup navigation used by the soup engine
+
+def _find(el, name):
+    # First descendant named `name`, like Tag.find()
+    return next(el.iterdescendants(name), None)
+
+def _find_class(el, classes):
+    # First descendant with one of the given class attributes, like Tag.find(attrs={'class': ...})
+    return next((d for d in el.iterdescendants(etree.Element) if d.get('class') in classes), None)
+
+def _text(el):
+    # Like Tag.get_text()
+    return ''.join(el.itertext())
+
+def _following_text(el):
+    # Text of everything after `el` within its parent, like joining Tag.next_siblings
+    chunks = [el.tail or '']
+    for sibling in el.itersiblings():
+        if isinstance(sibling.tag, str):
+            chunks.append(_text(sibling))
+        chunks.append(sibling.tail or '')
+    return ''.join(chunks)
+
+
+def lxml_session(session):
+    return {
+        'parliament_no': int(_text(_find(session, 'parliament.no'))),
+        'date': datetime.datetime.strptime(_text(_find(session, 'date')), '%Y-%m-%d'),
+        'session_no': int(_text(_find(session, 'session.no'))),
+        'period_no': int(_text(_find(session, 'period.no'))),
+        'chamber': _text(_find(session, 'chamber')),
+    }
+
+
+def _info(el, info):
+    # (title, page.no text) of a debateinfo / subdebateinfo
+    info = _find(el, info)
+    return _text(_find(info, 'title')), _text(_find(info, 'page.no'))
+
+
+def lxml_debate(talk):
+    sd2 = talk.getparent().getparent()
+    params = empty_debate_params()
+    try:
+        while 1:
+            if sd2.tag=='debate':
+                title, page = _info(sd2, 'debateinfo')
+                params.update({'debate_title': title, 'debate_page_no': int(page)})
+                return None if skip_debate(params) else params
+            elif sd2.tag=='subdebate.1' and sd2.getparent().tag=='debate':
+                title, page = _info(sd2, 'subdebateinfo')
+                params.update({'subdebate1_title': title, 'subdebate1_page_no': page_no(page)})
+                title, page = _info(sd2.getparent(), 'debateinfo')
+                params.update({'debate_title': title, 'debate_page_no': int(page)})
+                return params
+            elif sd2.tag=='subdebate.2':
+                title, page = _info(sd2, 'subdebateinfo')
+                params.update({'subdebate2_title': title, 'subdebate2_page_no': page_no(page)})
+                parent = sd2.getparent()
+                if parent.tag=='debate':
+                    title, page = _info(parent, 'debateinfo')
+                    params.update({'debate_title': title, 'debate_page_no': page_no(page)})
+                elif parent.tag=='subdebate.1' and parent.getparent().tag=='debate':
+                    title, page = _info(parent, 'subdebateinfo')
+                    params.update({'subdebate1_title': title, 'subdebate1_page_no': page_no(page)})
+                    title, page = _info(parent.getparent(), 'debateinfo')
+                    params.update({'debate_title': title, 'debate_page_no': int(page)})
+                return params
+            sd2 = sd2.getparent()
+    except AttributeError as e:
+        logger.debug("Couldn't extract debate reference: %s" % str(sd2)[:300])
+        raise
+
+
+def lxml_paragraph(tag):
+    try:
+        paragraph = {}
+
+        first_p = _find(tag.getparent(), 'p')
+        speech_header = _find(first_p, 'span')
+        time_started_tags = [el for el in speech_header.iterdescendants(etree.Element) if el.get('class')=='HPS-Time']
+        if len(time_started_tags) > 0:
+            paragraph['time_talk_started'] = clean_time(''.join([_text(tst) for tst in time_started_tags]))
+
+        speech_meta = _find(tag.getparent().getparent().getparent(), 'talk.start')
+        if speech_meta is None:
+            return None
+
+        paragraph['talk_type'] = speech_meta.getparent().tag
+
+        talker = _find(speech_meta, 'talker')
+        paragraph['name_id'] = _text(_find(talker, 'name.id'))
+        paragraph['name'] = _text(_find(talker, 'name'))
+        paragraph['electorate'] = _text(_find(talker, 'electorate'))
+        paragraph['party'] = _text(_find(talker, 'party'))
+
+        if tag is first_p:
+            anchor = _find_class(tag, ('HPS-Time',))
+            if anchor is None:
+                anchor = _find(tag, 'span')
+            the_words = _following_text(anchor)[4:]
+        else:
+            the_words = _text(tag)
+        paragraph['the_words'] = clean_words(the_words)
+
+        return paragraph
+
+    except Exception as e:
+        logger.debug("Error contextualising tag: %s" % (etree.tostring(tag, encoding='unicode')[:300],))
+        raise
+
+
+def lxml_talks(debate):
+    for talk in debate.iter('talk.text'):
+        # skip <talk.text>\n</talk.text>
+        if len(_text(talk)) > 1:
+            params = lxml_debate(talk)
+            if params is None:
+                continue
+            paragraphs = []
+            for p in talk.iterdescendants('p'):
+                if _find_class(p, INTERJECTION_CLASSES) is None:
+                    paragraph = lxml_paragraph(p)
+                    if paragraph:
+                        paragraphs.append(paragraph)
+            yield params, paragraphs
+
+
+# `source` is a filename or a binary file object
+def lxml_records(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as xml:
+            yield from _lxml_records(RepairingReader(xml))
+    else:
+        yield from _lxml_records(RepairingReader(source))
+
+
+def _lxml_records(xml):
+    # recover=True matches the leniency of BeautifulSoup's "xml" parser
+    context = etree.iterparse(xml, events=('end',), tag=('session.header', 'debate'), recover=True)
+    for event, el in context:
+        if el.tag=='session.header':
+            yield 'session', lxml_session(el)
+        else:
+            for talk in lxml_talks(el):
+                yield 'talk', talk
+            # The debate is fully processed: free it and everything parsed before it
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    del context
@@ -0,0 +1,249 @@
+import os
+import queue
+import logging
+import datetime
+import threading
+import collections
+
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from .models import *
+from .parsers import *
+from .downloader import HansardDownloader
+from .instrument import instrumented
+from . import annotate, utils
+
+logger = logging.getLogger(__name__)
+
+
+# Marks the end of a stage's input
+STOP = object()
+
+
+# A step of a Pipeline: `function` is applied to each item by `workers` threads
+# It returns the item handed to the next stage, None to drop it, or a list of items if `fan_out` is set
+# Stages using the database close their thread's connection when they're done
+class Stage(object):
+
+    def __init__(self, name, function, workers=1, fan_out=False, database=False):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.fan_out = fan_out
+        self.database = database
+
+
+# Stages connected by bounded queues, so that each stage runs at most `queue_size` items ahead of the next one
+# An item failing in a stage is logged and recorded in `failures` while the others carry on, unless `fail_fast` is set
+# Any other error (or an interruption) stops all stages, and is raised by run() once every worker has exited
+class Pipeline(object):
+
+    def __init__(self, stages, queue_size=4, fail_fast=False):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.fail_fast = fail_fast
+        self.lock = threading.Lock()
+        self.abort = threading.Event()
+        self.error = None
+        # (stage name, item, error)
+        self.failures = []
+        # Items processed per stage
+        self.processed = collections.Counter()
+
+    def stop(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.abort.set()
+
+    # Blocking put and get, giving up when the pipeline is aborted
+    def put(self, q, item):
+        while not self.abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, q):
+        while not self.abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return STOP
+
+    def work(self, stage, inbox, outbox, consumers, running):
+        try:
+            while 1:
+                item = self.get(inbox)
+                if item is STOP:
+                    break
+                try:
+                    result = stage.function(item)
+                except Exception as e:
+                    logger.exception("%s failed on %s" % (stage.name, item))
+                    with self.lock:
+                        self.failures.append((stage.name, item, repr(e)))
+                    if self.fail_fast:
+                        self.stop(e)
+                    continue
+
+                with self.lock:
+                    self.processed[stage.name] += 1
+                for output in (result if stage.fan_out else [result]):
+                    if output is not None and not self.put(outbox, output):
+                        return
+        except BaseException as e:
+            self.stop(e)
+        finally:
+            if stage.database:
+                connection.close()
+            # The last worker of a stage tells each consumer downstream that there's nothing left
+            with self.lock:
+                running[stage.name] -= 1
+                last = running[stage.name] == 0
+            if last:
+                for i in range(consumers):
+                    self.put(outbox, STOP)
+
+    def feed(self, items, outbox, consumers):
+        try:
+            for item in items:
+                if not self.put(outbox, item):
+                    return
+            for i in range(consumers):
+                self.put(outbox, STOP)
+        except BaseException as e:
+            self.stop(e)
+
+    # Runs `items` through all stages, returning what comes out of the last one (in no particular order)
+    def run(self, items):
+        queues = [queue.Queue(self.queue_size) for stage in self.stages] + [queue.Queue(self.queue_size)]
+        running = {stage.name: stage.workers for stage in self.stages}
+        threads = [threading.Thread(target=self.feed, args=(items, queues[0], self.stages[0].workers), name='feed', daemon=True)]
+        for i, stage in enumerate(self.stages):
+            consumers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self.work, args=(stage, queues[i], queues[i + 1], consumers, running),
+                    name='%s-%s' % (stage.name, w), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        results = []
+        try:
+            while 1:
+                item = self.get(queues[-1])
+                if item is STOP:
+                    break
+                results.append(item)
+        except BaseException as e:
+            self.stop(e)
+        for thread in threads:
+            thread.join()
+
+        if self.error is not None:
+            raise self.error
+        return results
+
+
+# Runs in parser processes: plain records, no database
+def parse_file(path, engine):
+    if engine == 'soup':
+        return list(soup_records(load_soup(path)))
+    return list(lxml_records(path))
+
+
+# Ingest of hansard files as a Pipeline, from the aph.gov.au sitting weeks to annotated sentences:
+#   scrape (threads) -> download (threads) -> parse (threads handing files over to a pool of processes)
+#   -> persist (a single writer) -> analyse (threads)
+# Encoding damage is repaired while downloading, and again while parsing for files that were already on disk
+# Unchanged files are skipped before being parsed, unless `force` is set
+class HansardPipeline(object):
+
+    def __init__(self, folder='hansard/data/raw', engine=None, force=False, analyse=True,
+                 download_workers=8, parse_workers=None, analyse_workers=1, queue_size=4, fail_fast=False, **downloader_kwargs):
+        self.folder = folder
+        self.engine = engine or settings.HANSARD_PARSER_ENGINE
+        self.force = force
+        self.analyse_files = analyse
+        self.download_workers = download_workers
+        self.parse_workers = parse_workers or os.cpu_count()
+        self.analyse_workers = analyse_workers
+        self.queue_size = queue_size
+        self.fail_fast = fail_fast
+        self.downloader = HansardDownloader(folder=folder, workers=download_workers, **downloader_kwargs)
+
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.skipped = 0
+        # Sentences inserted, updated, deleted and unchanged
+        self.changes = collections.Counter()
+        self.pool = None
+
+    def scrape(self, day):
+        return self.downloader.sitting_week_links(day)
+
+    def download(self, url):
+        with self.lock:
+            if url in self.seen:
+                return None
+            self.seen.add(url)
+        if self.downloader.download(url) == 'failed':
+            raise IOError("Couldn't download %s" % (url,))
+        return self.downloader.local_filename(url)
+
+    def parse(self, filename):
+        digest = utils.file_digest(os.path.join(self.folder, filename))
+        if not self.force and not utils.needs_ingest(filename, digest):
+            with self.lock:
+                self.skipped += 1
+            return None
+        records = self.pool.submit(parse_file, os.path.join(self.folder, filename), self.engine).result()
+        return filename, digest, records
+
+    def persist(self, parsed):
+        filename, digest, records = parsed
+        with instrumented(filename, trace_memory=False, profiler=False):
+            sobj, fragments, changes = utils.persist_records(filename, records, digest)
+        self.changes.update(changes)
+        return filename, sobj.id, len(fragments)
+
+    def analyse(self, persisted):
+        filename, session_id, count = persisted
+        annotated = annotate.annotate_sentences(Sentence.objects.filter(debate_ref__session_id=session_id))
+        return filename, session_id, count, annotated
+
+    def stages(self, download):
+        stages = []
+        if download:
+            stages.append(Stage('scrape', self.scrape, self.download_workers, fan_out=True))
+            stages.append(Stage('download', self.download, self.download_workers))
+        stages.append(Stage('parse', self.parse, self.parse_workers, database=True))
+        stages.append(Stage('persist', self.persist, 1, database=True))
+        if self.analyse_files:
+            stages.append(Stage('analyse', self.analyse, self.analyse_workers, database=True))
+        return stages
+
+    # Downloads and ingests the sitting weeks between two dates, or the files already in `folder` if no date is given
+    # Returns the Pipeline, with its results, failures and counts of processed items per stage
+    def run(self, date_from=None, date_to=None):
+        if date_from is not None:
+            date_to = date_to or datetime.date.today()
+            items = [date_from + datetime.timedelta(days=x * 7) for x in range((date_to - date_from).days // 7 + 1)]
+            os.makedirs(self.folder, exist_ok=True)
+        else:
+            items = utils.list_hansards(self.folder)
+
+        pipeline = Pipeline(self.stages(date_from is not None), self.queue_size, self.fail_fast)
+        # Parser processes must not share the connection of this one
+        connection.close()
+        with ProcessPoolExecutor(self.parse_workers) as self.pool:
+            pipeline.results = pipeline.run(items)
+        logger.debug("Pipeline: %s processed, %s unchanged, %s failed, sentences: %s" % (dict(pipeline.processed), self.skipped, len(pipeline.failures), dict(self.changes)))
+        return pipeline
@@ -0,0 +1,127 @@
+import re
+import codecs
+import collections
+
+
+# Encoding damage found in hansard XML files
+# The XML is UTF-8 but was decoded as Latin-1 (requests' default for text/* without a charset),
+# so that e.g. an em dash (E2 80 94) shows as 'â\x80\x94'
+# Damaged typographic characters are replaced by their ASCII counterparts, correctly encoded ones are left alone
+REPAIRS = (
+    (u'\u2013', u' - '),       # en dash
+    (u'\u2014', u' - '),       # em dash
+    (u'\u2011', u'-'),         # non-breaking hyphen
+    (u'\u2018', u'\''),        # left single quote
+    (u'\u2019', u'\''),        # right single quote
+    (u'\u201C', u'"'),         # left double quote
+    (u'\u201D', u'"'),         # right double quote
+    (u'\u2026', u'...'),       # ellipsis
+    (u'\u2022\xA0\xA0\xA0', u'-'), # bullet + non-breaking spaces
+    (u'\u2122', u'(TM)'),      # trade mark
+    (u'\u2022', u'-'),         # bullet
+)
+
+# Spelling of the bullet + non-breaking spaces in files written by the former downloader
+LEGACY_REPAIRS = (
+    (u'\xE2\x80\xA2\xC2 \xC2 \xC2', u'-'),
+)
+
+
+def damaged_forms(sequence):
+    forms = []
+    for encoding in ('latin-1', 'cp1252'):
+        try:
+            forms.append(sequence.encode('utf-8').decode(encoding))
+        except UnicodeDecodeError:
+            # cp1252 leaves a few bytes undefined
+            pass
+    return forms
+
+
+def build_table():
+    table = {}
+    for sequence, replacement in REPAIRS:
+        for form in damaged_forms(sequence):
+            table.setdefault(form, replacement)
+    table.update(LEGACY_REPAIRS)
+    return table
+
+
+TABLE = build_table()
+# Longest sequences first so that e.g. the bullet followed by spaces wins over the bullet alone
+PATTERN = re.compile('|'.join(re.escape(s) for s in sorted(TABLE, key=len, reverse=True)))
+# A sequence starting in the last HOLDBACK chars of a chunk may continue in the next one
+HOLDBACK = max(len(s) for s in TABLE) - 1
+
+CHUNK_SIZE = 1 << 16
+
+
+# Repairs a string in a single pass, counting rewritten sequences in `report` if given
+def repair_text(text, report=None):
+    if report is None:
+        return PATTERN.sub(lambda m: TABLE[m.group()], text)
+
+    def replace(match):
+        report[match.group()] += 1
+        return TABLE[match.group()]
+    return PATTERN.sub(replace, text)
+
+
+# Incremental decoder: bytes in, repaired text out, a chunk at a time
+# Sequences spanning two chunks are repaired all the same
+class RepairingDecoder(object):
+
+    def __init__(self, encoding='utf-8', report=None):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.pending = ''
+        self.report = report if report is not None else collections.Counter()
+
+    def decode(self, data, final=False):
+        text = self.pending + self.decoder.decode(data, final)
+        # Matches starting before the cut can't grow with more input
+        cut = len(text) if final else max(0, len(text) - HOLDBACK)
+        chunks, position = [], 0
+        for match in PATTERN.finditer(text):
+            if match.start() >= cut:
+                break
+            chunks.append(text[position:match.start()])
+            chunks.append(TABLE[match.group()])
+            self.report[match.group()] += 1
+            position = match.end()
+        cut = max(cut, position)
+        chunks.append(text[position:cut])
+        self.pending = text[cut:]
+        return ''.join(chunks)
+
+
+# Binary file-like object returning the repaired UTF-8 content of `raw`, e.g. for lxml.etree.iterparse
+class RepairingReader(object):
+
+    def __init__(self, raw, encoding='utf-8', report=None):
+        self.raw = raw
+        self.decoder = RepairingDecoder(encoding, report)
+        self.buffer = b''
+        self.done = False
+
+    def read(self, size=-1):
+        while not self.done and (size is None or size < 0 or len(self.buffer) < size):
+            chunk = self.raw.read(CHUNK_SIZE)
+            self.done = not chunk
+            self.buffer += self.decoder.decode(chunk, final=self.done).encode('utf-8')
+        if size is None or size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def file_chunks(f):
+    return iter(lambda: f.read(CHUNK_SIZE), b'')
+
+
+# Repaired text of a stream of byte chunks, a chunk at a time
+def iter_repaired(chunks, encoding='utf-8', report=None):
+    decoder = RepairingDecoder(encoding, report)
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q, Subquery
+
+from .models import *
+
+
+# Sentences matching a plain text query, best ranked first
+# Optional filters: speaker (name_id), party, chamber and sitting date range
+# `after` is the id of a sentence: only those ranked after it are kept, so that deep pages cost the same as the first one
+def search_sentences(q, speaker=None, party=None, chamber=None, date_from=None, date_to=None, after=None):
+    query = SearchQuery(q, config='english')
+    sentences = Sentence.objects.filter(search_vector=query)
+    if speaker:
+        sentences = sentences.filter(spoken_by__name_id=speaker)
+    if party:
+        sentences = sentences.filter(spoken_by__party=party)
+    if chamber:
+        sentences = sentences.filter(debate_ref__session__chamber=chamber)
+    if date_from:
+        sentences = sentences.filter(debate_ref__session__date__gte=date_from)
+    if date_to:
+        sentences = sentences.filter(debate_ref__session__date__lte=date_to)
+    sentences = sentences.annotate(rank=SearchRank(F('search_vector'), query))
+    if after is not None:
+        # Ranked by the database again rather than passed around: floats don't round-trip exactly
+        rank = Subquery(Sentence.objects.filter(id=after).annotate(rank=SearchRank(F('search_vector'), query)).values('rank'), output_field=FloatField())
+        sentences = sentences.filter(Q(rank__lt=rank) | Q(rank=rank, id__gt=after))
+    return sentences.select_related('spoken_by', 'debate_ref__session').order_by('-rank', 'id')
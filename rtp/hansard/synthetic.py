@@ -0,0 +1,143 @@
+import random
+import datetime
+
+from xml.sax.saxutils import escape
+
+
+# Synthetic sitting-day hansard XML, shaped like the files published on aph.gov.au:
+# debates with subdebate.1 / subdebate.2 nesting, speeches, interjections (as elements and as interjecting paragraphs),
+# times split across several HPS-Time spans and the odd damaged em dash
+# The same arguments always give the same file
+
+# Sitting-day sizes used by benchmarks: number of debates, speeches per (sub)debate and paragraphs per speech
+SIZES = {
+    'small': {'debates': 5, 'speeches': 3, 'paragraphs': 4},
+    'medium': {'debates': 30, 'speeches': 5, 'paragraphs': 6},
+    'large': {'debates': 120, 'speeches': 6, 'paragraphs': 8},
+}
+
+WORDS = (
+    'government bill minister house member amendment budget tax economy jobs families energy climate health '
+    'education community debate motion reading committee report speaker senate opposition labor coalition '
+    'australians people workers business industry funding billion million cuts investment policy reform '
+    'important support question today year years country national federal state regional local'
+).split()
+
+DEBATE_TITLES = ('BILLS', 'MOTIONS', 'STATEMENTS BY MEMBERS', 'QUESTIONS WITHOUT NOTICE', 'COMMITTEES', 'PETITIONS', 'ADJOURNMENT')
+SUBDEBATE_TITLES = ('Second Reading', 'Consideration in Detail', 'Third Reading', 'Report', 'Energy', 'Health', 'Taxation')
+PARTIES = ('ALP', 'LP', 'NATS', 'AG', 'IND')
+# The damaged form of an em dash, as found in the published files
+DAMAGED_DASH = 'â\u0080\u0094'
+
+
+# (name_id, name, electorate, party) of made up members, senators having no electorate
+def members(count, electorates, rng):
+    people = []
+    for i in range(count):
+        last = 'MEMBER%s' % (i,)
+        if electorates and i % 4:
+            people.append(('S%04d' % (i,), '%s, Pat, MP' % (last.title(),), electorates[i % len(electorates)], rng.choice(PARTIES)))
+        else:
+            people.append(('S%04d' % (i,), '%s, Sam, Sen.' % (last.title(),), '', rng.choice(PARTIES)))
+    return people
+
+
+def sentence(rng, damaged_dashes):
+    words = [rng.choice(WORDS) for i in range(rng.randint(6, 30))]
+    if rng.random() < damaged_dashes:
+        words[len(words) // 2] += DAMAGED_DASH + rng.choice(WORDS)
+    return (' '.join(words)).capitalize() + '.'
+
+
+def talker(person):
+    name_id, name, electorate, party = person
+    return (
+        '<talk.start><talker>'
+        '<name.id>%s</name.id><name role="metadata">%s</name><electorate>%s</electorate><party>%s</party>'
+        '</talker></talk.start>'
+    ) % tuple(escape(v) for v in (name_id, name, electorate, party))
+
+
+def time_spans(rng, clock):
+    text = clock.strftime('%H:%M')
+    if rng.random() < 0.2:
+        # Spread across several tags, see parsers.clean_time
+        return ''.join('<span class="HPS-Time">%s</span>' % (part,) for part in (text[:2], ':', text[3:]))
+    return '<span class="HPS-Time">%s</span>' % (text,)
+
+
+def paragraphs(rng, person, clock, count, damaged_dashes):
+    name_id, name, electorate, party = person
+    first = (
+        '<p class="HPS-Normal"><span class="HPS-Normal"><a href="%s" type="MemberSpeech"><span class="HPS-MemberSpeech">%s</span></a> (%s):  %s</span></p>'
+    ) % (escape(name_id), escape(name.split(',')[0].upper()), time_spans(rng, clock), escape(sentence(rng, damaged_dashes)))
+    rest = []
+    for i in range(count - 1):
+        if rng.random() < 0.1:
+            rest.append('<p class="HPS-Normal"><span class="HPS-MemberInterjecting">%s interjecting</span></p>' % (escape(name.split(',')[0]),))
+        rest.append('<p class="HPS-Normal"><span class="HPS-Normal">%s</span></p>' % (escape(' '.join(sentence(rng, damaged_dashes) for j in range(rng.randint(1, 4)))),))
+    return first + ''.join(rest)
+
+
+def speech(rng, people, clock, size, damaged_dashes):
+    person = rng.choice(people)
+    xml = '<speech>%s<talk.text><body xmlns:a="http://www.w3.org/1999/xhtml">%s</body></talk.text>' % (
+        talker(person), paragraphs(rng, person, clock, size['paragraphs'], damaged_dashes))
+    if rng.random() < 0.3:
+        interjector = rng.choice(people)
+        xml += '<interjection>%s<talk.text><body xmlns:a="http://www.w3.org/1999/xhtml">%s</body></talk.text></interjection>' % (
+            talker(interjector), paragraphs(rng, interjector, clock, 1, damaged_dashes))
+    return xml + '</speech>'
+
+
+def speeches(rng, people, clock, size, damaged_dashes):
+    xml = []
+    for i in range(size['speeches']):
+        xml.append(speech(rng, people, clock, size, damaged_dashes))
+        clock += datetime.timedelta(minutes=rng.randint(1, 15))
+    return ''.join(xml), clock
+
+
+def info(tag, title, page):
+    return '<%s><title>%s</title><page.no>%s</page.no></%s>' % (tag, escape(title), page, tag)
+
+
+# Bytes of a sitting-day XML file
+# size: one of SIZES or a dict like them; electorates: electorates members can sit for (default: senators only)
+def generate_sitting_day(size='small', seed=0, date=datetime.date(2018, 5, 10), chamber='House of Reps', electorates=(), damaged_dashes=0.05):
+    size = SIZES[size] if isinstance(size, str) else size
+    rng = random.Random(seed)
+    people = members(40, list(electorates), rng)
+    clock = datetime.datetime.combine(date, datetime.time(9, 30))
+    page = 3900
+
+    debates = []
+    for d in range(size['debates']):
+        page += 1
+        xml = [info('debateinfo', rng.choice(DEBATE_TITLES), page)]
+        layout = rng.random()
+        if layout < 0.3:
+            # Speeches right under the debate
+            talks, clock = speeches(rng, people, clock, size, damaged_dashes)
+            xml.append(talks)
+        else:
+            for s in range(rng.randint(1, 3)):
+                sub = [info('subdebateinfo', rng.choice(SUBDEBATE_TITLES), page)]
+                if layout < 0.7:
+                    talks, clock = speeches(rng, people, clock, size, damaged_dashes)
+                    sub.append(talks)
+                else:
+                    # Second level, with the page number sometimes missing
+                    talks, clock = speeches(rng, people, clock, size, damaged_dashes)
+                    sub.append('<subdebate.2>%s%s</subdebate.2>' % (info('subdebateinfo', rng.choice(SUBDEBATE_TITLES), page if rng.random() < 0.5 else ''), talks))
+                xml.append('<subdebate.1>%s</subdebate.1>' % (''.join(sub),))
+        debates.append('<debate>%s</debate>' % (''.join(xml),))
+
+    return ((
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<hansard xsi:noNamespaceSchemaLocation="../../hansard.xsd" version="2.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        '<session.header><date>%s</date><parliament.no>45</parliament.no><session.no>1</session.no><period.no>6</period.no>'
+        '<chamber>%s</chamber><page.no>0</page.no><proof>1</proof></session.header>'
+        '<chamber.xscript><business.start><day.start>%s</day.start></business.start>%s</chamber.xscript>'
+        '</hansard>\n'
+    ) % (date.isoformat(), escape(chamber), date.isoformat(), ''.join(debates))).encode('utf-8')
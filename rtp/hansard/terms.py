@@ -0,0 +1,67 @@
+import re
+import logging
+import collections
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import *
+from . import nlp
+
+logger = logging.getLogger(__name__)
+
+
+# Term frequency aggregates (TermFrequency) per speaker and sitting
+# Updated for a sitting whenever it's ingested, rebuilt with manage.py rebuild_terms
+
+# Lower case words, keeping inner apostrophes and hyphens (e.g. "government's", "by-election")
+TERM_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+
+def terms(the_words, stoplist):
+    return [t for t in TERM_RE.findall(the_words.lower()) if t not in stoplist and not t.isdigit() and len(t) <= 64]
+
+
+# Replaces the term counts of a sitting
+# speeches: iterable of (Person, the_words)
+def update_session_terms(session, speeches):
+    stoplist = nlp.get_stoplist()
+    counts, people = collections.Counter(), {}
+    for person, the_words in speeches:
+        people[person.id] = person
+        counts.update((person.id, term) for term in terms(the_words, stoplist))
+
+    rows = [
+        TermFrequency(term=term, person_id=person_id, session=session, date=session.date,
+                      party=people[person_id].party, chamber=session.chamber, count=count)
+        for (person_id, term), count in counts.items()
+    ]
+    with transaction.atomic():
+        TermFrequency.objects.filter(session=session).delete()
+        TermFrequency.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+# Recomputes the term counts of the given sittings (default: all) from the stored sentences
+def rebuild_terms(sessions=None):
+    sessions = SessionReference.objects.all() if sessions is None else sessions
+    for session in sessions.order_by('date').iterator():
+        sentences = Sentence.objects.filter(debate_ref__session=session).select_related('spoken_by').only('the_words', 'spoken_by__id', 'spoken_by__party')
+        count = update_session_terms(session, ((s.spoken_by, s.the_words) for s in sentences.iterator()))
+        logger.debug("%s: %s terms" % (session.date, count))
+
+
+# Most frequent terms as [(term, count), ...], optionally by speaker (Person or id), party, chamber and date range
+def top_terms(k=20, person=None, party=None, chamber=None, date_from=None, date_to=None):
+    rows = TermFrequency.objects.all()
+    if person is not None:
+        rows = rows.filter(person=person)
+    if party is not None:
+        rows = rows.filter(party=party)
+    if chamber is not None:
+        rows = rows.filter(chamber=chamber)
+    if date_from is not None:
+        rows = rows.filter(date__gte=date_from)
+    if date_to is not None:
+        rows = rows.filter(date__lte=date_to)
+    return list(rows.values('term').annotate(total=Sum('count')).order_by('-total', 'term').values_list('term', 'total')[:k])
@@ -1,3 +1,958 @@
-from django.test import TestCase
+import io
+import csv
+import json
+import os
+import collections
+import datetime
+import tempfile
+import threading
+import types
 
-# Create your tests here.
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from .parsers import *
+from .downloader import HansardDownloader
+from .repair import *
+from .models import *
+from .search import search_sentences
+from .views import encode_cursor
+from .analysis import SentenceCounts, analyse_stored
+from .export import export_rows, export_chunks
+from .synthetic import DAMAGED_DASH, generate_sitting_day
+from .benchmarks import compare_results
+from .ingest import DebateCache, PersonCache, sentence_hash, talk_time
+from .instrument import instrumented
+from .pipeline import Pipeline, Stage
+from .utils import load_hansard, persist_records
+from .terms import rebuild_terms, top_terms
+from . import annotate, nlp
+from .management.commands.ingest_hansards import ingest
+
+
+SITTING_DAY = b"""<?xml version="1.0" encoding="UTF-8"?>
+<hansard xsi:noNamespaceSchemaLocation="../../hansard.xsd" version="2.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <session.header>
+    <date>2018-05-10</date>
+    <parliament.no>45</parliament.no>
+    <session.no>1</session.no>
+    <period.no>6</period.no>
+    <chamber>House of Reps</chamber>
+    <page.no>0</page.no>
+    <proof>1</proof>
+  </session.header>
+  <chamber.xscript>
+    <business.start>
+      <day.start>2018-05-10</day.start>
+    </business.start>
+    <debate>
+      <debateinfo>
+        <title>MINISTERIAL ARRANGEMENTS</title>
+        <page.no>3900</page.no>
+      </debateinfo>
+      <speech>
+        <talk.start>
+          <talker>
+            <name.id>EZ5</name.id>
+            <name role="metadata">Turnbull, Malcolm, MP</name>
+            <electorate>Wentworth</electorate>
+            <party>LP</party>
+          </talker>
+        </talk.start>
+        <talk.text>
+          <body xmlns:a="http://www.w3.org/1999/xhtml">
+            <p class="HPS-Normal"><span class="HPS-Normal"><span class="HPS-MemberSpeech">Mr TURNBULL</span> (<span class="HPS-Time">09:30</span>): Skipped.</span></p>
+          </body>
+        </talk.text>
+      </speech>
+    </debate>
+    <debate>
+      <debateinfo>
+        <title>BILLS</title>
+        <page.no>3901</page.no>
+      </debateinfo>
+      <subdebate.1>
+        <subdebateinfo>
+          <title>Treasury Laws Amendment Bill 2018</title>
+          <page.no>3901</page.no>
+        </subdebateinfo>
+        <subdebate.2>
+          <subdebateinfo>
+            <title>Second Reading</title>
+            <page.no></page.no>
+          </subdebateinfo>
+          <speech>
+            <talk.start>
+              <talker>
+                <name.id>R36</name.id>
+                <name role="metadata">Shorten, Bill, MP</name>
+                <electorate>Maribyrnong</electorate>
+                <party>ALP</party>
+              </talker>
+            </talk.start>
+            <talk.text>
+              <body xmlns:a="http://www.w3.org/1999/xhtml">
+                <p class="HPS-Normal"><span class="HPS-Normal"><a href="R36" type="MemberSpeech"><span class="HPS-MemberSpeech">Mr SHORTEN</span></a> (<span class="HPS-Time">14:01</span>):  I rise to speak on <i>this</i> bill.</span></p>
+                <p class="HPS-Normal"><span class="HPS-Normal">It is a bad bill\xc3\xa2\xc2\x80\xc2\x94really.</span></p>
+                <p class="HPS-Normal"><span class="HPS-MemberInterjecting">Mr Turnbull interjecting</span></p>
+                <p class="HPS-Normal"><span class="HPS-Normal">Thank you.</span></p>
+              </body>
+            </talk.text>
+          </speech>
+        </subdebate.2>
+      </subdebate.1>
+      <subdebate.1>
+        <subdebateinfo>
+          <title>Second Reading</title>
+          <page.no>3905</page.no>
+        </subdebateinfo>
+        <speech>
+          <talk.start>
+            <talker>
+              <name.id>DYW</name.id>
+              <name role="metadata">Di Natale, Richard, Sen.</name>
+              <electorate></electorate>
+              <party>AG</party>
+            </talker>
+          </talk.start>
+          <talk.text>
+            <body xmlns:a="http://www.w3.org/1999/xhtml">
+              <p class="HPS-Normal"><span class="HPS-Normal"><span class="HPS-MemberSpeech">Senator DI NATALE</span> (<span class="HPS-Time">24</span><span class="HPS-Time">:</span><span class="HPS-Time">00</span>):  Late night.</span></p>
+            </body>
+          </talk.text>
+          <interjection>
+            <talk.start>
+              <talker>
+                <name.id>10000</name.id>
+                <name role="metadata">SPEAKER, The</name>
+                <electorate></electorate>
+                <party></party>
+              </talker>
+            </talk.start>
+            <talk.text>
+</talk.text>
+          </interjection>
+        </speech>
+      </subdebate.1>
+    </debate>
+  </chamber.xscript>
+</hansard>
+"""
+
+
+class ParserEngineParityTest(SimpleTestCase):
+
+    def assertSameRecords(self, soup_source, lxml_source):
+        soup = list(soup_records(soup_source))
+        streamed = list(lxml_records(lxml_source))
+        self.assertEqual(soup, streamed)
+        return streamed
+
+    def test_fixture(self):
+        records = self.assertSameRecords(load_soup(io.BytesIO(SITTING_DAY)), io.BytesIO(SITTING_DAY))
+
+        self.assertEqual([kind for kind, record in records], ['session', 'talk', 'talk'])
+        self.assertEqual(records[0][1]['chamber'], 'House of Reps')
+
+        params, paragraphs = records[1][1]
+        self.assertEqual(params['debate_title'], 'BILLS')
+        self.assertEqual(params['subdebate1_title'], 'Treasury Laws Amendment Bill 2018')
+        self.assertEqual(params['subdebate2_title'], 'Second Reading')
+        self.assertIsNone(params['subdebate2_page_no'])
+        self.assertEqual([p['the_words'] for p in paragraphs], ['I rise to speak on this bill.', 'It is a bad bill - really.', 'Thank you.'])
+        self.assertEqual(paragraphs[0]['time_talk_started'], '14:01')
+        self.assertEqual(paragraphs[0]['name_id'], 'R36')
+
+        params, paragraphs = records[2][1]
+        self.assertEqual(params['subdebate1_page_no'], 3905)
+        self.assertEqual(paragraphs[0]['time_talk_started'], '00:00')
+        self.assertEqual(paragraphs[0]['electorate'], '')
+
+    def test_synthetic(self):
+        xml = generate_sitting_day('medium', seed=1, electorates=['Melbourne'])
+        self.assertEqual(xml, generate_sitting_day('medium', seed=1, electorates=['Melbourne']))
+        records = self.assertSameRecords(load_soup(io.BytesIO(xml)), io.BytesIO(xml))
+        paragraphs = [p for kind, record in records[1:] for p in record[1]]
+        self.assertGreater(len(paragraphs), 500)
+        self.assertTrue(any(params['subdebate2_title'] for kind, (params, ps) in records[1:]))
+        # Damaged em dashes repaired
+        self.assertFalse(any(DAMAGED_DASH in p['the_words'] for p in paragraphs))
+
+    def test_raw_files(self):
+        # Same comparison over whatever sitting days have been downloaded
+        folder = os.path.join(os.path.dirname(__file__), 'data', 'raw')
+        filenames = sorted(f for f in os.listdir(folder) if f.lower().endswith('.xml')) if os.path.isdir(folder) else []
+        if not filenames:
+            self.skipTest("No hansard XML files in %s" % folder)
+        for filename in filenames:
+            with self.subTest(filename=filename):
+                path = os.path.join(folder, filename)
+                self.assertSameRecords(load_soup(path), path)
+
+
+class CompareBenchmarksTest(SimpleTestCase):
+
+    def test_compare_results(self):
+        baseline = {'results': [{'benchmark': 'ingest', 'size': 'small', 'engine': 'lxml', 'files_per_s': 10.0, 'paragraphs_per_s': 1000.0, 'queries_per_file': 20}]}
+        current = {'results': [{'benchmark': 'ingest', 'size': 'small', 'engine': 'lxml', 'files_per_s': 9.5, 'paragraphs_per_s': 800.0, 'queries_per_file': 25}]}
+        self.assertEqual(compare_results(baseline, current), [
+            ('ingest', 'small', 'lxml', 'paragraphs_per_s', 1000.0, 800.0),
+            ('ingest', 'small', 'lxml', 'queries_per_file', 20, 25),
+        ])
+
+
+SITTING_WEEK = """<html><body><div>
+<h2>Sitting week</h2>
+<a title="XML format" href="/parlInfo/download/chamber/hansardr/1/toc_unixml/House%20of%20Representatives_2018_05_10_6091_Official.xml;fileType=text%2Fxml">XML</a>
+<a title="PDF format" href="/parlInfo/download/chamber/hansardr/1/toc_pdf/House.pdf">PDF</a>
+</div></body></html>"""
+
+
+# Stand-in for aph.gov.au: a sitting week page linking to SITTING_DAY, served with an ETag
+# Display links redirect to the download link of SITTING_DAY
+class FakeAphHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/Parliamentary_Business/Hansard'):
+            self.reply(SITTING_WEEK.encode('utf-8'), 'text/html')
+        elif self.path.startswith('/parlInfo/search/display/'):
+            self.send_response(302)
+            self.send_header('Location', '/parlInfo/download/chamber/hansardr/1/toc_unixml/House%20of%20Representatives_2018_05_10_6091_Official.xml;fileType=text%2Fxml')
+            self.end_headers()
+        elif self.path.startswith('/parlInfo/download/'):
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.reply(SITTING_DAY, 'text/xml; charset=utf-8', {'ETag': '"v1"'})
+        else:
+            self.send_error(404)
+
+    def reply(self, body, content_type, headers={}):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HansardDownloaderTest(SimpleTestCase):
+
+    def setUp(self):
+        FakeAphHandler.requests = []
+        self.server = HTTPServer(('127.0.0.1', 0), FakeAphHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def download(self, **kwargs):
+        downloader = HansardDownloader(base_url='http://127.0.0.1:%s' % self.server.server_port, folder=self.folder.name, workers=2, **kwargs)
+        return downloader.run(datetime.date(2018, 5, 7), datetime.date(2018, 5, 20))
+
+    def test_download_then_skip(self):
+        self.assertEqual(self.download(), {'downloaded': 1})
+        self.assertEqual(os.listdir(self.folder.name).count('House_of_Representatives_2018_05_10_6091.xml'), 1)
+        # No leftover temporary file
+        self.assertFalse([f for f in os.listdir(self.folder.name) if f.endswith('.part')])
+
+        self.assertEqual(self.download(), {'skipped': 1})
+        self.assertEqual(self.download(revalidate=True), {'not modified': 1})
+        self.assertIn('"v1"', [etag for path, etag in FakeAphHandler.requests if path.startswith('/parlInfo/')])
+
+        # Validators of XML files only
+        with open(os.path.join(self.folder.name, HansardDownloader.VALIDATORS_FILE)) as f:
+            validators = json.load(f)
+        self.assertEqual([url.split('/')[3] for url in validators], ['parlInfo'])
+
+    def test_redirect(self):
+        url = 'http://127.0.0.1:%s/parlInfo/search/display/display.w3p;query=Id%%3A%%22chamber%%2Fhansardr%%2F1%%22' % self.server.server_port
+        write_atomic = HansardDownloader.write_atomic
+
+        # Interrupted right after the file is written
+        def interrupted(downloader, filename, chunks):
+            write_atomic(downloader, filename, chunks)
+            if filename.endswith('.xml'):
+                raise KeyboardInterrupt
+
+        with mock.patch.object(HansardDownloader, 'write_atomic', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                HansardDownloader(folder=self.folder.name).download(url)
+        self.assertIn('House_of_Representatives_2018_05_10_6091.xml', os.listdir(self.folder.name))
+
+        # Found under its name after the redirect, then revalidated
+        downloader = HansardDownloader(folder=self.folder.name, revalidate=False)
+        self.assertEqual(downloader.local_filename(url), 'House_of_Representatives_2018_05_10_6091.xml')
+        self.assertEqual(downloader.download(url), 'skipped')
+        self.assertEqual(HansardDownloader(folder=self.folder.name, revalidate=True).download(url), 'not modified')
+
+
+class RepairTest(SimpleTestCase):
+    damaged = u'Western Australia\u2014and that\u2019s \u2022\xa0\xa0\xa0 it'.encode('utf-8').decode('latin-1')
+
+    def test_repair_text(self):
+        report = collections.Counter()
+        self.assertEqual(repair_text(self.damaged, report), "Western Australia - and that's - it")
+        self.assertEqual(sum(report.values()), 3)
+        # Not damaged
+        self.assertEqual(repair_text(u'Western Australia\u2014and that\u2019s it', report), u'Western Australia\u2014and that\u2019s it')
+        self.assertEqual(sum(report.values()), 3)
+
+    def test_chunk_boundaries(self):
+        data = (self.damaged * 10).encode('utf-8')
+        expected = repair_text(self.damaged * 10)
+        for size in (1, 2, 3, 7):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(''.join(iter_repaired(chunks)), expected)
+        self.assertEqual(RepairingReader(io.BytesIO(data)).read().decode('utf-8'), expected)
+
+
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        session = SessionReference.objects.create(parliament_no=45, date=datetime.date(2018, 5, 10), session_no=1, period_no=6, chamber='Senate')
+        debate = DebateReference.objects.create(session=session, debate_title='BILLS', debate_page_no=1)
+        greens = Person.objects.create(name_id='DYW', name='Di Natale, Richard, Sen.', party='AG')
+        labor = Person.objects.create(name_id='R36', name='Shorten, Bill, MP', party='ALP')
+        Sentence.objects.bulk_create([
+            Sentence(debate_ref=debate, spoken_by=greens, talk_type='speech', the_words='Coal mines are closing down.'),
+            Sentence(debate_ref=debate, spoken_by=labor, talk_type='speech', the_words='The coal mining industry employs thousands.'),
+            Sentence(debate_ref=debate, spoken_by=labor, talk_type='speech', the_words='Penalty rates matter.'),
+        ])
+
+    def test_search(self):
+        # Stemmed: "mining" matches "mines"
+        self.assertEqual(search_sentences('coal mining').count(), 2)
+        self.assertEqual([s.spoken_by.party for s in search_sentences('coal', party='ALP')], ['ALP'])
+        self.assertEqual(search_sentences('coal', date_from=datetime.date(2019, 1, 1)).count(), 0)
+
+    def test_search_view(self):
+        response = self.client.get('/hansard/search/', {'q': 'penalty rates', 'chamber': 'Senate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['speaker_id'] for r in response.json()['results']], ['R36'])
+        self.assertEqual(self.client.get('/hansard/search/').status_code, 400)
+        self.assertEqual(self.client.get('/hansard/search/', {'q': 'coal', 'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get('/hansard/search/', {'q': 'coal', 'cursor': encode_cursor(['x'])}).status_code, 400)
+
+    def test_search_pages(self):
+        Sentence.objects.create(debate_ref=DebateReference.objects.get(), spoken_by=Person.objects.get(name_id='DYW'), talk_type='speech', the_words='Coal mines are closing down.')
+        expected = [s.id for s in search_sentences('coal mining')]
+        self.assertEqual(len(expected), 3)
+        ids, cursor = [], None
+        for i in range(3):
+            response = self.client.get('/hansard/search/', dict({'q': 'coal mining', 'limit': 1}, **({'cursor': cursor} if cursor else {}))).json()
+            ids.extend(r['id'] for r in response['results'])
+            cursor = response['next']
+        self.assertIsNone(cursor)
+        # Ties on rank are broken by id
+        self.assertEqual(ids, expected)
+
+    def test_search_uses_gin_index(self):
+        sql, params = search_sentences('coal').query.sql_with_params()
+        with connection.cursor() as cursor:
+            # The table is tiny, make sure the planner doesn't just scan it
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute('RESET enable_seqscan')
+        self.assertIn('hansard_sentence_search_gin', plan)
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for day in (10, 9, 8):
+            session = SessionReference.objects.create(parliament_no=45, date=datetime.date(2018, 5, day), session_no=1, period_no=6, chamber='Senate')
+        debate = DebateReference.objects.create(session=session, debate_title='BILLS', debate_page_no=1)
+        person = Person.objects.create(name_id='DYW', name='Di Natale, Richard, Sen.', party='AG')
+        Sentence.objects.bulk_create([
+            Sentence(debate_ref=debate, spoken_by=person, talk_type='speech', the_words='Sentence %s.' % i) for i in range(5)
+        ])
+
+    def pages(self, url, **params):
+        results, cursor = [], None
+        while 1:
+            response = self.client.get(url, dict(params, **({'cursor': cursor} if cursor else {})))
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.json()['results'])
+            cursor = response.json()['next']
+            if cursor is None:
+                return results
+
+    def test_keyset_pagination(self):
+        self.assertEqual([s['date'] for s in self.pages('/hansard/sessions/', limit=2)], ['2018-05-08', '2018-05-09', '2018-05-10'])
+        self.assertEqual([s['the_words'] for s in self.pages('/hansard/sentences/', limit=2, speaker='DYW')], ['Sentence %s.' % i for i in range(5)])
+        self.assertEqual(self.client.get('/hansard/sentences/', {'cursor': 'garbage'}).status_code, 400)
+
+    def test_invalid_parameters(self):
+        for url, params in (
+            ('/hansard/debates/', {'session': 'x'}),
+            ('/hansard/sentences/', {'session': 'x'}),
+            ('/hansard/sentences/', {'debate': '1.5'}),
+            ('/hansard/sentences/', {'cursor': encode_cursor(['x'])}),
+            ('/hansard/sessions/', {'cursor': encode_cursor(['not a date', 1])}),
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 400, (url, params))
+
+    def test_sentences_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/hansard/sentences/', {'limit': 5})
+        self.assertEqual(response.json()['results'][0]['spoken_by']['name_id'], 'DYW')
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        person = Person.objects.create(name_id='DYW', name='Di Natale, Richard, Sen.', party='AG')
+        for chamber in ('Senate', 'House of Reps'):
+            session = SessionReference.objects.create(parliament_no=45, date=datetime.date(2018, 5, 10), session_no=1, period_no=6, chamber=chamber)
+            debate = DebateReference.objects.create(session=session, debate_title='BILLS', debate_page_no=1)
+            Sentence.objects.bulk_create([
+                Sentence(debate_ref=debate, spoken_by=person, talk_type='speech', the_words='%s, "sentence" %s.' % (chamber, i)) for i in range(3)
+            ])
+
+    def test_export_csv(self):
+        response = self.client.get('/hansard/export/', {'format': 'csv', 'chamber': 'Senate'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual([r['the_words'] for r in rows], ['Senate, "sentence" %s.' % i for i in range(3)])
+        self.assertEqual(rows[0]['speaker_id'], 'DYW')
+
+    def test_export_jsonl(self):
+        rows = list(export_chunks('jsonl', export_rows(date_from=datetime.date(2018, 5, 10), chunk_size=2), batch_size=4))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(''.join(rows).splitlines()), 6)
+        self.assertEqual(self.client.get('/hansard/export/', {'format': 'xls'}).status_code, 400)
+
+    def test_export_parquet(self):
+        import pyarrow.parquet
+        response = self.client.get('/hansard/export/', {'format': 'parquet', 'chamber': 'Senate'})
+        self.assertEqual(response.status_code, 200)
+        table = pyarrow.parquet.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.column('the_words').to_pylist(), ['Senate, "sentence" %s.' % i for i in range(3)])
+        self.assertEqual(table.column('date').to_pylist(), [datetime.date(2018, 5, 10)] * 3)
+
+
+# Electorates of the members speaking in SITTING_DAY
+def create_electorates():
+    for i, elect_div in enumerate(('Wentworth', 'Maribyrnong')):
+        FederalElectorate2016.objects.create(
+            elect_div=elect_div, state='NSW', numccds=0, actual=0, projected=0, total_population=0, australians_over_18=0, area_sqkm=0, sortname=elect_div,
+            the_geom=MultiPolygon(Polygon.from_bbox((150 + i, -34, 151 + i, -33)), srid=4326),
+        )
+
+
+class InstrumentTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    def test_load_hansard_stages(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'House_of_Representatives_2018_05_10_6091.xml')
+            with open(path, 'wb') as f:
+                f.write(SITTING_DAY)
+            with self.assertLogs('hansard.instrument', 'INFO') as logs:
+                with instrumented(path, trace_memory=True, profiler=False) as instrument:
+                    load_hansard(path, engine='lxml')
+
+        stages = {stats['stage']: stats for stats in instrument.summary()}
+        self.assertEqual(set(stages), {'parse', 'persist', 'terms', 'total'})
+        self.assertEqual(stages['parse']['queries'], 0)
+        # 4 sentences, 2 people, 2 debates and a session at least
+        self.assertGreaterEqual(stages['persist']['rows'], 9)
+        self.assertGreater(stages['total']['memory_peak'], 0)
+        self.assertEqual(len(logs.records), 4)
+        self.assertEqual(logs.records[0].subject, path)
+
+
+# Persists a sitting day straight from its XML, see utils.persist_records
+def ingest_xml(xml, filename='House_of_Representatives_2018_05_10_6091.xml', batch_size=None):
+    return persist_records(filename, list(lxml_records(io.BytesIO(xml))), ('hash', len(xml)), batch_size)
+
+
+def speakers(xml):
+    return {paragraph['name_id'] for kind, record in lxml_records(io.BytesIO(xml)) if kind == 'talk' for paragraph in record[1]}
+
+
+class PersonCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    # SQL of the queries looking up, inserting and updating people
+    def person_queries(self, xml):
+        with CaptureQueriesContext(connection) as queries:
+            ingest_xml(xml)
+        sql = [q['sql'] for q in queries.captured_queries]
+        return {
+            'lookups': len([q for q in sql if '"hansard_person"."name_id" =' in q]),
+            'inserts': len([q for q in sql if q.startswith('INSERT INTO "hansard_person"')]),
+            'updates': len([q for q in sql if q.startswith('UPDATE "hansard_person"')]),
+        }
+
+    def test_queries_per_speaker(self):
+        xml = generate_sitting_day('medium', electorates=('Wentworth', 'Maribyrnong'))
+        count = len(speakers(xml))
+        paragraphs = sum(len(record[1]) for kind, record in lxml_records(io.BytesIO(xml)) if kind == 'talk')
+        self.assertGreater(paragraphs, 5 * count)
+        # Once per speaker, however many paragraphs they speak
+        self.assertEqual(self.person_queries(xml), {'lookups': count, 'inserts': count, 'updates': 0})
+        # Unchanged people aren't saved again
+        self.assertEqual(self.person_queries(xml), {'lookups': count, 'inserts': 0, 'updates': 0})
+
+    def test_changed_person(self):
+        ingest_xml(SITTING_DAY)
+        self.assertEqual(self.person_queries(SITTING_DAY.replace(b'<party>ALP</party>', b'<party>IND</party>')), {'lookups': 2, 'inserts': 0, 'updates': 1})
+        self.assertEqual(Person.objects.get(name_id='R36').party, 'IND')
+
+
+class SentenceWriterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    def test_batched_inserts(self):
+        xml = generate_sitting_day('small', electorates=('Wentworth', 'Maribyrnong'))
+        with CaptureQueriesContext(connection) as queries:
+            changes = ingest_xml(xml, batch_size=10)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "hansard_sentence"')]
+        self.assertGreater(changes['inserted'], 10)
+        self.assertEqual(len(inserts), -(-changes['inserted'] // 10))
+        self.assertEqual(Sentence.objects.count(), changes['inserted'])
+
+    def test_rollback(self):
+        # The last speaker's electorate is unknown, after earlier sentences were flushed
+        broken = SITTING_DAY.replace(b'<electorate></electorate>\n              <party>AG</party>', b'<electorate>Nowhere</electorate>\n              <party>AG</party>')
+        self.assertNotEqual(broken, SITTING_DAY)
+        with self.assertRaises(FederalElectorate2016.DoesNotExist):
+            ingest_xml(broken, batch_size=1)
+        for model in (SessionReference, DebateReference, Person, Sentence, IngestedFile):
+            self.assertFalse(model.objects.exists(), model)
+
+
+class DebateCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    def debate_queries(self, xml):
+        with CaptureQueriesContext(connection) as queries:
+            ingest_xml(xml)
+        sql = [q['sql'] for q in queries.captured_queries]
+        return {
+            'selects': len([q for q in sql if q.startswith('SELECT') and 'FROM "hansard_debatereference"' in q]),
+            'inserts': len([q for q in sql if q.startswith('INSERT INTO "hansard_debatereference"')]),
+        }
+
+    def test_shared_references(self):
+        # Shorten's speech twice in a row: two talks, one debate reference
+        start = SITTING_DAY.index(b'<speech>', SITTING_DAY.index(b'<subdebate.2>'))
+        end = SITTING_DAY.index(b'</speech>', start) + len(b'</speech>')
+        xml = SITTING_DAY[:end] + SITTING_DAY[start:end] + SITTING_DAY[end:]
+        records = [record for kind, record in lxml_records(io.BytesIO(xml)) if kind == 'talk']
+        keys = {DebateCache.key(params) for params, paragraphs in records}
+        self.assertLess(len(keys), len(records))
+
+        # Existing references are loaded at once, new ones inserted once each
+        self.assertEqual(self.debate_queries(xml), {'selects': 1, 'inserts': len(keys)})
+        self.assertEqual(DebateReference.objects.count(), len(keys))
+        self.assertEqual(self.debate_queries(xml), {'selects': 1, 'inserts': 0})
+        self.assertEqual(Sentence.objects.filter(spoken_by__name_id='R36').count(), 6)
+
+
+class IngestManifestTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = 'House_of_Representatives_2018_05_10_6091.xml'
+        with open(os.path.join(self.folder.name, self.filename), 'wb') as f:
+            f.write(SITTING_DAY)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def status(self, **kwargs):
+        return ingest(self.filename, engine='lxml', folder=self.folder.name, **kwargs)[2]
+
+    def test_manifest(self):
+        self.assertEqual(self.status(), 'ingested')
+        self.assertEqual(IngestedFile.objects.get().parser_version, PARSER_VERSION)
+        # Unchanged file
+        self.assertEqual(self.status(), 'skipped')
+        # New parser
+        with mock.patch('hansard.utils.PARSER_VERSION', PARSER_VERSION + 1):
+            self.assertEqual(self.status(), 'ingested')
+            self.assertEqual(self.status(), 'skipped')
+        # Changed file
+        with open(os.path.join(self.folder.name, self.filename), 'ab') as f:
+            f.write(b'\n')
+        self.assertEqual(self.status(), 'ingested')
+
+    def test_date_range(self):
+        self.assertEqual(self.status(), 'ingested')
+        self.assertEqual(self.status(force_from=datetime.date(2018, 5, 11)), 'skipped')
+        self.assertEqual(self.status(force_from=datetime.date(2018, 5, 1), force_to=datetime.date(2018, 5, 10)), 'ingested')
+        self.assertEqual(self.status(force_to=datetime.date(2018, 5, 10)), 'ingested')
+
+
+# Files ingested at the same time by ingest_hansards workers, each in its own transaction
+class ConcurrentIngestTest(TransactionTestCase):
+
+    def setUp(self):
+        create_electorates()
+        self.folder = tempfile.TemporaryDirectory()
+        self.filenames = ['House_of_Representatives_2018_05_10_6091.xml', 'House_of_Representatives_2018_05_11_6092.xml']
+        for filename, xml in zip(self.filenames, (SITTING_DAY, SITTING_DAY.replace(b'2018-05-10', b'2018-05-11'))):
+            with open(os.path.join(self.folder.name, filename), 'wb') as f:
+                f.write(xml)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_new_speaker(self):
+        # Both workers look R36 up before either inserts them
+        barrier = threading.Barrier(2, timeout=10)
+        create = PersonCache.create
+
+        def racing_create(cache, name_id, person):
+            if name_id == 'R36':
+                barrier.wait()
+            return create(cache, name_id, person)
+
+        results = {}
+
+        def worker(filename):
+            try:
+                results[filename] = ingest(filename, engine='lxml', folder=self.folder.name)[2]
+            finally:
+                connection.close()
+
+        with mock.patch.object(PersonCache, 'create', racing_create):
+            threads = [threading.Thread(target=worker, args=(filename,)) for filename in self.filenames]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, {filename: 'ingested' for filename in self.filenames})
+        self.assertEqual(Person.objects.filter(name_id='R36').count(), 1)
+        self.assertEqual(SessionReference.objects.count(), 2)
+        self.assertEqual(Sentence.objects.filter(spoken_by__name_id='R36').count(), 6)
+
+
+# Stands for a spaCy pipeline in the nlp registry: "Canberra" is the only entity it knows
+class FakeSpacy(object):
+
+    def __init__(self, version='1.0.0'):
+        self.meta = {'lang': 'en', 'name': 'fake', 'version': version}
+
+    def pipe(self, items, as_tuples=False, batch_size=None):
+        for text, context in items:
+            ents = [types.SimpleNamespace(label_='GPE', text='Canberra')] if 'Canberra' in text else []
+            yield types.SimpleNamespace(ents=ents), context
+
+
+# Models are loaded through spacy.load, counted by `load`
+class NlpRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        registry = mock.patch.dict(nlp._models, clear=True)
+        registry.start()
+        self.addCleanup(registry.stop)
+        patcher = mock.patch('hansard.nlp.spacy.load', side_effect=lambda name, disable: FakeSpacy())
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_loaded_once(self):
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(nlp.get_spacy('fake', ('tagger', 'parser')))) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(model) for model in models}), 1)
+        # Same components, in any order
+        self.assertIs(nlp.get_spacy('fake', ['parser', 'tagger']), models[0])
+        self.assertEqual(self.load.call_args_list, [mock.call('fake', disable=['parser', 'tagger'])])
+
+        # Once per set of disabled components
+        self.assertIsNot(nlp.get_spacy('fake', ()), models[0])
+        self.assertEqual(self.load.call_count, 2)
+
+    @mock.patch('hansard.nlp.stopwords', types.SimpleNamespace(words=lambda language: ['the']))
+    @mock.patch('hansard.nlp.WordNetLemmatizer')
+    def test_warm(self, lemmatizer):
+        nlp.warm('fake', ())
+        self.assertEqual(set(nlp._models), {('spacy', 'fake', ()), ('stoplist',), ('sent_tokenizer',), ('lemmatizer',)})
+        lemmatizer.return_value.lemmatize.assert_called_once_with('warming')
+        nlp.warm('fake', ())
+        nlp.get_spacy('fake', ())
+        self.assertEqual(self.load.call_count, 1)
+        self.assertEqual(lemmatizer.call_count, 1)
+
+    def test_extract_entities_processes(self):
+        # Inherited by the forked workers
+        nlp._models[('spacy', settings.HANSARD_SPACY_MODEL, tuple(sorted(nlp.NER_DISABLE)))] = FakeSpacy()
+        items = [('Canberra is cold.', 1), ('The bill is bad.', 2), ('Thank you.', 3), ('Back to Canberra.', 4), ('Canberra!', 5)]
+        entities = list(nlp.extract_entities(items, batch_size=2, n_process=1))
+        self.assertEqual(entities, [(1, 'GPE', 'Canberra'), (4, 'GPE', 'Canberra'), (5, 'GPE', 'Canberra')])
+        self.assertEqual(list(nlp.extract_entities(iter(items), batch_size=2, n_process=2)), entities)
+        self.assertEqual(self.load.call_count, 0)
+
+
+class AnnotateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        session = SessionReference.objects.create(parliament_no=45, date=datetime.date(2018, 5, 10), session_no=1, period_no=6, chamber='Senate')
+        cls.debate = DebateReference.objects.create(session=session, debate_title='BILLS', debate_page_no=1)
+        cls.person = Person.objects.create(name_id='DYW', name='Di Natale, Richard, Sen.', party='AG')
+        for words in ('Canberra is cold.', 'The bill is bad.', 'Thank you.'):
+            Sentence.objects.create(debate_ref=cls.debate, spoken_by=cls.person, talk_type='speech', the_words=words)
+
+    def spacy(self, version='1.0.0'):
+        key = ('spacy', settings.HANSARD_SPACY_MODEL, tuple(sorted(nlp.NER_DISABLE)))
+        return mock.patch.dict(nlp._models, {key: FakeSpacy(version)})
+
+    def stale(self):
+        return set(annotate.stale_sentences().values_list('the_words', flat=True))
+
+    def test_only_stale_sentences(self):
+        with self.spacy():
+            self.assertEqual(len(self.stale()), 3)
+            self.assertEqual(annotate.annotate_sentences(), 3)
+            self.assertEqual(NamedEntity.objects.get().text, 'Canberra')
+            self.assertEqual(self.stale(), set())
+            self.assertEqual(annotate.annotate_sentences(), 0)
+
+            # Changed words
+            Sentence.objects.filter(the_words='Thank you.').update(the_words='Thank you, Canberra.')
+            # New sentence
+            Sentence.objects.create(debate_ref=self.debate, spoken_by=self.person, talk_type='speech', the_words='Order!')
+            self.assertEqual(self.stale(), {'Thank you, Canberra.', 'Order!'})
+            self.assertEqual(annotate.annotate_sentences(), 2)
+            self.assertEqual(NamedEntity.objects.count(), 2)
+            self.assertEqual(SentenceAnnotation.objects.count(), 4)
+            self.assertEqual(self.stale(), set())
+
+        # New models
+        with self.spacy('2.0.0'):
+            self.assertEqual(len(self.stale()), 4)
+            self.assertEqual(annotate.annotate_sentences(), 4)
+            self.assertEqual(self.stale(), set())
+
+
+class TermsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+        ingest_xml(SITTING_DAY)
+        senate = generate_sitting_day('small', date=datetime.date(2018, 5, 11), chamber='Senate', electorates=('Wentworth', 'Maribyrnong'))
+        ingest_xml(senate, filename='Senate_2018_05_11_6100.xml')
+
+    def counts(self):
+        return sorted(TermFrequency.objects.values_list('session_id', 'person_id', 'term', 'count', 'party', 'chamber', 'date'))
+
+    def test_session_counts(self):
+        session = SessionReference.objects.get(chamber='House of Reps')
+        shorten = Person.objects.get(name_id='R36')
+        counts = dict(TermFrequency.objects.filter(session=session, person=shorten).values_list('term', 'count'))
+        self.assertEqual(counts['bill'], 2)
+        self.assertNotIn('this', counts)
+        self.assertEqual(set(TermFrequency.objects.filter(session=session).values_list('party', flat=True)), {'ALP', 'AG'})
+
+    def test_top_terms_filters(self):
+        self.assertEqual(top_terms(k=2, chamber='House of Reps')[0], ('bill', 2))
+        self.assertEqual(top_terms(date_to=datetime.date(2018, 5, 10)), top_terms(chamber='House of Reps'))
+        self.assertEqual(top_terms(date_from=datetime.date(2018, 5, 11)), top_terms(chamber='Senate'))
+        self.assertEqual(top_terms(date_from=datetime.date(2018, 5, 12)), [])
+        senate_terms = dict(top_terms(k=1000, chamber='Senate'))
+        self.assertNotIn('rise', senate_terms)
+        self.assertEqual(top_terms(person=Person.objects.get(name_id='DYW')), [('late', 1), ('night', 1)])
+
+    def test_rebuild(self):
+        incremental = self.counts()
+        self.assertTrue(incremental)
+        TermFrequency.objects.all().delete()
+        rebuild_terms()
+        self.assertEqual(self.counts(), incremental)
+
+
+class SentenceDiffTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+
+    def ingest(self, xml):
+        return persist_records('House_of_Representatives_2018_05_10_6091.xml', list(lxml_records(io.BytesIO(xml))), ('hash', len(xml)))[2]
+
+    def sentences(self):
+        return list(Sentence.objects.order_by('debate_ref_id', 'position').values_list('id', 'the_words', 'content_hash'))
+
+    def test_reingest(self):
+        self.assertEqual(self.ingest(SITTING_DAY), {'inserted': 4, 'updated': 0, 'deleted': 0, 'unchanged': 0})
+        before = self.sentences()
+        self.assertEqual(self.ingest(SITTING_DAY), {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 4})
+        self.assertEqual(self.sentences(), before)
+        for sentence in Sentence.objects.all():
+            self.assertEqual(sentence.content_hash, sentence_hash(sentence))
+
+        # Same ids, changed words
+        changed = SITTING_DAY.replace(b'Thank you.', b'Thank you all.')
+        self.assertEqual(self.ingest(changed), {'inserted': 0, 'updated': 1, 'deleted': 0, 'unchanged': 3})
+        self.assertEqual([id for id, words, content_hash in self.sentences()], [id for id, words, content_hash in before])
+        self.assertIn('Thank you all.', [words for id, words, content_hash in self.sentences()])
+
+        removed = changed.replace(b'<p class="HPS-Normal"><span class="HPS-Normal">Thank you all.</span></p>', b'')
+        self.assertEqual(self.ingest(removed), {'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 3})
+        self.assertEqual(Sentence.objects.count(), 3)
+        self.assertEqual(self.ingest(changed)['inserted'], 1)
+
+    def test_paragraph_moved(self):
+        self.ingest(SITTING_DAY)
+        before = dict((words, id) for id, words, content_hash in self.sentences())
+        bad_bill = b'<p class="HPS-Normal"><span class="HPS-Normal">It is a bad bill'
+        inserted = SITTING_DAY.replace(bad_bill, b'<p class="HPS-Normal"><span class="HPS-Normal">Hear, hear.</span></p>\n' + bad_bill)
+
+        # The paragraphs after the new one keep their ids, at their new positions
+        self.assertEqual(self.ingest(inserted), {'inserted': 1, 'updated': 0, 'deleted': 0, 'unchanged': 4})
+        after = self.sentences()
+        self.assertEqual([words for id, words, content_hash in after][:4], ['I rise to speak on this bill.', 'Hear, hear.', 'It is a bad bill - really.', 'Thank you.'])
+        self.assertEqual({words: id for id, words, content_hash in after if words != 'Hear, hear.'}, before)
+        positions = Sentence.objects.order_by('debate_ref_id', 'position').values_list('debate_ref_id', 'position')
+        self.assertEqual([position for debate_id, position in positions], [0, 1, 2, 3, 0])
+
+        self.assertEqual(self.ingest(SITTING_DAY), {'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 4})
+        self.assertEqual(dict((words, id) for id, words, content_hash in self.sentences()), before)
+        self.assertEqual(self.ingest(SITTING_DAY)['unchanged'], 4)
+
+    def test_debate_removed(self):
+        self.ingest(SITTING_DAY)
+        self.assertEqual(DebateReference.objects.count(), 2)
+        start = SITTING_DAY.index(b'<subdebate.1>', SITTING_DAY.index(b'</subdebate.1>'))
+        end = SITTING_DAY.index(b'</subdebate.1>', start) + len(b'</subdebate.1>')
+        removed = SITTING_DAY[:start] + SITTING_DAY[end:]
+
+        self.assertEqual(self.ingest(removed), {'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 3})
+        self.assertEqual(list(DebateReference.objects.values_list('subdebate1_title', flat=True)), ['Treasury Laws Amendment Bill 2018'])
+        self.assertFalse(Sentence.objects.filter(spoken_by__name_id='DYW').exists())
+        self.assertEqual(self.ingest(SITTING_DAY)['inserted'], 1)
+
+    def test_malformed_time(self):
+        # Colon missing, and hours missing
+        xml = SITTING_DAY.replace(b'<span class="HPS-Time">14:01</span>', b'<span class="HPS-Time">1401</span>').replace(b'<span class="HPS-Time">24</span>', b'')
+        self.assertEqual(self.ingest(xml)['inserted'], 4)
+        times = dict(Sentence.objects.values_list('spoken_by__name_id', 'time_talk_started'))
+        self.assertEqual(times, {'R36': datetime.time(14, 1), 'DYW': None})
+        self.assertEqual(self.ingest(xml)['unchanged'], 4)
+        self.assertEqual(talk_time('14'), datetime.time(14, 0))
+        self.assertIsNone(talk_time('99:99'))
+
+
+class AnalysisTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_electorates()
+        persist_records('House_of_Representatives_2018_05_10_6091.xml', list(lxml_records(io.BytesIO(SITTING_DAY))), ('hash', len(SITTING_DAY)))
+
+    def test_counts(self):
+        counts = SentenceCounts(stoplist={'the', '.'})
+        counts.add('speech', 'ALP', 'Shorten, Bill, MP', 'The bills pass.', ['The', 'bills', 'pass', '.'], ['DT', 'NNS', 'VBP', '.'], ['the', 'bill', 'pass', '.'])
+        counts.add('interjection', '', 'SPEAKER, The', 'Order!', None, None, None)
+        counts.add('interjection', 'LP', 'Turnbull, Malcolm, MP', 'Good bill', ['Good', 'bill'], ['JJ', 'NN'], ['good', 'bill'])
+        report = counts.report(top=2)
+        self.assertEqual((report['sentences'], report['unannotated']), (3, 1))
+        self.assertEqual(report['interjecting_sentences'], {'SPEAKER, The': 1, 'LP': 1})
+        self.assertEqual(report['verbs'], [('pass', 1)])
+        self.assertEqual(report['nouns'], [('bill', 1)])
+        self.assertEqual(len(report['words']), 2)
+
+    def test_read_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            reports = analyse_stored(date_from=datetime.date(2018, 5, 10), per_sitting=True)
+        self.assertEqual([title for title, report in reports], ['2018-05-10 House of Reps'])
+        self.assertEqual(reports[0][1]['sentences'], 4)
+        self.assertEqual(analyse_stored(speaker='R36')[0][1]['sentences'], 3)
+        self.assertEqual(analyse_stored(date_to=datetime.date(2018, 5, 9))[0][1]['sentences'], 0)
+        self.assertFalse([q for q in queries.captured_queries if not q['sql'].lstrip().upper().startswith(('SELECT', 'DECLARE', 'FETCH', 'CLOSE', 'SAVEPOINT', 'RELEASE'))])
+
+
+class PipelineTest(SimpleTestCase):
+
+    def test_stages(self):
+        pipeline = Pipeline([
+            Stage('split', lambda n: [n] * n, workers=2, fan_out=True),
+            Stage('square', lambda n: n * n if n % 2 else None, workers=3),
+        ], queue_size=1)
+        self.assertEqual(sorted(pipeline.run(range(5))), [1, 9, 9, 9])
+        self.assertEqual(pipeline.processed, {'split': 5, 'square': 10})
+
+    def test_backpressure(self):
+        produced, lock = [], threading.Lock()
+        release = threading.Event()
+
+        def produce(n):
+            with lock:
+                produced.append(n)
+            return n
+
+        def consume(n):
+            release.wait()
+            return n
+
+        pipeline = Pipeline([Stage('produce', produce), Stage('consume', consume)], queue_size=2)
+        thread = threading.Thread(target=lambda: setattr(pipeline, 'results', pipeline.run(range(100))))
+        thread.start()
+        release.wait(0.5)
+        # The consumer holds an item, the queue in between 2 more, and the producer is stuck putting a fourth one
+        self.assertLessEqual(len(produced), 4)
+        release.set()
+        thread.join()
+        self.assertEqual(sorted(pipeline.results), list(range(100)))
+
+    def test_failures(self):
+        def check(n):
+            if n == 3:
+                raise ValueError(n)
+            return n
+
+        pipeline = Pipeline([Stage('check', check, workers=2)])
+        with self.assertLogs('hansard.pipeline', 'ERROR'):
+            self.assertEqual(sorted(pipeline.run(range(5))), [0, 1, 2, 4])
+        self.assertEqual([(stage, item) for stage, item, error in pipeline.failures], [('check', 3)])
+
+        pipeline = Pipeline([Stage('check', check), Stage('identity', lambda n: n)], fail_fast=True)
+        with self.assertLogs('hansard.pipeline', 'ERROR'):
+            with self.assertRaises(ValueError):
+                pipeline.run(range(1000))
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'hansard'
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('sessions/', views.sessions, name='sessions'),
+    path('debates/', views.debates, name='debates'),
+    path('people/', views.people, name='people'),
+    path('sentences/', views.sentences, name='sentences'),
+    path('export/', views.export_sentences, name='export'),
+]
@@ -5,6 +5,9 @@ import spacy
 import datetime
 import requests
 import string
+import time
+import hashlib
+import re
 
 from lxml import etree
 from bs4 import BeautifulSoup, element
@@ -16,263 +19,167 @@ from nltk.tag.stanford import StanfordNERTagger
 from nltk.tokenize.punkt import PunktSentenceTokenizer
 from nltk.chunk import tree2conlltags
 
+from django.conf import settings
+from django.db import transaction
 from django.db.utils import DataError
 
 from .models import *
+from .parsers import *
+from .ingest import *
+from .downloader import HansardDownloader
+from .instrument import instrumented, stage, timed
+from . import nlp, annotate, terms
 
 logger = logging.getLogger(__name__)
 
 
-# Contextualise a tag within a hansard file 
-# by extracting speaker, type, time and cleaned text
-def contextualise_tag(tag, debate_id):
-    try:
-        speech, person = {'debate_ref_id': debate_id}, {}
-
-        # Rare: missing time marker
-        speech_header = tag.parent.p.span
-
-        # Time: mostly a single tag text value but sometimes spread across several tags
-        """
-                  <span class="HPS-Time">15</span>
-                  <span class="HPS-Time">:</span>
-                  <span class="HPS-Time">26</span>
-        """
-        # Manually fixes:
-        # House_of_Representatives_2016_09_15_4439.xml: weirdo characters at line 1
-        # House_of_Representatives_2017_08_14_5360.xml: Shorten's intervention at 14:01
-        # House_of_Representatives_2016_08_31_4425.xml: 3 times starting with 13
-        # House_of_Representatives_2016_09_12_4432.xml: 1 time starting with 14
-        # House_of_Representatives_2016_10_10_4462.xml: 1 time starting with 10
-        # House_of_Representatives_2016_10_17_4486.xml: 2 times starting at 10:01
-        time_started_tags = speech_header.find_all(attrs={'class':'HPS-Time'})
-        allowed_chars = "0123456789:"
-        if len(time_started_tags) > 0:
-            speech['time_talk_started'] = ''.join([tst.get_text() for tst in time_started_tags])
-            speech['time_talk_started'] = ''.join([c for c in speech['time_talk_started'] if c in allowed_chars])
-            # TODO: if the time is icomplete with format ':XY', use the 2 chars before the time span tag
-            # Oddity
-            if speech['time_talk_started']=='24:00':
-                speech['time_talk_started'] = '00:00'
-
-        speech_meta = tag.parent.parent.parent.find('talk.start')
-        if speech_meta:
-            speech['talk_type'] = speech_meta.parent.name
-
-            # TODO: add in_gov and first_speech if they have value / meaning
-            # speech['first_speech'] = speech_meta.talker.find('first.speech').get_text()
-            # person['in_gov'] = speech_meta.talker.find('in.gov').get_text()
-
-            name_id = speech_meta.talker.find('name.id').get_text()
-            person['name'] = speech_meta.talker.find('name').get_text()
-            electorate = speech_meta.talker.find('electorate').get_text()
-            # Senate members don't have a federal electorate
-            if len(electorate) > 0:
-                person['electorate'] = FederalElectorate2016.objects.get(elect_div=electorate)
-            person['party'] = speech_meta.talker.find('party').get_text()
-            pobj, created = Person.objects.update_or_create(name_id=name_id, defaults=person)
-
-            speech['spoken_by']=pobj
-
-            # First element: a bit of wrangling to get the useful text
-            if tag==tag.parent.p:
-                # Rare: missing time marker
-                siblings = [si if isinstance(si, element.NavigableString) else si.get_text() for si in (tag.find(attrs={'class':'HPS-Time'}) or tag.span).next_siblings]
-                speech['the_words'] = "".join(siblings)[4:]
-            else:
-                # Other elements are more straight forward
-                speech['the_words'] = tag.get_text()
-
-            # Sanitisation against line returns and non-ASCII chars
-            speech['the_words'] = speech['the_words'].strip('\n')
-            # TODO: process this kind of stuff: "... northern Western Australiaâ\x80\x94and that\'s thanks ..."
-            # parse_hansard('Senate_2017_12_06_5788.xml')
-            speech['the_words'] = speech['the_words'].replace("\\x80\\x94", '-')
-
-            # Create referenced sentences records
-            Sentence.objects.create(**speech)
-
-            return speech
+# Persists a paragraph extracted by one of the parser engines
+# Its sentence is queued on `writer`, see SentenceWriter
+# Speakers are looked up through the `people` cache if given
+def save_paragraph(paragraph, debate_id, writer, people=None):
+    speech, person = {'debate_ref_id': debate_id}, {}
 
-        else:
-            # No meta info -> can't contextualise the sentence
-            #logger.debug("Tag has no meta: %s" % (str(tag)[:50],))
-            return None
+    if 'time_talk_started' in paragraph:
+        speech['time_talk_started'] = talk_time(paragraph['time_talk_started'])
+    speech['talk_type'] = paragraph['talk_type']
 
-    except Exception as e:
-        logger.debug("Error contextualising tag: %s" % (str(tag)[:300],))
-        raise
+    if people:
+        pobj = people.get(paragraph['name_id'], paragraph['name'], paragraph['party'], paragraph['electorate'])
+    else:
+        person['name'] = paragraph['name']
+        # Senate members don't have a federal electorate
+        if len(paragraph['electorate']) > 0:
+            person['electorate'] = FederalElectorate2016.objects.get(elect_div=paragraph['electorate'])
+        person['party'] = paragraph['party']
+        pobj, created = Person.objects.update_or_create(name_id=paragraph['name_id'], defaults=person)
 
+    speech['spoken_by'] = pobj
+    speech['the_words'] = paragraph['the_words']
 
-# Returns a structured log of actual speeches devoid of procedural ornements, and annotated by their speaker, start time and type
-def parse_hansard(filename='House of Representatives_2018_05_10_6091.xml'):
-    # TODO: a general sanitisation step to only keep ASCII characters
-    # loads of \x80\x94 everywhere
-    # House_of_Representatives_2016_09_15_4439.xml starts with weird characters
-
-    # Supported parsers
-    # https://www.crummy.com/software/BeautifulSoup/bs4/doc/#installing-a-parser
-    with open(os.path.join('hansard/data/raw', filename), 'r') as xml: 
-        soup = BeautifulSoup(xml.read(), "xml")
-
-    session = soup.hansard.find('session.header')
-    dt = datetime.datetime.strptime(session.date.get_text(), '%Y-%m-%d')
-    session_params = {
-        'parliament_no': int(session.find('parliament.no').get_text()),
-        'date': dt,
-        'session_no': int(session.find('session.no').get_text()),
-        'period_no': int(session.find('period.no').get_text()),
-        'chamber': session.chamber.get_text(),
-    }
-    sobj, created = SessionReference.objects.update_or_create(**session_params, defaults=session_params)
-
-     # Fragment contextualisation & cleaning
-    fragments = []
-    interjection_classes = ['HPS-MemberInterjecting', 'HPS-MemberIInterjecting', 'HPS-OfficeInterjecting']
-
-    for talk in soup.find_all('talk.text'):
-        skip_talk = False
-        # skip <talk.text>\n</talk.text>
-        if len(talk.get_text()) > 1:
-            sd2 = talk.parent.parent
-
-            base_params = {
-                'session': None,
-                'debate_title': None,
-                'debate_page_no': None,
-                'subdebate1_title': None,
-                'subdebate1_page_no': None,
-                'subdebate2_title': None,
-                'subdebate2_page_no': None,                
-            }
-
-            try:
-                while 1:
-                    if sd2.name=='debate':
-                        params = base_params
-                        params.update({
-                            'debate_title': sd2.debateinfo.title.get_text(),
-                            'debate_page_no': int(sd2.debateinfo.find('page.no').get_text()),
-                            'session': sobj,
-                        })
-                        # Stop processing the entire debate section!
-                        if params['debate_title'] in ('SHADOW MINISTERIAL ARRANGEMENTS', 'MINISTERIAL ARRANGEMENTS'):
-                            # Will that go to the next for iteration?
-                            logger.debug("Skipping %s talk.text ..." % (params['debate_title'],))
-                            skip_talk = True
-                            break
-                        #logger.debug("debate tag enclosing %s > talk.text: %s" % (talk.parent.name, params))
-                        dobj, created = DebateReference.objects.update_or_create(**params, defaults=params)
-                        break
-                    elif sd2.name=='subdebate.1' and sd2.parent.name=='debate':
-                        params = base_params
-                        params.update({                    
-                            'subdebate1_title': sd2.subdebateinfo.title.get_text(),
-                            'subdebate1_page_no': int(sd2.subdebateinfo.find('page.no').get_text()) if len(sd2.subdebateinfo.find('page.no').get_text()) else None,
-                            'debate_title': sd2.parent.debateinfo.title.get_text(),
-                            'debate_page_no': int(sd2.parent.debateinfo.find('page.no').get_text()),
-                            'session': sobj,
-                        })
-                        #logger.debug("debate > subdebate.1 tag enclosing %s > talk.text: %s" % (talk.parent.name, params))
-                        dobj, created = DebateReference.objects.update_or_create(**params, defaults=params)
-                        break
-                    elif sd2.name=='subdebate.2':
-                        params = base_params
-                        params.update({
-                            'subdebate2_title': sd2.subdebateinfo.title.get_text(),
-                            'subdebate2_page_no': int(sd2.subdebateinfo.find('page.no').get_text()) if len(sd2.subdebateinfo.find('page.no').get_text()) else None,
-                            'session': sobj,
-                        })
-                        if sd2.parent.name=='debate':
-                            params.update({
-                                'debate_title': sd2.parent.debateinfo.title.get_text(),
-                                'debate_page_no': int(sd2.parent.debateinfo.find('page.no').get_text()) if len(sd2.parent.debateinfo.find('page.no').get_text()) else None,
-                            })
-                        elif sd2.parent.name=='subdebate.1' and sd2.parent.parent.name=='debate':
-                            params.update({
-                                'subdebate1_title': sd2.parent.subdebateinfo.title.get_text(),
-                                'subdebate1_page_no': int(sd2.parent.subdebateinfo.find('page.no').get_text()) if len(sd2.parent.subdebateinfo.find('page.no').get_text()) else None,
-                                'debate_title': sd2.parent.parent.debateinfo.title.get_text(),
-                                'debate_page_no': int(sd2.parent.parent.debateinfo.find('page.no').get_text()),
-                            })
-                        else:
-                            #logger.debug("subdebate.2 tag has no debate or subdebate.1 direct ancestor: %s" % talk.parent.parent.name)
-                            pass
-
-                        #logger.debug("%s > %s > %s tag enclosing %s > talk.text: %s" % (sd2.parent.parent.name, sd2.parent.name, sd2.name, talk.parent.name, params))
-                        dobj, created = DebateReference.objects.update_or_create(**params, defaults=params)
-                        break
-                    sd2 = sd2.parent
-
-            except AttributeError as e:
-                logger.debug("Couldn't extract debate reference: %s" % str(sd2)[:300])
-                raise
-            except DataError as e:
-                logger.debug("Couldn't persist debate reference: %s" % params)
-                raise
-
-            if skip_talk:
-                continue
-            else:
-                # Remove all sentences at this debate reference
-                Sentence.objects.filter(debate_ref=dobj).delete()
-                # ... and re-create them
-                for p in talk.find_all('p'):
-                    if p.find(attrs={'class': interjection_classes}):
-                        pass
-                    else:
-                        contextualised_tag = contextualise_tag(p, dobj.id)
-                        if contextualised_tag:
-                            fragments.append(contextualised_tag)
+    # Create referenced sentences records
+    speech['sentence'] = writer.add(speech)
 
-    sample = " ".join([frag['the_words'] for frag in fragments if frag])
-    return soup, sample
+    return speech
 
 
-def analyse_hansard_file(filename='House of Representatives_2018_05_10_6091.xml'):
-    # Word frequency analysis
-    my_abbrev = ['\'m', '.', ',', '\'s', '(', ')', 'n\'t', '\'ve', ';', '$', ':', '\'', '?', '\'ll', '\'re']
-    stoplist = set(stopwords.words('english') + my_abbrev)
-    soup, sample = parse_hansard(filename)
+# Returns a structured log of actual speeches devoid of procedural ornements, and annotated by their speaker, start time and type
+def parse_hansard(filename='House of Representatives_2018_05_10_6091.xml', engine=None, batch_size=None, digest=None, folder='hansard/data/raw'):
+    soup, fragments = load_hansard(filename, engine, batch_size, digest, folder)
+    sample = " ".join([frag['the_words'] for frag in fragments if frag])
+    return soup, sample
 
-    # Tokenisation, tagging, chunking
-    sent_tokenizer = PunktSentenceTokenizer()
-    # Stop breaking sentence at "No."
-    sent_tokenizer._params.abbrev_types.add('no')
-    #sentences = nltk.sent_tokenize(sample)
-    # TODO: improve sentence tokenizer - still far from good
-    sentences = sent_tokenizer.tokenize(sample)
 
-    tokenized_sentences = [nltk.word_tokenize(sentence) for sentence in sentences]
-    tagged_sentences = [nltk.pos_tag(sentence) for sentence in tokenized_sentences]
-    chunked_sentences = nltk.ne_chunk_sents(tagged_sentences, binary=True)
+# Loads a hansard file, returning the soup and the list of speech fragments, each with its Sentence object
+# engine: 'soup' loads the whole file as a BeautifulSoup tree, 'lxml' streams it debate by debate (no soup is returned)
+# The file is loaded in a single transaction, sentences being inserted by batches of `batch_size`,
+# term frequencies of the sitting refreshed, and the file recorded in the ingest manifest along with its content hash
+def load_hansard(filename, engine=None, batch_size=None, digest=None, folder='hansard/data/raw'):
+    # Encoding damage (loads of \x80\x94 everywhere) is repaired by both engines while reading the file
+    # TODO: House_of_Representatives_2016_09_15_4439.xml starts with weird characters
+    engine = engine or settings.HANSARD_PARSER_ENGINE
+    path = os.path.join(folder, filename)
+    digest = digest or file_digest(path)
+    if engine == 'soup':
+        with stage('load'):
+            soup = load_soup(path)
+        records = soup_records(soup)
+    elif engine == 'lxml':
+        soup = None
+        records = lxml_records(path)
+    else:
+        raise ValueError("Unknown hansard parser engine: %s (expected one of %s)" % (engine, ', '.join(ENGINES)))
+
+    sobj, fragments, changes = persist_records(filename, records, digest, batch_size)
+    return soup, fragments
+
+
+# Persists the records of a file yielded by a parser engine, see load_hansard
+# Returns the SessionReference, the list of speech fragments and the numbers of sentences inserted, updated, deleted and unchanged
+def persist_records(filename, records, digest, batch_size=None):
+    # Fragment contextualisation & cleaning
+    fragments = []
+    writer = SentenceWriter(batch_size)
+    people = PersonCache()
+
+    with transaction.atomic():
+        # Parsing happens lazily between records, it's timed apart from persistence
+        for kind, record in timed(records, 'parse'):
+            if kind == 'session':
+                with stage('persist'):
+                    sobj, created = SessionReference.objects.update_or_create(**record, defaults=record)
+                    debates = DebateCache(sobj)
+                continue
 
+            params, paragraphs = record
+            with stage('persist'):
+                try:
+                    dobj, stale = debates.get(params)
+                except DataError as e:
+                    logger.debug("Couldn't persist debate reference: %s" % params)
+                    raise
+
+                # Sentences of a previous ingest are diffed against the ones of the file, see SentenceWriter
+                if stale:
+                    writer.load_debate(dobj.id)
+                for paragraph in paragraphs:
+                    fragments.append(save_paragraph(paragraph, dobj.id, writer, people))
+
+        with stage('persist'):
+            # Along with the (sub)debates no longer in the file
+            writer.finish(debates.unseen())
+        with stage('terms'):
+            terms.update_session_terms(sobj, ((frag['spoken_by'], frag['the_words']) for frag in fragments))
+        IngestedFile.objects.update_or_create(filename=filename, defaults={
+            'content_hash': digest[0],
+            'size': digest[1],
+            'parser_version': PARSER_VERSION,
+        })
+    changes = writer.stats()
+    logger.info("%s: %s sentences inserted, %s updated, %s deleted, %s unchanged" % (
+        filename, changes['inserted'], changes['updated'], changes['deleted'], changes['unchanged']), extra={'subject': filename, 'changes': changes})
+    logger.debug("People lookups: %s, debate lookups: %s" % (people.stats(), debates.stats()))
+
+    return sobj, fragments, changes
+
+
+# NLP annotations are computed for new or changed sentences only, and stored (see hansard.annotate)
+# Reports are then read from the database
+# See hansard.analysis for read-only reports on sittings already ingested
+def analyse_hansard_file(filename='House of Representatives_2018_05_10_6091.xml', folder='hansard/data/raw'):
+    with instrumented(filename):
+        stoplist = nlp.get_stoplist()
+        # The interjection analysis below needs the whole tree
+        soup, fragments = load_hansard(filename, engine='soup', folder=folder)
+        if not fragments:
+            return
+        session_id = DebateReference.objects.filter(id=fragments[0]['debate_ref_id']).values_list('session_id', flat=True)[0]
+        sentences = Sentence.objects.filter(debate_ref__session_id=session_id)
+        with stage('annotate'):
+            annotated = annotate.annotate_sentences(sentences)
+        logger.debug("%s sentences annotated" % (annotated,))
+
+        with stage('reports'):
+            analysis_reports(sentences, stoplist)
+
+        with stage('interjections'):
+            interjection_report(soup)
+
+def analysis_reports(sentences, stoplist):
     # Word frequency over all sentences
-    tokens = []
-    for sentence in tokenized_sentences:
-        tokens += [word for word in sentence if word.lower() not in stoplist]
+    tags = list(annotate.annotated_tokens(sentences))
+    tokens = [word for word, tag, lemma in tags if word.lower() not in stoplist]
     display_freq(tokens)
 
     # Part-of-speech analysis
-    tags = []
-    for sentence in tagged_sentences:
-        tags += sentence
-    pos_analysis(tags, my_abbrev)
-
-    # spaCy NER
-    nlp = spacy.load('en_core_web_sm')
-    doc = nlp(sample)
-    # Find named entities, phrases and concepts
-    ne_spacy = {}
-    for entity in doc.ents:
-        if entity.label_ in ne_spacy:
-            ne_spacy[entity.label_] += [entity.text]
-        else:
-            ne_spacy[entity.label_] = [entity.text]
-    logger.debug("Entity number per type: %s" % {k:len(v) for k,v in ne_spacy.items()})
-    for k in ne_spacy.keys():
-        display_freq(ne_spacy[k], 'Named entities (%s)' % (k,), top=20)
+    pos_analysis(tags, nlp.MY_ABBREV)
+
+    # spaCy named entities, phrases and concepts
+    ne_spacy = annotate.entity_counts(sentences, top=20)
+    logger.debug("Entity types: %s" % (', '.join(ne_spacy.keys()),))
+    for k, counts in ne_spacy.items():
+        logger.debug("Named entities (%s): %s" % (k, ", ".join([text for text, count in counts])))
 
+def interjection_report(soup):
     # Interjection analysis
     parties = {}
     all_interjections = soup.find_all('interjection')
@@ -290,43 +197,62 @@ def display_freq(tokens, title='Words', top=50):
     sorted_d = sorted([(key, val) for key, val in freq.items()], key=lambda x: x[1], reverse=True)
     logger.debug("%s (total=%s): %s" % (title, len(tokens), ", ".join([k for k,v in sorted_d[:top]])))
 
+# tags: (word, POS tag, lemma) triples
 def pos_analysis(tags, stoplist):
-    wordnet_lemmatizer = WordNetLemmatizer()
-    nouns = [wordnet_lemmatizer.lemmatize(word) for word, tag in tags if tag=='NN']
+    nouns = [lemma for word, tag, lemma in tags if tag=='NN']
     display_freq(nouns, 'Nouns', top=50)
-    adjectives = [wordnet_lemmatizer.lemmatize(word) for word, tag in tags if tag=='JJ']
+    adjectives = [lemma for word, tag, lemma in tags if tag=='JJ']
     display_freq(adjectives, 'Adjectives', top=50)
-    verbs = [wordnet_lemmatizer.lemmatize(word, pos='v') for word, tag in tags if tag[:2] in ('VB') and word not in stoplist]
+    verbs = [lemma for word, tag, lemma in tags if tag[:2]=='VB' and word not in stoplist]
     display_freq(verbs, 'Verbs', top=50)
 
-def parse_all_hansards(folder='hansard/data/raw'):
-    for dirpath, dirnames, filenames in os.walk(folder):
-        for fname in sorted(filenames):
-            if fname.lower().endswith('.xml'):
-                logger.debug("Parsing: %s ... " % (fname))
-                parse_hansard(fname)
-
-def download_all_hansards(date_from=datetime.date(2016, 8, 30), date_to=None):
-    if date_to is None:
-        date_to = datetime.date.today()
-
-    base_url = "https://www.aph.gov.au/Parliamentary_Business/Hansard?wc="
-
-    for x in range((date_to - date_from).days // 7 + 1):
-        sitting_week =  "%s%s" % (base_url, (date_from +  datetime.timedelta(days=x * 7)).strftime('%d/%m/%Y'))
-        logger.debug("Scraping %s" % (sitting_week,))
-        page = requests.get(sitting_week)
-        soup = BeautifulSoup(page.text, 'html.parser')
-
-        # All Links to XML documents
-        xml_links = soup.find('h2').parent.find_all('a', attrs={'title': 'XML format'})
-
-        # Download these links!
-        for xml_link in xml_links:
-            base_api = "https://www.aph.gov.au"
-            hansard = requests.get(base_api + xml_link['href'])
-
-            target_filename = hansard.url.split('/')[-1].split(';')[0].replace('%20', '_').replace('_Official','')
+# (sha256 hex digest, size) of a file
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest(), os.path.getsize(path)
+
+# Sitting day of a hansard file, e.g. House_of_Representatives_2018_05_10_6091.xml
+def hansard_date(filename):
+    match = re.search(r'(\d{4})_(\d{2})_(\d{2})', filename)
+    return datetime.date(*[int(g) for g in match.groups()]) if match else None
+
+# Whether a file has changed (or the parser has) since it was last ingested
+def needs_ingest(filename, digest):
+    return not IngestedFile.objects.filter(filename=filename, content_hash=digest[0], parser_version=PARSER_VERSION).exists()
+
+# Paths relative to `folder`
+def list_hansards(folder='hansard/data/raw'):
+    return [os.path.relpath(os.path.join(dirpath, fname), folder) for dirpath, dirnames, filenames in os.walk(folder) for fname in sorted(filenames) if fname.lower().endswith('.xml')]
+
+# Unchanged files are skipped unless `force` is set
+def parse_all_hansards(folder='hansard/data/raw', engine=None, force=False):
+    for fname in list_hansards(folder):
+        digest = file_digest(os.path.join(folder, fname))
+        if force or needs_ingest(fname, digest):
+            logger.debug("Parsing: %s ... " % (fname))
+            parse_hansard(fname, engine=engine, digest=digest, folder=folder)
+
+# Parses a file, logging rather than raising errors so that a batch of files can carry on
+# Returns (filename, elapsed seconds, status, error or None) with status one of 'ingested', 'skipped' or 'failed'
+# Stages are instrumented, see hansard.instrument for trace_memory and profiler
+def ingest_hansard_file(filename, engine=None, force=False, trace_memory=None, profiler=None, folder='hansard/data/raw'):
+    started = time.time()
+    status, error = 'ingested', None
+    try:
+        digest = file_digest(os.path.join(folder, filename))
+        if force or needs_ingest(filename, digest):
+            with instrumented(filename, trace_memory, profiler):
+                parse_hansard(filename, engine=engine, digest=digest, folder=folder)
+        else:
+            status = 'skipped'
+    except Exception as e:
+        logger.exception("Couldn't ingest %s" % (filename,))
+        status, error = 'failed', repr(e)
+    return filename, time.time() - started, status, error
 
-            with open(os.path.join('hansard/data/raw', target_filename), 'w') as xml:
-                xml.write(hansard.text.replace(u'â\x80\x93', u' - ').replace(u'â\x80\x94', u' - ').replace(u'â\x80\x91', u'-').replace(u'â\x80\x98', '\'').replace(u'â\x80\x99', '\'').replace(u'â\x80\x9C', '"').replace(u'â\x80\x9D', '"').replace(u'â\x80\xA6', u'...').replace(u'â\x80¢Â Â Â', '-').replace(u'â\x84\xA2', '(TM)').replace(u'â\x80¢', u'-'))
+# See HansardDownloader for the keyword arguments (folder, workers, per_host, revalidate, ...)
+def download_all_hansards(date_from=datetime.date(2016, 8, 30), date_to=None, **kwargs):
+    return HansardDownloader(**kwargs).run(date_from, date_to)
@@ -1,3 +1,225 @@
-from django.shortcuts import render
+import json
+import base64
+import datetime
 
-# Create your views here.
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import *
+from .search import search_sentences
+from . import export
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+# GET /hansard/search/?q=...&speaker=&party=&chamber=&date_from=&date_to=&cursor=&limit=
+# No total count: counting every match of a common term would cost more than the page itself
+# Paginated on (rank, id) like the lists of the API below, the cursor holding the id of the last sentence of a page
+@require_GET
+def search(request):
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({'error': 'Missing q parameter'}, status=400)
+    try:
+        limit = min(100, max(1, int(request.GET.get('limit', 20))))
+        after = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        if after is not None:
+            if not isinstance(after, list) or len(after) != 1 or not isinstance(after[0], int):
+                raise ValueError("Invalid cursor")
+            after = after[0]
+        date_from = parse_date(request.GET.get('date_from'))
+        date_to = parse_date(request.GET.get('date_to'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    sentences = search_sentences(
+        q,
+        speaker=request.GET.get('speaker'),
+        party=request.GET.get('party'),
+        chamber=request.GET.get('chamber'),
+        date_from=date_from,
+        date_to=date_to,
+        after=after,
+    )
+    # One extra row tells whether there's a next page
+    rows = list(sentences[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    return JsonResponse({
+        'results': [{
+            'id': s.id,
+            'rank': s.rank,
+            'date': s.debate_ref.session.date,
+            'chamber': s.debate_ref.session.chamber,
+            'debate_title': s.debate_ref.debate_title,
+            'speaker': s.spoken_by.name,
+            'speaker_id': s.spoken_by.name_id,
+            'party': s.spoken_by.party,
+            'time_talk_started': s.time_talk_started,
+            'the_words': s.the_words,
+        } for s in rows],
+        'next': encode_cursor([rows[-1].id]) if has_next else None,
+    })
+
+
+# Read-only API
+# Lists are paginated on a keyset (cursor) rather than an offset, so that deep pages cost the same as the first one:
+# ?cursor= takes the `next` value of the previous page, ?limit= the page size
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
+
+# Rows of `queryset` after the cursor, ordered by `keys` (the last of which must be unique)
+def keyset_page(request, queryset, keys, serialize):
+    try:
+        limit = min(500, max(1, int(request.GET.get('limit', 50))))
+        values = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        if values is not None and (not isinstance(values, list) or len(values) != len(keys)):
+            raise ValueError(values)
+        queryset = queryset.order_by(*keys)
+        if values is not None:
+            # (k1, k2, ...) > (v1, v2, ...)
+            after = Q()
+            for i, key in enumerate(keys):
+                after |= Q(**dict([(k, v) for k, v in zip(keys[:i], values[:i])] + [(key + '__gt', values[i])]))
+            # Values are converted to the keys' types here
+            queryset = queryset.filter(after)
+    except (ValueError, TypeError, ValidationError):
+        return JsonResponse({'error': 'Invalid limit or cursor'}, status=400)
+
+    rows = list(queryset[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({
+        'results': [serialize(row) for row in rows],
+        'next': encode_cursor([getattr(rows[-1], key) for key in keys]) if has_next else None,
+    })
+
+
+def session_json(s):
+    return {
+        'id': s.id,
+        'date': s.date,
+        'chamber': s.chamber,
+        'parliament_no': s.parliament_no,
+        'session_no': s.session_no,
+        'period_no': s.period_no,
+    }
+
+def debate_json(d):
+    return {
+        'id': d.id,
+        'session_id': d.session_id,
+        'debate_title': d.debate_title,
+        'debate_page_no': d.debate_page_no,
+        'subdebate1_title': d.subdebate1_title,
+        'subdebate1_page_no': d.subdebate1_page_no,
+        'subdebate2_title': d.subdebate2_title,
+        'subdebate2_page_no': d.subdebate2_page_no,
+    }
+
+def person_json(p):
+    return {
+        'id': p.id,
+        'name_id': p.name_id,
+        'name': p.name,
+        'party': p.party,
+        'electorate': p.electorate.elect_div if p.electorate else None,
+    }
+
+def sentence_json(s):
+    return {
+        'id': s.id,
+        'session': session_json(s.debate_ref.session),
+        'debate': debate_json(s.debate_ref),
+        'spoken_by': person_json(s.spoken_by),
+        'time_talk_started': s.time_talk_started,
+        'talk_type': s.talk_type,
+        'the_words': s.the_words,
+    }
+
+
+@require_GET
+def sessions(request):
+    queryset = SessionReference.objects.all()
+    if request.GET.get('chamber'):
+        queryset = queryset.filter(chamber=request.GET['chamber'])
+    try:
+        if request.GET.get('date_from'):
+            queryset = queryset.filter(date__gte=parse_date(request.GET['date_from']))
+        if request.GET.get('date_to'):
+            queryset = queryset.filter(date__lte=parse_date(request.GET['date_to']))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return keyset_page(request, queryset, ('date', 'id'), session_json)
+
+
+@require_GET
+def debates(request):
+    queryset = DebateReference.objects.all()
+    try:
+        if request.GET.get('session'):
+            queryset = queryset.filter(session_id=int(request.GET['session']))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return keyset_page(request, queryset, ('id',), debate_json)
+
+
+@require_GET
+def people(request):
+    # Boundaries are way too heavy to be loaded along with people
+    queryset = Person.objects.select_related('electorate').defer('electorate__the_geom')
+    if request.GET.get('party'):
+        queryset = queryset.filter(party=request.GET['party'])
+    return keyset_page(request, queryset, ('id',), person_json)
+
+
+@require_GET
+def sentences(request):
+    queryset = Sentence.objects.select_related('debate_ref__session', 'spoken_by__electorate').defer('search_vector', 'spoken_by__electorate__the_geom')
+    if request.GET.get('speaker'):
+        queryset = queryset.filter(spoken_by__name_id=request.GET['speaker'])
+    try:
+        if request.GET.get('session'):
+            queryset = queryset.filter(debate_ref__session_id=int(request.GET['session']))
+        if request.GET.get('debate'):
+            queryset = queryset.filter(debate_ref_id=int(request.GET['debate']))
+        if request.GET.get('date_from'):
+            queryset = queryset.filter(debate_ref__session__date__gte=parse_date(request.GET['date_from']))
+        if request.GET.get('date_to'):
+            queryset = queryset.filter(debate_ref__session__date__lte=parse_date(request.GET['date_to']))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return keyset_page(request, queryset, ('id',), sentence_json)
+
+
+# GET /hansard/export/?format=csv|jsonl|parquet&chamber=&date_from=&date_to=
+# The whole (filtered) corpus, streamed as it is read from the database
+@require_GET
+def export_sentences(request):
+    format = request.GET.get('format', 'csv')
+    try:
+        rows = export.export_rows(
+            date_from=parse_date(request.GET.get('date_from')),
+            date_to=parse_date(request.GET.get('date_to')),
+            chamber=request.GET.get('chamber') or None,
+        )
+        chunks = export.export_chunks(format, rows)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except ImportError as e:
+        return JsonResponse({'error': str(e)}, status=501)
+
+    response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[format])
+    response['Content-Disposition'] = 'attachment; filename="hansard.%s"' % (format,)
+    return response
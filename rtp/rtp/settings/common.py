@@ -63,9 +63,11 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
 
     'aec',
     'hansard',
+    'theyvoteforyou',
 ]
 
 MIDDLEWARE = [
@@ -135,3 +137,43 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Hansard ingest
+# Parser engine used by hansard.utils.parse_hansard: 'soup' (BeautifulSoup tree) or 'lxml' (streaming iterparse)
+HANSARD_PARSER_ENGINE = 'soup'
+# Number of Sentence rows per bulk INSERT
+HANSARD_SENTENCE_BATCH_SIZE = 500
+
+# spaCy model used by hansard analysis, and the pipeline components not to load by default
+HANSARD_SPACY_MODEL = 'en_core_web_sm'
+HANSARD_SPACY_DISABLE = ()
+# Named entity recognition: texts per spaCy batch and number of worker processes
+HANSARD_NER_BATCH_SIZE = 256
+HANSARD_NER_PROCESSES = 1
+# Sentences annotated per batch by hansard.annotate
+HANSARD_ANNOTATION_BATCH_SIZE = 500
+
+# Rows fetched per server-side cursor round trip, and written per chunk / parquet row group, by hansard.export
+HANSARD_EXPORT_CHUNK_SIZE = 2000
+# Rows fetched per server-side cursor round trip by hansard.analysis
+HANSARD_ANALYSIS_CHUNK_SIZE = 2000
+
+# Electorate boundaries
+# Where rendered vector tiles are cached, emptied whenever the boundaries are reloaded
+AEC_TILE_CACHE_DIR = 'aec/data/tiles'
+
+# TheyVoteForYou API client (the root and key are in APIS['THEYVOTEFORYOU'])
+# Cached responses are reused for THEYVOTEFORYOU_CACHE_TTL seconds, then revalidated
+THEYVOTEFORYOU_CACHE_DIR = 'theyvoteforyou/data/cache'
+THEYVOTEFORYOU_CACHE_TTL = 24 * 3600
+# Concurrent requests, and requests started per second
+THEYVOTEFORYOU_WORKERS = 4
+THEYVOTEFORYOU_RATE_LIMIT = 5
+
+# Instrumentation of the hansard pipeline (see hansard.instrument)
+# Tracing memory allocations slows ingest down noticeably
+HANSARD_TRACE_MEMORY = False
+# None, 'cprofile' or 'pyinstrument': profile of each ingested file, saved to HANSARD_PROFILE_DIR
+HANSARD_PROFILER = None
+HANSARD_PROFILE_DIR = 'hansard/data/profiles'
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+# Spaces requests at least 1 / `per_second` seconds apart, across threads
+class RateLimiter(object):
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0
+        self.lock = threading.Lock()
+        self.next_slot = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# TheyVoteForYou API client (https://theyvoteforyou.org.au/help/data)
+# - a single pooled requests.Session with retries, shared by a bounded pool of threads for fan outs
+# - at most `workers` requests in flight, and at most `per_second` requests started per second
+# - responses are cached on disk: fresh for `ttl` seconds, then revalidated with ETag / If-Modified-Since
+class TheyVoteForYouClient(object):
+
+    def __init__(self, root, key, cache_dir='theyvoteforyou/data/cache', ttl=86400, workers=4, per_second=5, timeout=30):
+        self.root = root.rstrip('/')
+        self.key = key
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.workers = workers
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.in_flight = threading.BoundedSemaphore(workers)
+        self.rate_limiter = RateLimiter(per_second)
+
+    # Default client, configured by the APIS['THEYVOTEFORYOU'] and THEYVOTEFORYOU_* settings
+    @classmethod
+    def from_settings(cls):
+        from django.conf import settings
+
+        api = settings.APIS['THEYVOTEFORYOU']
+        return cls(
+            api['ROOT'],
+            api['KEY'],
+            cache_dir=settings.THEYVOTEFORYOU_CACHE_DIR,
+            ttl=settings.THEYVOTEFORYOU_CACHE_TTL,
+            workers=settings.THEYVOTEFORYOU_WORKERS,
+            per_second=settings.THEYVOTEFORYOU_RATE_LIMIT,
+        )
+
+    # Cache file of a request, the API key being left out
+    def cache_path(self, path, params):
+        url = path + '?' + urlencode(sorted(params.items()))
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def read_cache(self, filename):
+        try:
+            with open(filename, encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    # Written to a temporary file then renamed, so concurrent readers never see a partial entry
+    def write_cache(self, filename, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp, filename)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    # Decoded JSON of /api/v1/<path>.json, e.g. get('people'), get('divisions', {'start_date': '2018-01-01'})
+    # Raises requests.RequestException on failures
+    def get(self, path, params=None):
+        params = dict(params or {})
+        filename = self.cache_path(path, params)
+        cached = self.read_cache(filename)
+        if cached is not None and time.time() - cached['fetched_at'] < self.ttl:
+            return cached['data']
+
+        headers = {}
+        if cached is not None and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached is not None and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        url = '%s/%s.json' % (self.root, path)
+        with self.in_flight:
+            self.rate_limiter.wait()
+            logger.debug("GET %s %s" % (url, params))
+            response = self.session.get(url, params=dict(params, key=self.key), headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and cached is not None:
+            entry = dict(cached, fetched_at=time.time())
+        else:
+            response.raise_for_status()
+            entry = {
+                'fetched_at': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'data': response.json(),
+            }
+        self.write_cache(filename, entry)
+        return entry['data']
+
+    # Calls `function` on each item over the pool of threads, results in the order of the items
+    def fan_out(self, function, items):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(function, items))
+
+    def people(self):
+        return self.get('people')
+
+    def person(self, id):
+        return self.get('people/%s' % (id,))
+
+    # Details (including votes) of each person, e.g. to sync all members
+    def people_details(self, ids):
+        return self.fan_out(self.person, ids)
+
+    # Divisions summaries, optionally filtered by start_date, end_date (YYYY-MM-DD) and house
+    def divisions(self, **params):
+        return self.get('divisions', params)
+
+    def division(self, id):
+        return self.get('divisions/%s' % (id,))
+
+    def divisions_details(self, ids):
+        return self.fan_out(self.division, ids)
+
+    def policies(self):
+        return self.get('policies')
+
+    def policy(self, id):
+        return self.get('policies/%s' % (id,))
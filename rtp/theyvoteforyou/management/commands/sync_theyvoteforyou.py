@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from hansard.management.commands.ingest_hansards import date
+from theyvoteforyou.sync import sync_divisions, sync_policies
+
+
+class Command(BaseCommand):
+    help = 'Fetches policies and the divisions (with votes) newer than the last synced ones from TheyVoteForYou'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date, help='Fetch divisions from this date (YYYY-MM-DD) rather than the last synced one')
+
+    def handle(self, *args, **options):
+        created, updated = sync_policies()
+        self.stdout.write("Policies: %s new, %s updated" % (created, updated))
+        count = sync_divisions(since=options['since'])
+        self.stdout.write("Divisions: %s fetched" % (count,))
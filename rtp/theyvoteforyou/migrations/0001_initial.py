@@ -0,0 +1,95 @@
+# Generated by Django 2.0.5 on 2026-10-18 20:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('aec', '0004_simplifiedelectorate2016'),
+        ('hansard', '0013_api_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Division',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('house', models.CharField(choices=[('representatives', 'House of Reps'), ('senate', 'Senate')], max_length=16)),
+                ('date', models.DateField(db_index=True)),
+                ('number', models.IntegerField()),
+                ('clock_time', models.CharField(max_length=16, null=True)),
+                ('name', models.TextField()),
+                ('summary', models.TextField()),
+                ('aye_votes', models.IntegerField()),
+                ('no_votes', models.IntegerField()),
+                ('possible_turnout', models.IntegerField()),
+                ('rebellions', models.IntegerField()),
+                ('edited', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Member',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('person_id', models.IntegerField(db_index=True)),
+                ('first_name', models.CharField(max_length=64)),
+                ('last_name', models.CharField(max_length=64)),
+                ('house', models.CharField(choices=[('representatives', 'House of Reps'), ('senate', 'Senate')], max_length=16)),
+                ('party', models.CharField(max_length=64)),
+                ('electorate_name', models.CharField(max_length=64)),
+                ('electorate', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='aec.FederalElectorate2016')),
+                ('speaker', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='hansard.Person')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Policy',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('provisional', models.BooleanField(default=False)),
+                ('status', models.CharField(max_length=16)),
+                ('last_edited_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PolicyDivision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote', models.CharField(max_length=8)),
+                ('strong', models.BooleanField(default=False)),
+                ('division', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='policy_divisions', to='theyvoteforyou.Division')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='policy_divisions', to='theyvoteforyou.Policy')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote', models.CharField(max_length=8)),
+                ('division', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='theyvoteforyou.Division')),
+                ('electorate', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='aec.FederalElectorate2016')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='theyvoteforyou.Member')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='division',
+            unique_together={('house', 'date', 'number')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='policydivision',
+            unique_together={('policy', 'division')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='vote',
+            unique_together={('division', 'member')},
+        ),
+        migrations.AlterIndexTogether(
+            name='vote',
+            index_together={('member', 'division'), ('electorate', 'division')},
+        ),
+    ]
@@ -1,3 +1,87 @@
 from django.db import models
 
-# Create your models here.
+from aec.models import FederalElectorate2016
+from hansard.models import Person
+
+
+# Mirrors of TheyVoteForYou records, keyed on their TheyVoteForYou ids
+# Populated by theyvoteforyou.sync
+
+HOUSES = (
+    ('representatives', 'House of Reps'),
+    ('senate', 'Senate'),
+)
+
+
+class Policy(models.Model):
+    id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    description = models.TextField()
+    provisional = models.BooleanField(default=False)
+    status = models.CharField(max_length=16)
+    last_edited_at = models.DateTimeField(null=True)
+
+
+# A person's seat in a house, e.g. the Member for Melbourne or a Senator for Victoria
+class Member(models.Model):
+    id = models.IntegerField(primary_key=True)
+    # TheyVoteForYou person, one for all the seats of a person over time
+    person_id = models.IntegerField(db_index=True)
+    first_name = models.CharField(max_length=64)
+    last_name = models.CharField(max_length=64)
+    house = models.CharField(max_length=16, choices=HOUSES)
+    party = models.CharField(max_length=64)
+    # Electorate as named by TheyVoteForYou (a state for senators)
+    electorate_name = models.CharField(max_length=64)
+    electorate = models.ForeignKey(FederalElectorate2016, on_delete=models.SET_NULL, null=True)
+    speaker = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True)
+
+
+class Division(models.Model):
+    id = models.IntegerField(primary_key=True)
+    house = models.CharField(max_length=16, choices=HOUSES)
+    date = models.DateField(db_index=True)
+    number = models.IntegerField()
+    clock_time = models.CharField(max_length=16, null=True)
+    name = models.TextField()
+    summary = models.TextField()
+    aye_votes = models.IntegerField()
+    no_votes = models.IntegerField()
+    possible_turnout = models.IntegerField()
+    rebellions = models.IntegerField()
+    edited = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = (
+            ('house', 'date', 'number'),
+        )
+
+
+# How a division counts towards a policy: "aye" means voting aye supports the policy
+class PolicyDivision(models.Model):
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE, related_name='policy_divisions')
+    division = models.ForeignKey(Division, on_delete=models.CASCADE, related_name='policy_divisions')
+    vote = models.CharField(max_length=8)
+    strong = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = (
+            ('policy', 'division'),
+        )
+
+
+class Vote(models.Model):
+    division = models.ForeignKey(Division, on_delete=models.CASCADE, related_name='votes')
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='votes')
+    # Denormalised from member, so that votes of an electorate's member are a single index range
+    electorate = models.ForeignKey(FederalElectorate2016, on_delete=models.SET_NULL, null=True)
+    vote = models.CharField(max_length=8)
+
+    class Meta:
+        unique_together = (
+            ('division', 'member'),
+        )
+        index_together = (
+            ('member', 'division'),
+            ('electorate', 'division'),
+        )
@@ -0,0 +1,170 @@
+import logging
+import datetime
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from aec.models import FederalElectorate2016
+from hansard.models import Person
+
+from .models import *
+from .utils import get_client
+
+logger = logging.getLogger(__name__)
+
+
+# Incremental sync of divisions, votes and policies from TheyVoteForYou
+
+# Oldest divisions on TheyVoteForYou
+SYNC_FROM = datetime.date(2006, 1, 1)
+# Most division summaries returned by one call of the API
+DIVISIONS_PER_CALL = 100
+# Fields of the division summaries compared with the stored divisions: summaries themselves are only in the details
+SUMMARY_FIELDS = ('name', 'clock_time', 'aye_votes', 'no_votes', 'possible_turnout', 'rebellions', 'edited')
+
+
+# Division summaries between two dates (inclusive), windows the API truncates being split in two
+def division_summaries(client, start, end):
+    rows = client.divisions(start_date=start.isoformat(), end_date=end.isoformat())
+    if len(rows) >= DIVISIONS_PER_CALL and start < end:
+        middle = start + (end - start) // 2
+        return division_summaries(client, start, middle) + division_summaries(client, middle + datetime.timedelta(days=1), end)
+    if len(rows) >= DIVISIONS_PER_CALL:
+        logger.warning("More than %s divisions on %s, some may be missing" % (DIVISIONS_PER_CALL, start))
+    return rows
+
+
+# Matches TheyVoteForYou members to electorates and hansard speakers, by electorate and name
+class MemberMatcher(object):
+
+    def __init__(self):
+        self.electorates = dict(FederalElectorate2016.objects.values_list('elect_div', 'id'))
+        self.people = list(Person.objects.values_list('id', 'name', 'electorate_id'))
+
+    def electorate_id(self, member):
+        return self.electorates.get(member['electorate']) if member['house'] == 'representatives' else None
+
+    # Hansard names read e.g. "Shorten, Bill, MP"
+    def speaker_id(self, member):
+        electorate_id = self.electorate_id(member)
+        last_name = member['name']['last'].lower() + ','
+        full_name = '%s %s,' % (last_name, member['name']['first'].lower())
+        candidates = [id for id, name, person_electorate_id in self.people if name.lower().startswith(last_name) and (
+            electorate_id is not None and person_electorate_id == electorate_id or name.lower().startswith(full_name))]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def member_row(member, matcher):
+    return Member(
+        id=member['id'],
+        person_id=member['person']['id'],
+        first_name=member['name']['first'],
+        last_name=member['name']['last'],
+        house=member['house'],
+        party=member['party'],
+        electorate_name=member['electorate'],
+        electorate_id=matcher.electorate_id(member),
+        speaker_id=matcher.speaker_id(member),
+    )
+
+
+def policy_row(policy):
+    return Policy(
+        id=policy['id'],
+        name=policy['name'],
+        description=policy.get('description') or '',
+        provisional=policy.get('provisional', False),
+        status=policy.get('status') or '',
+        last_edited_at=parse_datetime(policy['last_edited_at']) if policy.get('last_edited_at') else None,
+    )
+
+
+def division_row(division):
+    return Division(
+        id=division['id'],
+        house=division['house'],
+        date=division['date'],
+        number=division['number'],
+        clock_time=division.get('clock_time'),
+        name=division['name'],
+        summary=division.get('summary') or '',
+        aye_votes=division['aye_votes'],
+        no_votes=division['no_votes'],
+        possible_turnout=division['possible_turnout'],
+        rebellions=division['rebellions'],
+        edited=division.get('edited', False),
+    )
+
+
+# Inserts the rows whose primary key is new, and saves those that changed
+def upsert(model, rows, batch_size=1000):
+    rows = list({row.pk: row for row in rows}.values())
+    fields = [f.attname for f in model._meta.concrete_fields if not f.primary_key]
+    existing = model.objects.in_bulk([row.pk for row in rows])
+    new = [row for row in rows if row.pk not in existing]
+    model.objects.bulk_create(new, batch_size=batch_size)
+    updated = 0
+    for row in rows:
+        current = existing.get(row.pk)
+        changed = [f for f in fields if current is not None and getattr(current, f) != getattr(row, f)]
+        if changed:
+            row.save(update_fields=changed)
+            updated += 1
+    return len(new), updated
+
+
+# Inserts the rows whose primary key is new, leaving existing ones alone
+def insert_missing(model, rows, batch_size=1000):
+    rows = {row.pk: row for row in rows}
+    existing = set(model.objects.filter(pk__in=list(rows)).values_list('pk', flat=True))
+    new = [row for pk, row in rows.items() if pk not in existing]
+    model.objects.bulk_create(new, batch_size=batch_size)
+    return len(new)
+
+
+def sync_policies(client=None):
+    client = client or get_client()
+    return upsert(Policy, [policy_row(policy) for policy in client.policies()])
+
+
+# Fetches the divisions since `since` (default: the last synced sitting day, re-fetched to catch late additions)
+# Returns the number of divisions stored
+def sync_divisions(client=None, since=None, until=None):
+    client = client or get_client()
+    if since is None:
+        since = Division.objects.aggregate(last=Max('date'))['last'] or SYNC_FROM
+    until = until or datetime.date.today()
+
+    summaries = division_summaries(client, since, until)
+    known = {row[0]: row[1:] for row in Division.objects.filter(date__gte=since).values_list('id', *SUMMARY_FIELDS)}
+    # Only new divisions, or those changed since (e.g. edited to add a summary)
+    ids = [d['id'] for d in summaries if known.get(d['id']) != tuple(getattr(division_row(d), field) for field in SUMMARY_FIELDS)]
+    logger.debug("%s divisions since %s, %s to fetch" % (len(summaries), since, len(ids)))
+    if not ids:
+        return 0
+
+    divisions = client.divisions_details(ids)
+    matcher = MemberMatcher()
+    members = [member_row(vote['member'], matcher) for division in divisions for vote in division.get('votes', [])]
+    policies = [policy_row(pd['policy']) for division in divisions for pd in division.get('policy_divisions', [])]
+    electorates = {m.id: m.electorate_id for m in members}
+
+    with transaction.atomic():
+        upsert(Member, members)
+        # Policy summaries embedded in divisions lack status and last edit: sync_policies keeps those up to date
+        insert_missing(Policy, policies)
+
+        # Re-fetched divisions are replaced along with their votes
+        Division.objects.filter(id__in=ids).delete()
+        Division.objects.bulk_create([division_row(division) for division in divisions], batch_size=1000)
+        PolicyDivision.objects.bulk_create([
+            PolicyDivision(policy_id=pd['policy']['id'], division_id=division['id'], vote=pd['vote'], strong=pd.get('strong', False))
+            for division in divisions for pd in division.get('policy_divisions', [])
+        ], batch_size=1000)
+        Vote.objects.bulk_create([
+            Vote(division_id=division['id'], member_id=vote['member']['id'], electorate_id=electorates[vote['member']['id']], vote=vote['vote'])
+            for division in divisions for vote in division.get('votes', [])
+        ], batch_size=5000)
+    return len(divisions)
+
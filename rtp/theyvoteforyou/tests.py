@@ -1,3 +1,159 @@
-from django.test import TestCase
+import json
+import datetime
+import tempfile
+import threading
 
-# Create your tests here.
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import SimpleTestCase, TestCase
+
+from aec.models import FederalElectorate2016
+from hansard.models import Person
+
+from .client import TheyVoteForYouClient
+from .models import *
+from .sync import sync_divisions
+from .utils import electorate_policy_votes
+
+
+PEOPLE = [
+    {'id': 10001, 'latest_member': {'id': 1, 'electorate': 'Melbourne', 'house': 'representatives', 'party': 'Australian Greens'}},
+    {'id': 10002, 'latest_member': {'id': 2, 'electorate': 'Victoria', 'house': 'senate', 'party': 'Australian Greens'}},
+]
+
+
+# Fake TheyVoteForYou API, answering 304 to requests revalidating the current ETag
+class FakeApiHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.requests.append((url.path, self.headers.get('If-None-Match')))
+        if parse_qs(url.query).get('key') != ['secret']:
+            return self.send_error(401)
+        if url.path == '/api/v1/people.json':
+            body = PEOPLE
+        elif url.path.startswith('/api/v1/people/'):
+            body = dict(PEOPLE[int(url.path.split('/')[-1].split('.')[0]) - 10001], votes=[])
+        else:
+            return self.send_error(404)
+
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TheyVoteForYouClientTest(SimpleTestCase):
+
+    def setUp(self):
+        FakeApiHandler.requests = []
+        self.server = HTTPServer(('127.0.0.1', 0), FakeApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache.cleanup()
+
+    def api(self, **kwargs):
+        root = 'http://127.0.0.1:%s/api/v1' % self.server.server_port
+        return TheyVoteForYouClient(root, 'secret', cache_dir=self.cache.name, per_second=0, **kwargs)
+
+    def test_cache(self):
+        self.assertEqual(self.api().people(), PEOPLE)
+        # Fresh: served from disk
+        self.assertEqual(self.api().people(), PEOPLE)
+        self.assertEqual(len(FakeApiHandler.requests), 1)
+        # Stale: revalidated
+        self.assertEqual(self.api(ttl=0).people(), PEOPLE)
+        self.assertEqual(FakeApiHandler.requests[-1], ('/api/v1/people.json', '"v1"'))
+
+    def test_fan_out(self):
+        people = self.api(workers=2).people_details([10002, 10001])
+        self.assertEqual([p['latest_member']['electorate'] for p in people], ['Victoria', 'Melbourne'])
+        self.assertEqual(sorted(path for path, etag in FakeApiHandler.requests), ['/api/v1/people/10001.json', '/api/v1/people/10002.json'])
+
+
+POLICY = {'id': 1, 'name': 'Increasing investment in renewable energy', 'description': '', 'provisional': False, 'status': 'published', 'last_edited_at': '2018-05-01T10:00:00+10:00'}
+BANDT = {'id': 100, 'person': {'id': 10001}, 'name': {'first': 'Adam', 'last': 'Bandt'}, 'electorate': 'Melbourne', 'house': 'representatives', 'party': 'Australian Greens'}
+
+
+def division(id, date):
+    return {
+        'id': id, 'house': 'representatives', 'name': 'Bills - Renewable Energy', 'date': date, 'number': id, 'clock_time': None,
+        'aye_votes': 1, 'no_votes': 0, 'possible_turnout': 150, 'rebellions': 0, 'edited': False, 'summary': '',
+        'votes': [{'vote': 'aye', 'member': BANDT}],
+        'policy_divisions': [{'policy': POLICY, 'vote': 'aye', 'strong': False}],
+    }
+
+
+# Stands for TheyVoteForYouClient, recording what is fetched
+class FakeClient(object):
+
+    def __init__(self, divisions):
+        self.all_divisions = divisions
+        self.fetched = []
+
+    def divisions(self, start_date, end_date):
+        return [d for d in self.all_divisions if start_date <= d['date'] <= end_date]
+
+    def divisions_details(self, ids):
+        self.fetched.extend(ids)
+        return [d for d in self.all_divisions if d['id'] in ids]
+
+
+class SyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.melbourne = FederalElectorate2016.objects.create(
+            elect_div='Melbourne', state='VIC', numccds=0, actual=0, projected=0, total_population=0, australians_over_18=0, area_sqkm=0, sortname='Melbourne',
+            the_geom=MultiPolygon(Polygon.from_bbox((144, -38, 145, -37)), srid=4326),
+        )
+        cls.bandt = Person.objects.create(name_id='M2X', name='Bandt, Adam, MP', party='AG', electorate=cls.melbourne)
+
+    def test_incremental_sync(self):
+        client = FakeClient([division(1, '2018-05-09'), division(2, '2018-05-10')])
+        self.assertEqual(sync_divisions(client, since=datetime.date(2018, 5, 1), until=datetime.date(2018, 5, 31)), 2)
+        member = Member.objects.get()
+        self.assertEqual((member.electorate_id, member.speaker_id), (self.melbourne.id, self.bandt.id))
+
+        # Only the last synced day and later are fetched again
+        client = FakeClient(client.all_divisions + [division(3, '2018-05-21')])
+        self.assertEqual(sync_divisions(client, until=datetime.date(2018, 5, 31)), 1)
+        self.assertEqual(client.fetched, [3])
+        self.assertEqual(Vote.objects.count(), 3)
+
+        with self.assertNumQueries(1):
+            votes = [(v.division.id, v.vote, v.policy_vote) for v in electorate_policy_votes('Melbourne', 1)]
+        self.assertEqual(votes, [(1, 'aye', 'aye'), (2, 'aye', 'aye'), (3, 'aye', 'aye')])
+
+        # Edited divisions are fetched again once, then left alone until they change
+        client.all_divisions[1].update(edited=True, summary='The bill passed.')
+        for fetched in ([2], []):
+            client = FakeClient(client.all_divisions)
+            sync_divisions(client, since=datetime.date(2018, 5, 1), until=datetime.date(2018, 5, 31))
+            self.assertEqual(client.fetched, fetched)
+        self.assertEqual(Division.objects.get(id=2).summary, 'The bill passed.')
+
+    def test_embedded_policies(self):
+        Policy.objects.create(id=1, name=POLICY['name'], status='published', last_edited_at=datetime.datetime(2018, 5, 1, tzinfo=datetime.timezone.utc))
+        embedded = dict(division(1, '2018-05-09'), policy_divisions=[{'policy': {'id': 1, 'name': POLICY['name']}, 'vote': 'aye', 'strong': False}])
+        sync_divisions(FakeClient([embedded]), since=datetime.date(2018, 5, 1), until=datetime.date(2018, 5, 31))
+        policy = Policy.objects.get(id=1)
+        self.assertEqual(policy.status, 'published')
+        self.assertIsNotNone(policy.last_edited_at)
@@ -1,26 +1,36 @@
-import os
 import logging
+import threading
+
 import requests
 
-from django.conf import settings
+from django.db.models import F
 
 from aec.models import FederalElectorate2016
 
+from .client import TheyVoteForYouClient
+from .models import *
+
 logger = logging.getLogger(__name__)
-api = settings.APIS['THEYVOTEFORYOU']
 
+_client = None
+_lock = threading.Lock()
 
-def api_call(endpoint='people', id=None):
-    r = requests.get(api['ROOT'] + '/' + endpoint + '.json' + '?key=' + api['KEY'])
 
+# Process-wide client, so that all calls share its connection pool, rate limit and cache
+def get_client():
+    global _client
+    with _lock:
+        if _client is None:
+            _client = TheyVoteForYouClient.from_settings()
+        return _client
+
+
+# e.g. api_call('people'), api_call('divisions', 1234)
+def api_call(endpoint='people', id=None):
     try:
-        if r.status_code == 200:
-            response = r.json()
-            return response
-        else:
-            logger.error('Status code: %s ' % (r.status_code))
-    except Exception as e:
-        raise
+        return get_client().get(endpoint if id is None else '%s/%s' % (endpoint, id))
+    except requests.RequestException as e:
+        logger.error("%s %s: %s" % (endpoint, id, e))
 
 
 def check_electorates():
@@ -34,3 +44,15 @@ def check_electorates():
 
     unknown_to_tv4u = set(aec_electorates) - set(tv4u_electorates)
     logger.debug("Unknown to TheyVoteForYou: %s" % unknown_to_tv4u)
+
+
+# How the member(s) for an electorate voted on each division of a policy, as a single query on the
+# (electorate, division) index of votes, along with how the policy counts those divisions
+def electorate_policy_votes(elect_div, policy_id):
+    return Vote.objects.filter(
+        electorate__elect_div=elect_div,
+        division__policy_divisions__policy_id=policy_id,
+    ).annotate(
+        policy_vote=F('division__policy_divisions__vote'),
+        strong=F('division__policy_divisions__strong'),
+    ).select_related('division', 'member').order_by('division__date', 'division__number')